@@ -0,0 +1,306 @@
+"""
+Lógica de análisis del PDF de prensa, sin interfaz: detección de títulos,
+extracción del texto de cada noticia, huellas de duplicados y búsqueda en el
+archivo de notas ya reportadas.
+
+Importar este módulo no tiene efectos secundarios (no toca Streamlit ni la
+API), así que lo usan tanto app_streamlit.py como el procesamiento por lotes
+de main.py, incluidos sus procesos de trabajo.
+"""
+from pathlib import Path
+
+from archivo_huellas import obtener_archivo_huellas
+from duplicados import agrupar_duplicados, huella_simhash
+from medios import obtener_registro_medios
+from perfiles_pdf import (
+    COBERTURA_MINIMA,
+    PerfilMaquetacion,
+    aprender_umbrales,
+    cobertura_indice,
+    detectar_pagina_indice,
+    huella_maquetacion,
+    obtener_archivo_perfiles,
+    quitar_vineta,
+    rotulos_repetidos,
+)
+from trazas import tramo
+
+
+# ======== FUNCIÓN PARA SEPARAR TÍTULO / MEDIO ========
+# Los medios y sus alias se configuran en medios.json (ver medios.py)
+
+def separar_titulo_y_medio(titulo_completo: str, texto: str = ""):
+    """
+    Recibe algo como:
+      'ECB Officials Lobby for Rival Bank Rule Plans Before Report, Bloomberg'
+    y devuelve:
+      ('ECB Officials Lobby for Rival Bank Rule Plans Before Report', 'Bloomberg')
+
+    El medio se devuelve con su nombre canónico (un alias como 'WSJ' da
+    'The Wall Street Journal'). Si el título no lo trae y se pasa el `texto`
+    de la nota, se busca en su firma. Si no reconoce el medio, devuelve
+    (titulo_completo, '').
+    """
+    titulo, medio, _ = obtener_registro_medios().separar(titulo_completo, texto)
+    return titulo, medio
+
+
+# ======== LÓGICA DE PDF ========
+# ======== Títulos completos desde la portada (página 0) ========
+def obtener_titulos_portada(doc, pagina_indice: int):
+    """
+    Extrae la lista de títulos de la página donde viene el índice
+    (bullet points con los títulos + medio).
+    """
+    page = doc.load_page(pagina_indice)
+    texto = page.get_text("text")
+
+    lineas = []
+    for linea in texto.splitlines():
+        linea = quitar_vineta(linea)
+        if not linea:
+            continue
+        # Aquí puedes mantener el mismo criterio de filtrado que ya usabas
+        lineas.append(linea)
+
+    return lineas
+
+def detectar_titulos(doc, pagina_indice: int, avance=None, perfil: PerfilMaquetacion | None = None):
+    """
+    1) Detecta los títulos en las páginas de los artículos (como antes),
+       usando tamaño, negritas, etc. -> obtiene (titulo_interno, página).
+       Los umbrales y rótulos excluidos vienen del perfil de maquetación
+       (por defecto: negrita, >= 12 pt, >= 25 caracteres).
+    2) Luego busca cada titulo_interno dentro de la lista de títulos de la
+       página de índice y, si lo encuentra, lo sustituye por el título
+       completo que trae el periódico al final.
+    """
+    perfil = perfil or PerfilMaquetacion(pagina_indice=pagina_indice)
+    textos_excluidos = perfil.excluidos
+    tamano_min = perfil.tamano_min
+    longitud_min = perfil.longitud_min
+    requiere_negrita = perfil.negrita
+
+    # 1) Detectar títulos internos
+    titulos_raw = []
+
+    # Las noticias empiezan justo después de la página de índice:
+    #   - Si NO hay portada: índice = 0 → noticias desde 1
+    #   - Si SÍ hay portada: índice = 1 → noticias desde 2
+    for page_num in range(pagina_indice + 1, doc.page_count):
+        if avance is not None:
+            avance(page_num, doc.page_count, "Detectando títulos")
+        with tramo("pagina", "pdf", pagina=page_num + 1):
+            page = doc.load_page(page_num)
+            texto_dict = page.get_text("dict")
+            blocks = texto_dict["blocks"]
+
+            for block in blocks:
+                if block["type"] != 0:
+                    continue
+
+                for line in block["lines"]:
+                    spans = line.get("spans", [])
+                    if not spans:
+                        continue
+
+                    full_text = "".join(span["text"] for span in spans).strip()
+                    font = spans[0]["font"]
+                    size = spans[0]["size"]
+                    es_negrita = not requiere_negrita or "bold" in font.lower()
+
+                    if (
+                        full_text
+                        and es_negrita
+                        and size >= tamano_min
+                        and len(full_text) >= longitud_min
+                        and full_text not in textos_excluidos
+                    ):
+                        # Guardamos título interno y página donde inicia (1-based)
+                        titulos_raw.append((full_text, page_num + 1))
+                        break
+
+    # 2) Enriquecer con los títulos completos de la página de índice
+    with tramo("cruce_indice", "pdf", titulos=len(titulos_raw)):
+        titulos_portada = obtener_titulos_portada(doc, pagina_indice)
+
+        titulos_enriquecidos = []
+        for texto, pagina in titulos_raw:
+            titulo_completo = texto
+            for linea in titulos_portada:
+                if texto in linea:
+                    titulo_completo = linea
+                    break
+            titulos_enriquecidos.append((titulo_completo, pagina))
+
+    return titulos_enriquecidos
+
+
+class Noticia:
+    """
+    Una noticia detectada. Con __slots__ (sin __dict__ por instancia) y sin la
+    lista de páginas materializada: se deriva de pagina_inicio/pagina_fin.
+    """
+
+    __slots__ = ("titulo", "pagina_inicio", "pagina_fin", "texto", "huella")
+
+    def __init__(self, titulo: str, pagina_inicio: int, pagina_fin: int, texto: str, huella: int = 0):
+        self.titulo = titulo
+        self.pagina_inicio = pagina_inicio
+        self.pagina_fin = pagina_fin
+        self.texto = texto
+        self.huella = huella
+
+    @property
+    def paginas(self) -> range:
+        return range(self.pagina_inicio, self.pagina_fin + 1)
+
+
+def extraer_noticias_completas(doc, titulos_detectados) -> list[Noticia]:
+    noticias = []
+    for i, (titulo, pagina_inicio) in enumerate(titulos_detectados):
+        if i + 1 < len(titulos_detectados):
+            pagina_siguiente = titulos_detectados[i + 1][1]
+            pagina_fin = pagina_siguiente - 1
+        else:
+            pagina_fin = doc.page_count
+
+        with tramo("noticia", "pdf", pagina_inicio=pagina_inicio, paginas=pagina_fin - pagina_inicio + 1):
+            texto = "".join(doc.load_page(num).get_text() for num in range(pagina_inicio - 1, pagina_fin))
+        noticias.append(Noticia(titulo, pagina_inicio, pagina_fin, texto.strip()))
+    return noticias
+
+
+def abrir_pdf_desde_bytes(pdf_bytes: bytes):
+    import fitz  # PyMuPDF; se carga al abrir el primer PDF, no al importar
+    return fitz.open(stream=pdf_bytes, filetype="pdf")
+
+
+def abrir_pdf(origen):
+    """
+    Abre el PDF desde bytes o desde una ruta. Con una ruta (el PDF subido se
+    vuelca a un archivo temporal) MuPDF lee del archivo bajo demanda en lugar
+    de tener todo el PDF en memoria.
+    """
+    if isinstance(origen, (bytes, bytearray)):
+        return abrir_pdf_desde_bytes(bytes(origen))
+    import fitz
+    return fitz.open(Path(origen))
+
+
+def detectar_con_perfil(doc, avance=None, muestra: str = "") -> tuple[list, PerfilMaquetacion, str]:
+    """
+    Títulos con el perfil de maquetación de este PDF: el guardado para su huella
+    si lo hay ('cache') o uno aprendido ahora con heurísticas ('heuristica').
+    Un perfil vale si los títulos que saca casan con el índice (cobertura_indice):
+    el guardado que no cumple se olvida y el aprendido solo se guarda si cumple. Devuelve (títulos, perfil, origen).
+    """
+    archivo = obtener_archivo_perfiles()
+    with tramo("huella_maquetacion", "pdf"):
+        huella = huella_maquetacion(doc)
+    perfil = archivo.buscar(huella)
+    if perfil is not None and perfil.pagina_indice < doc.page_count:
+        with tramo("detectar_titulos", "pdf", paginas=doc.page_count, perfil="cache"):
+            titulos = detectar_titulos(doc, perfil.pagina_indice, avance=avance, perfil=perfil)
+        lineas_indice = obtener_titulos_portada(doc, perfil.pagina_indice)
+        if cobertura_indice(titulos, lineas_indice) >= COBERTURA_MINIMA:
+            return titulos, perfil, "cache"
+        # La fuente cambió de maquetación (o la huella coincide con otra): se vuelve a aprender
+        archivo.olvidar(huella)
+
+    with tramo("aprender_perfil", "pdf", paginas=doc.page_count):
+        with tramo("detectar_indice", "pdf"):
+            perfil = PerfilMaquetacion(pagina_indice=detectar_pagina_indice(doc))
+        lineas_indice = obtener_titulos_portada(doc, perfil.pagina_indice)
+        with tramo("detectar_titulos", "pdf", paginas=doc.page_count, perfil="heuristica"):
+            titulos = detectar_titulos(doc, perfil.pagina_indice, avance=avance, perfil=perfil)
+        rotulos = rotulos_repetidos(titulos, lineas_indice)
+        if rotulos:
+            # Sin el rótulo, el título real de ese bloque ya puede salir: otra pasada
+            perfil = perfil.con(excluidos=perfil.excluidos | rotulos)
+            with tramo("detectar_titulos", "pdf", paginas=doc.page_count, perfil="rotulos"):
+                titulos = detectar_titulos(doc, perfil.pagina_indice, avance=avance, perfil=perfil)
+        if not titulos:
+            aprendido = aprender_umbrales(doc, perfil, lineas_indice)
+            if aprendido is not None:
+                perfil = aprendido
+                with tramo("detectar_titulos", "pdf", paginas=doc.page_count, perfil="umbrales"):
+                    titulos = detectar_titulos(doc, perfil.pagina_indice, avance=avance, perfil=perfil)
+    if cobertura_indice(titulos, lineas_indice) >= COBERTURA_MINIMA:
+        archivo.guardar(huella, perfil, muestra)
+    return titulos, perfil, "heuristica"
+
+
+def analizar_documento(origen, pagina_indice: int | None = None, avance=None) -> dict:
+    """
+    Detección + extracción + agrupación de duplicados. Solo lee el PDF y
+    devuelve datos simples (se puede ejecutar en otro proceso). Con
+    pagina_indice None la página de índice y el criterio de título salen del
+    perfil de maquetación (ver perfiles_pdf.py).
+    """
+    with tramo("abrir_pdf", "pdf"):
+        doc = abrir_pdf(origen)
+    try:
+        if pagina_indice is None:
+            muestra = "" if isinstance(origen, (bytes, bytearray)) else Path(origen).name
+            titulos, perfil, origen_perfil = detectar_con_perfil(doc, avance=avance, muestra=muestra)
+        else:
+            perfil, origen_perfil = PerfilMaquetacion(pagina_indice=pagina_indice), "manual"
+            with tramo("detectar_titulos", "pdf", paginas=doc.page_count):
+                titulos = detectar_titulos(doc, pagina_indice, avance=avance, perfil=perfil)
+        if avance is not None:
+            avance(doc.page_count, doc.page_count, "Extrayendo texto")
+        with tramo("extraer_noticias", "pdf", noticias=len(titulos)):
+            noticias = extraer_noticias_completas(doc, titulos)
+    finally:
+        doc.close()
+    with tramo("duplicados", "pdf", noticias=len(noticias)):
+        for noticia in noticias:
+            noticia.huella = huella_simhash(noticia.texto)
+        grupos = agrupar_duplicados([n.texto for n in noticias], huellas=[n.huella for n in noticias])
+
+    return {
+        "titulos": titulos,
+        "noticias": noticias,
+        "grupos": grupos,
+        "pagina_indice": perfil.pagina_indice,
+        "perfil": perfil.a_dict(),
+        "origen_perfil": origen_perfil,
+    }
+
+
+def buscar_vistas(noticias: list[Noticia], archivo=None) -> dict:
+    """
+    Notas ya reportadas un día anterior (reimpresiones, seguimientos):
+    pagina_inicio -> Coincidencia. Las de hoy las lleva reporte_dia.py.
+    """
+    archivo = archivo or obtener_archivo_huellas()
+    vistas = {}
+    for noticia in noticias:
+        coincidencia = archivo.buscar(noticia.huella)
+        if coincidencia is not None:
+            vistas[noticia.pagina_inicio] = coincidencia
+    return vistas
+
+
+def analizar_pdf(origen, pagina_indice: int | None = None, avance=None) -> dict:
+    """
+    Análisis completo, incluidas las notas ya vistas; en la app se ejecuta como
+    tarea en segundo plano (gestor_tareas) para que no la interrumpan los reruns.
+    """
+    analisis = analizar_documento(origen, pagina_indice, avance=avance)
+    with tramo("buscar_vistas", "archivo"):
+        analisis["vistas"] = buscar_vistas(analisis["noticias"])
+    return analisis
+
+
+def titulo_y_medio_envio(envio: dict) -> tuple[str, str]:
+    """
+    Título y medio con los que un envío aparece en el reporte; un resumen
+    combinado cita todos los medios de su grupo.
+    """
+    titulo_nota, medio = separar_titulo_y_medio(envio["titulo"], envio["texto"])
+    if "textos" in envio:
+        medios = [separar_titulo_y_medio(n.titulo, n.texto)[1] for n in envio["grupo"]]
+        medio = " / ".join(dict.fromkeys(m for m in medios if m))
+    return titulo_nota, medio
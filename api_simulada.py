@@ -0,0 +1,202 @@
+"""
+Servidor local que imita el endpoint /v1/messages de Anthropic e inyecta fallos.
+
+Sirve para comprobar los reintentos, el backoff y el circuit breaker de
+summary_claude sin gastar llamadas reales. Ejemplo:
+
+    python api_simulada.py --puerto 8765 --tasa-error 0.3 --codigos 429,529,503
+
+    ANTHROPIC_API_KEY=local ANTHROPIC_API_URL=http://127.0.0.1:8765/v1/messages \\
+        streamlit run app_streamlit.py
+
+Con --secuencia se fija el orden exacto de respuestas (p. ej. "429,529,200"),
+útil para reproducir un caso concreto; "colgar" simula un timeout.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from summary_claude import detectar_idioma
+
+
+@dataclass
+class ConfigFallos:
+    tasa_error: float = 0.0                 # probabilidad de responder con error
+    codigos: list = field(default_factory=lambda: [429, 529, 503])
+    retry_after: float | None = None        # valor de la cabecera retry-after en errores
+    latencia: float = 0.0                   # segundos de espera antes de responder
+    latencia_jitter: float = 0.0            # +/- aleatorio sobre la latencia
+    secuencia: list = field(default_factory=list)  # respuestas forzadas en orden
+    espera_colgado: float = 120.0           # cuánto "cuelga" una respuesta 'colgar'
+    palabras_resumen: int = 115
+
+
+class _Estado:
+    def __init__(self, config: ConfigFallos):
+        self.config = config
+        self.lock = threading.Lock()
+        self.peticiones = 0
+        self.errores = 0
+
+    def siguiente_respuesta(self):
+        with self.lock:
+            n = self.peticiones
+            self.peticiones += 1
+        if n < len(self.config.secuencia):
+            return self.config.secuencia[n]
+        if self.config.tasa_error and random.random() < self.config.tasa_error:
+            return random.choice(self.config.codigos)
+        return 200
+
+
+# Relleno para cuando las primeras palabras del texto no salen en el idioma pedido
+_RELLENO = {
+    "es": "Según la nota, el gobierno y los empresarios de la región se reunieron para "
+          "revisar las cifras del año y acordar los pasos de las próximas semanas. ",
+    "en": "According to the report, the government and business leaders in the region "
+          "met on Monday to review the figures for the year and to agree on the next steps. ",
+}
+
+
+def _idioma_pedido(prompt: str, texto: str) -> str:
+    """Idioma que pide la línea de idioma del prompt de summary_claude."""
+    if "Write the summary in English" in prompt:
+        return "en"
+    if "Escribe el resumen en Español" in prompt:
+        return "es"
+    return detectar_idioma(texto)
+
+
+def _resumen_simulado(prompt: str, palabras: int) -> str:
+    """
+    Devuelve las primeras palabras del texto enviado, en el idioma que pide el
+    prompt ("mismo idioma" = el del texto entero, como hace summary_claude); si
+    esas palabras no salen en ese idioma, un relleno que sí. Así la validación de
+    idioma no provoca una segunda llamada y cada resumen es una sola petición.
+    """
+    texto = prompt.split("TEXT / TEXTO:", 1)[-1]
+    idioma = _idioma_pedido(prompt, texto)
+    resumen = " ".join(texto.split()[:palabras])
+    if detectar_idioma(resumen) == idioma:
+        return resumen
+    relleno = _RELLENO[idioma].split()
+    return " ".join((relleno * (palabras // len(relleno) + 1))[:palabras])
+
+
+def _crear_handler(estado: _Estado):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):  # silencioso
+            pass
+
+        def _responder(self, status: int, payload: dict, cabeceras: dict | None = None):
+            datos = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("content-type", "application/json")
+            self.send_header("content-length", str(len(datos)))
+            for k, v in (cabeceras or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(datos)
+
+        def do_POST(self):
+            largo = int(self.headers.get("content-length", 0))
+            body = json.loads(self.rfile.read(largo) or b"{}")
+            config = estado.config
+
+            if config.latencia or config.latencia_jitter:
+                espera = config.latencia + random.uniform(-config.latencia_jitter, config.latencia_jitter)
+                time.sleep(max(espera, 0.0))
+
+            respuesta = estado.siguiente_respuesta()
+
+            if respuesta == "colgar":
+                with estado.lock:
+                    estado.errores += 1
+                time.sleep(config.espera_colgado)
+                return
+
+            status = int(respuesta)
+            if status != 200:
+                with estado.lock:
+                    estado.errores += 1
+                cabeceras = {}
+                if config.retry_after is not None:
+                    cabeceras["retry-after"] = str(config.retry_after)
+                self._responder(
+                    status,
+                    {"type": "error", "error": {"type": "simulated_error", "message": f"Fallo simulado {status}"}},
+                    cabeceras,
+                )
+                return
+
+            prompt = body.get("messages", [{}])[-1].get("content", "")
+            texto = _resumen_simulado(prompt, config.palabras_resumen)
+            self._responder(
+                200,
+                {
+                    "id": f"msg_simulado_{estado.peticiones}",
+                    "type": "message",
+                    "role": "assistant",
+                    "model": body.get("model", ""),
+                    "content": [{"type": "text", "text": texto}],
+                    "stop_reason": "end_turn",
+                    "usage": {
+                        "input_tokens": max(len(prompt) // 4, 1),
+                        "output_tokens": max(len(texto) // 4, 1),
+                    },
+                },
+            )
+
+    return Handler
+
+
+def iniciar_servidor(config: ConfigFallos | None = None, puerto: int = 0, host: str = "127.0.0.1"):
+    """
+    Arranca el servidor en un hilo daemon.
+    Devuelve (servidor, url_messages, estado) — estado lleva los contadores.
+    """
+    estado = _Estado(config or ConfigFallos())
+    servidor = ThreadingHTTPServer((host, puerto), _crear_handler(estado))
+    servidor.daemon_threads = True
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    url = f"http://{host}:{servidor.server_address[1]}/v1/messages"
+    return servidor, url, estado
+
+
+def _parsear_secuencia(valor: str) -> list:
+    return [p if p == "colgar" else int(p) for p in (x.strip() for x in valor.split(",")) if p]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API de Anthropic simulada con inyección de fallos.")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--tasa-error", type=float, default=0.0)
+    parser.add_argument("--codigos", default="429,529,503", help="Códigos de error a elegir al azar.")
+    parser.add_argument("--retry-after", type=float, default=None)
+    parser.add_argument("--latencia", type=float, default=0.0)
+    parser.add_argument("--latencia-jitter", type=float, default=0.0)
+    parser.add_argument("--secuencia", default="", help='Respuestas forzadas en orden, p. ej. "429,529,200,colgar".')
+    parser.add_argument("--espera-colgado", type=float, default=120.0)
+    args = parser.parse_args()
+
+    config = ConfigFallos(
+        tasa_error=args.tasa_error,
+        codigos=[int(c) for c in args.codigos.split(",") if c.strip()],
+        retry_after=args.retry_after,
+        latencia=args.latencia,
+        latencia_jitter=args.latencia_jitter,
+        secuencia=_parsear_secuencia(args.secuencia),
+        espera_colgado=args.espera_colgado,
+    )
+    servidor, url, _ = iniciar_servidor(config, puerto=args.puerto)
+    print(f"API simulada escuchando en {url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        servidor.shutdown()
@@ -1,18 +1,23 @@
-import io
-from datetime import datetime
 import base64
-import fitz  # PyMuPDF
 import streamlit as st
-import docx
-from docx import Document
-from docx.shared import Inches, Pt, RGBColor
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.enum.style import WD_STYLE_TYPE
-from docx.enum.text import WD_LINE_SPACING
 
 
-from summary_claude import resumir_con_claude
+from resumen_especulativo import clave_noticia, resumenes_previos
+from gestor_tareas import obtener_gestor
+from duplicados import MODOS_DUPLICADOS, preparar_envios
+from analisis_pdf import analizar_pdf, titulo_y_medio_envio
+from archivo_huellas import obtener_archivo_huellas
+from archivo_prensa import obtener_archivo_prensa
+from reporte_dia import obtener_reporte_dia
+from consumo_api import obtener_almacen_consumo
+from trazas import PERFIL_ACTIVO, TRAZAS_ACTIVAS, Traza, trazando
+from datetime import date, timedelta
+import hashlib
 import hmac
+import json
+import re
+from collections import Counter
+import uuid
 
 def check_password():
     """
@@ -42,7 +47,9 @@ if not check_password():
     st.stop()
 
 
+@st.cache_resource(show_spinner=False)
 def cargar_imagen_base64(ruta: str) -> str:
+    """Se codifica una sola vez por proceso (no en cada rerun)."""
     with open(ruta, "rb") as f:
         datos = f.read()
     return base64.b64encode(datos).decode("utf-8")
@@ -70,395 +77,6 @@ st.markdown(
 
 
 
-# ======== Función para agregar hipervínculos en python-docx ========
-
-from docx.oxml import OxmlElement
-from docx.oxml.ns import qn
-
-def add_hyperlink(paragraph, url, text, color="0000EE", underline=True):
-    """
-    Inserta un hipervínculo en un párrafo de python-docx.
-    """
-    part = paragraph.part
-    r_id = part.relate_to(
-        url,
-        docx.opc.constants.RELATIONSHIP_TYPE.HYPERLINK,
-        is_external=True,
-    )
-
-    # Crear tag <w:hyperlink>
-    hyperlink = OxmlElement("w:hyperlink")
-    hyperlink.set(qn("r:id"), r_id)
-
-    # Crear run <w:r>
-    r = OxmlElement("w:r")
-    rPr = OxmlElement("w:rPr")
-
-    # Color
-    if color:
-        c = OxmlElement("w:color")
-        c.set(qn("w:val"), color)
-        rPr.append(c)
-
-    # Subrayado
-    if underline:
-        u = OxmlElement("w:u")
-        u.set(qn("w:val"), "single")
-        rPr.append(u)
-
-    r.append(rPr)
-
-    r_text = OxmlElement("w:t")
-    r_text.text = text
-    r.append(r_text)
-
-    hyperlink.append(r)
-    paragraph._p.append(hyperlink)
-
-    return hyperlink
-
-# ======== CONFIG MEDIOS Y FUNCIÓN PARA SEPARAR TÍTULO / MEDIO ========
-
-MEDIOS_CONOCIDOS = {
-    "Reuters",
-    "Bloomberg",
-    "CNBC",
-    "The Wall Street Journal",
-    "MarketWatch",
-    "Financial Times",
-    "Fox Business",
-    "The Guardian",
-    "The New York Times",
-    "El País",
-    "EL PAÍS",
-    "El Economista",}
-
-
-def separar_titulo_y_medio(titulo_completo: str):
-    """
-    Recibe algo como:
-      'ECB Officials Lobby for Rival Bank Rule Plans Before Report, Bloomberg'
-    y devuelve:
-      ('ECB Officials Lobby for Rival Bank Rule Plans Before Report', 'Bloomberg')
-
-    Si no reconoce el medio, devuelve (titulo_completo, '').
-    """
-    t = titulo_completo.strip()
-
-    # Quitar punto final suelto, si lo hay
-    if t.endswith("."):
-        t = t[:-1].strip()
-
-    partes = [p.strip() for p in t.split(",") if p.strip()]
-    if len(partes) < 2:
-        return t, ""
-
-    posible_medio = partes[-1]
-
-    # Caso directo: la última parte es exactamente un medio conocido
-    if posible_medio in MEDIOS_CONOCIDOS:
-        titulo_sin_medio = ", ".join(partes[:-1]).strip()
-        return titulo_sin_medio, posible_medio
-
-    # Caso en que el medio venga mezclado, ej. 'Fox Business, Reuters'
-    for medio in MEDIOS_CONOCIDOS:
-        if medio in posible_medio:
-            titulo_sin_medio = ", ".join(partes[:-1]).strip()
-            return titulo_sin_medio, medio
-
-    # Si no logramos identificar medio, devolvemos todo como título
-    return t, ""
-
-
-# ======== LÓGICA DE PDF ========
-# ======== Títulos completos desde la portada (página 0) ========
-def obtener_titulos_portada(doc, pagina_indice: int):
-    """
-    Extrae la lista de títulos de la página donde viene el índice
-    (bullet points con los títulos + medio).
-    """
-    page = doc.load_page(pagina_indice)
-    texto = page.get_text("text")
-
-    lineas = []
-    for linea in texto.splitlines():
-        linea = linea.strip("• \n\t")
-        if not linea:
-            continue
-        # Aquí puedes mantener el mismo criterio de filtrado que ya usabas
-        lineas.append(linea)
-
-    return lineas
-
-def detectar_titulos(doc, pagina_indice: int):
-    """
-    1) Detecta los títulos en las páginas de los artículos (como antes),
-       usando tamaño, negritas, etc. -> obtiene (titulo_interno, página).
-    2) Luego busca cada titulo_interno dentro de la lista de títulos de la
-       página de índice y, si lo encuentra, lo sustituye por el título
-       completo que trae el periódico al final.
-    """
-
-    textos_excluidos = {"Uso General", "Información"}
-
-    # 1) Detectar títulos internos
-    titulos_raw = []
-
-    # Las noticias empiezan justo después de la página de índice:
-    #   - Si NO hay portada: índice = 0 → noticias desde 1
-    #   - Si SÍ hay portada: índice = 1 → noticias desde 2
-    for page_num in range(pagina_indice + 1, doc.page_count):
-        page = doc.load_page(page_num)
-        texto_dict = page.get_text("dict")
-        blocks = texto_dict["blocks"]
-
-        for block in blocks:
-            if block["type"] != 0:
-                continue
-
-            for line in block["lines"]:
-                spans = line.get("spans", [])
-                if not spans:
-                    continue
-
-                full_text = "".join(span["text"] for span in spans).strip()
-                font = spans[0]["font"]
-                size = spans[0]["size"]
-                es_negrita = "bold" in font.lower()
-
-                if (
-                    full_text
-                    and es_negrita
-                    and size >= 12
-                    and len(full_text) >= 25
-                    and full_text not in textos_excluidos
-                ):
-                    # Guardamos título interno y página donde inicia (1-based)
-                    titulos_raw.append((full_text, page_num + 1))
-                    break
-
-    # 2) Enriquecer con los títulos completos de la página de índice
-    titulos_portada = obtener_titulos_portada(doc, pagina_indice)
-
-    titulos_enriquecidos = []
-    for texto, pagina in titulos_raw:
-        titulo_completo = texto
-        for linea in titulos_portada:
-            if texto in linea:
-                titulo_completo = linea
-                break
-        titulos_enriquecidos.append((titulo_completo, pagina))
-
-    return titulos_enriquecidos
-
-
-def extraer_noticias_completas(doc, titulos_detectados):
-    noticias = []
-    for i, (titulo, pagina_inicio) in enumerate(titulos_detectados):
-        if i + 1 < len(titulos_detectados):
-            pagina_siguiente = titulos_detectados[i + 1][1]
-            pagina_fin = pagina_siguiente - 1
-        else:
-            pagina_fin = doc.page_count
-
-        texto = ""
-        for num in range(pagina_inicio - 1, pagina_fin):
-            page = doc.load_page(num)
-            texto += page.get_text()
-
-        noticias.append(
-            {
-                "titulo": titulo,
-                "pagina_inicio": pagina_inicio,
-                "pagina_fin": pagina_fin,
-                "paginas": list(range(pagina_inicio, pagina_fin + 1)),
-                "texto": texto.strip(),
-            }
-        )
-    return noticias
-
-
-def abrir_pdf_desde_bytes(pdf_bytes: bytes):
-    return fitz.open(stream=pdf_bytes, filetype="pdf")
-
-
-# ======== LÓGICA PARA CREAR EL WORD ========
-
-def formatear_fecha_larga():
-    hoy = datetime.now()
-    dia = hoy.day
-    mes_en = hoy.strftime("%B").lower()
-
-    meses = {
-        "january": "enero",
-        "february": "febrero",
-        "march": "marzo",
-        "april": "abril",
-        "may": "mayo",
-        "june": "junio",
-        "july": "julio",
-        "august": "agosto",
-        "september": "septiembre",
-        "october": "octubre",
-        "november": "noviembre",
-        "december": "diciembre",
-    }
-
-    mes_es = meses.get(mes_en, mes_en)
-    año = hoy.year
-    return f"{dia} de {mes_es} de {año}"
-
-def generar_nombre_archivo():
-    hoy = datetime.now()
-    dia = hoy.strftime("%d")              # 06
-    mes_en = hoy.strftime("%B").lower()   # january
-
-    meses = {
-        "january": "enero", "february": "febrero", "march": "marzo",
-        "april": "abril", "may": "mayo", "june": "junio",
-        "july": "julio", "august": "agosto", "september": "septiembre",
-        "october": "octubre", "november": "noviembre", "december": "diciembre"
-    }
-    mes_es = meses.get(mes_en, mes_en)
-
-    return f"reporte de prensa {dia} de {mes_es}.docx"
-
-
-
-def generar_reporte_word_en_memoria(resumenes, ruta_logo: str | None = None, pdf_url: str | None = None):
-    doc = Document()
-
-    # Márgenes un poco más amplios de texto (más ancho útil)
-    for section in doc.sections:
-        section.left_margin = Inches(1)   # ~2.54 cm -> puedes bajar a 0.9 si quieres aún más ancho
-        section.right_margin = Inches(1)
-        section.top_margin = Inches(0.5)      # prueba 0.6 / 0.5 / 0.4
-        section.bottom_margin = Inches(1)     # opcional
-
-    # Estilo por defecto del documento: Times New Roman 11
-    normal_style = doc.styles["Normal"]
-    normal_style.font.name = "Times New Roman"
-    normal_style.font.size = Pt(11)
-
-    # Estilo de hipervínculo: si no existe, lo creamos
-    try:
-        hyperlink_style = doc.styles["Hyperlink"]
-    except KeyError:
-        hyperlink_style = doc.styles.add_style("Hyperlink", WD_STYLE_TYPE.CHARACTER)
-
-    hyperlink_style.font.name = "Times New Roman"
-    hyperlink_style.font.size = Pt(11)
-
-    # Encabezado con tabla
-    table = doc.add_table(rows=1, cols=2)
-    table.autofit = False
-    row = table.rows[0]
-    row.cells[0].width = Inches(3)
-    row.cells[1].width = Inches(3)
-
-    # Logo
-    if ruta_logo:
-        try:
-            row.cells[0].paragraphs[0].add_run().add_picture(
-                ruta_logo, width=Inches(1.2)
-            )
-        except Exception:
-            # si falla el logo, seguimos sin detenernos
-            pass
-
-    # Fecha
-    p_fecha = row.cells[1].paragraphs[0]
-    p_fecha.alignment = WD_ALIGN_PARAGRAPH.RIGHT
-    run_fecha = p_fecha.add_run(formatear_fecha_larga())
-    run_fecha.font.name = "Arial"
-    run_fecha.font.size = Pt(17)
-
-    # Gerencia
-    p_gg = doc.add_paragraph()
-    p_gg.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    run_gg = p_gg.add_run("Gerencia de Asuntos Económicos Internacionales")
-    run_gg.font.name = "Arial"
-    run_gg.font.size = Pt(17)
-
-    # Línea divisoria
-    p_linea = doc.add_paragraph()
-    p_linea.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    p_linea.paragraph_format.space_before = Pt(5)
-    run_linea = p_linea.add_run(
-        "_____________________________________________________________"
-    )
-    run_linea.font.color.rgb = RGBColor(0, 0, 0)
-
-    # Título principal
-    p_titulo = doc.add_paragraph()
-    p_titulo.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    run_titulo = p_titulo.add_run("REPORTE DE PRENSA")
-    run_titulo.bold = True
-    run_titulo.font.name = "Arial"
-    run_titulo.font.size = Pt(28.5)
-
-    doc.add_paragraph()
-
-      # Contenido de resúmenes
-    for item in resumenes:
-        medio = item.get("medio", "").strip()
-        titulo = item["titulo"]
-        resumen = item["resumen"]
-        pagina_inicio = item.get("pagina_inicio")  # puede ser None si no se llenó
-
-        # ======= MEDIO =======
-        if medio:
-            p_medio = doc.add_paragraph()
-            p_medio.paragraph_format.space_before = Pt(6)
-            p_medio.paragraph_format.space_after = Pt(0)
-            run_medio = p_medio.add_run(medio)
-            run_medio.bold = True
-            run_medio.font.name = "Times New Roman"
-            run_medio.font.size = Pt(11)
-
-        # ======= TÍTULO (CON HIPERVÍNCULO SI HAY URL Y PÁGINA) =======
-        p_t = doc.add_paragraph()
-        p_t.paragraph_format.space_before = Pt(0)
-        p_t.paragraph_format.space_after = Pt(0)
-
-        if pdf_url and pagina_inicio:
-            # Construimos la URL: <pdf_url>#page=N
-            link_url = f"{pdf_url}#page={pagina_inicio}"
-            add_hyperlink(p_t, link_url, titulo)
-
-            # Formato del hipervínculo (Times 11 negrita)
-            for run in p_t.runs:
-                run.font.name = "Times New Roman"
-                run.font.size = Pt(11)
-                run.bold = True
-        else:
-            # Si no tenemos URL o página, se comporta como antes
-            run_t = p_t.add_run(titulo)
-            run_t.bold = True
-            run_t.font.name = "Times New Roman"
-            run_t.font.size = Pt(11)
-
-        # ======= RESUMEN =======
-        p_r = doc.add_paragraph(resumen)
-        p_r.paragraph_format.space_before = Pt(0)
-        p_r.paragraph_format.space_after = Pt(6)
-        # Interlineado 1.0 (single)
-        p_r.paragraph_format.line_spacing_rule = WD_LINE_SPACING.SINGLE
-        p_r.paragraph_format.line_spacing = 1.0
-        p_r.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
-        for run in p_r.runs:
-            run.font.name = "Times New Roman"
-            run.font.size = Pt(11)
-
-        doc.add_paragraph()
-
-    # Guardar en memoria (no en disco)
-    buffer = io.BytesIO()
-    doc.save(buffer)
-    buffer.seek(0)
-    return generar_nombre_archivo(), buffer
-
-
 # ======== INTERFAZ STREAMLIT ========
 
 LOGO_PATH = "logo_bx.png"  # si está en tu carpeta
@@ -510,69 +128,452 @@ st.markdown(
     unsafe_allow_html=True
 )
 
+# === Sesión de trabajo (sobrevive a reruns y a refrescos del navegador) ===
+def obtener_id_sesion() -> str:
+    """
+    El id viaja en la URL (?sesion=...) para que al refrescar la pestaña se
+    recuperen las tareas en curso en el gestor. Solo se acepta un uuid4 en
+    hexadecimal: el id se usa en rutas de disco y en el mapa de sesiones.
+    """
+    sid = st.query_params.get("sesion")
+    if not sid or not re.fullmatch(r"[0-9a-f]{32}", sid):
+        sid = uuid.uuid4().hex
+        st.query_params["sesion"] = sid
+    return sid
+
+
+# === Búsqueda en el archivo histórico (fragmento: escribir aquí no recarga la app) ===
+LIMITE_BUSQUEDA = 50
+
+
+@st.fragment
+def panel_busqueda():
+    archivo_prensa = obtener_archivo_prensa()
+    st.header("Buscar en reportes anteriores")
+    texto = st.text_input("Palabras clave", key="busqueda_texto")
+    col_desde, col_hasta = st.columns(2)
+    desde = col_desde.date_input("Desde", value=None, key="busqueda_desde")
+    hasta = col_hasta.date_input("Hasta", value=None, key="busqueda_hasta")
+    medio = st.selectbox("Medio", ["Todos", *archivo_prensa.medios()], key="busqueda_medio")
+
+    if not (texto.strip() or desde or hasta or medio != "Todos"):
+        st.caption(f"{archivo_prensa.total_resumenes()} resúmenes archivados.")
+        return
+
+    resultados = archivo_prensa.buscar(
+        texto,
+        desde.isoformat() if desde else None,
+        hasta.isoformat() if hasta else None,
+        None if medio == "Todos" else medio,
+        limite=LIMITE_BUSQUEDA,
+    )
+    aviso = " (se muestran los más recientes)" if len(resultados) == LIMITE_BUSQUEDA else ""
+    st.caption(f"{len(resultados)} resultados{aviso}")
+    for r in resultados:
+        with st.expander(f"{r.fecha} · {r.titulo}" + (f" · {r.medio}" if r.medio else "")):
+            st.markdown(r.fragmento)
+            st.caption(r.archivo)
+            st.write(r.resumen)
+
+
+with st.sidebar:
+    panel_busqueda()
+
+
+# === Consumo de la API (tokens y coste), del día y del PDF actual ===
+DIAS_EXPORTAR_CONSUMO = 30
+ARTICULOS_MAS_CAROS = 5
+
+
+def _linea_consumo(total: dict) -> str:
+    linea = (
+        f"{total['llamadas']} llamadas · {total['tokens_entrada']:,} tokens de entrada · "
+        f"{total['tokens_salida']:,} de salida · US$ {total['costo_usd']:.4f}"
+    )
+    if total["reintentos"] or total["fallidas"]:
+        linea += f" · {total['reintentos']} reintentos, {total['fallidas']} fallidas"
+    return linea
+
+
+def panel_consumo(pdf_sha256: str, pdf_nombre: str):
+    almacen = obtener_almacen_consumo()
+    st.header("Consumo de la API")
+    hoy = date.today().isoformat()
+    dias = almacen.por_dia(hoy, hoy)
+    st.markdown("**Hoy:** " + (_linea_consumo(dias[0]) if dias else "sin llamadas."))
+
+    datos_reporte = None
+    if pdf_sha256:
+        total = almacen.resumen_documento(pdf_sha256)
+        if total["llamadas"]:
+            st.markdown(f"**Este PDF:** {_linea_consumo(total)}")
+            articulos = almacen.articulos_documento(pdf_sha256)
+            with st.expander("Notas más caras"):
+                for a in articulos[:ARTICULOS_MAS_CAROS]:
+                    st.caption(
+                        f"{a['articulo'] or '(sin título)'}: US$ {a['costo_usd']:.4f} · "
+                        f"{a['tokens_entrada'] + a['tokens_salida']:,} tokens · {a['llamadas']} llamadas"
+                    )
+            datos_reporte = {"documento": pdf_sha256, "reporte": pdf_nombre, **total, "articulos": articulos}
+            if total["modelos_sin_precio"]:
+                st.caption(f"Sin precio para: {', '.join(total['modelos_sin_precio'])} (coste incompleto).")
+
+    datos = almacen.exportar((date.today() - timedelta(days=DIAS_EXPORTAR_CONSUMO)).isoformat(), hoy)
+    if datos_reporte is not None:
+        datos["reporte_actual"] = datos_reporte
+    st.download_button(
+        label=f"Exportar consumo ({DIAS_EXPORTAR_CONSUMO} días, JSON)",
+        data=json.dumps(datos, ensure_ascii=False, indent=2),
+        file_name=f"consumo_api_{hoy}.json",
+        mime="application/json",
+    )
+
+
+def panel_diagnostico(traza: Traza | None):
+    """Oculto salvo con ?trazas=1 en la URL o PRENSA_TRAZAS=1: trazas por etapa y cProfile."""
+    st.header("Diagnóstico")
+    st.checkbox("Trazar el próximo PDF (tiempos por etapa)", value=TRAZAS_ACTIVAS, key="trazar_pdf")
+    st.checkbox("Perfilar también con cProfile", value=PERFIL_ACTIVO, key="perfilar_pdf")
+    if traza is None:
+        st.caption("Sin traza: se empieza a trazar al pulsar «Detectar noticias en el PDF».")
+        return
+    eventos = traza.eventos()
+    st.caption(f"Traza de {traza.nombre}: {len(eventos)} tramos en {traza.duracion_s():.1f} s.")
+    base = traza.nombre.rsplit(".", 1)[0] or "traza"
+    st.download_button(
+        label="Descargar traza (Chrome trace, JSON)",
+        data=json.dumps(traza.exportar(), ensure_ascii=False),
+        file_name=f"{base}.trace.json",
+        mime="application/json",
+    )
+    if traza.tiene_perfil():
+        st.download_button(
+            label="Descargar perfil (cProfile, .prof)",
+            data=traza.perfil_bytes(),
+            file_name=f"{base}.prof",
+            mime="application/octet-stream",
+        )
+
+
+# Miniaturas por página de la vista previa de la lista
+MINIATURAS_POR_PAGINA = 8
+
+
+def edicion_archivada(sesion, tarea_pdf, noticias) -> tuple[int, dict]:
+    """La edición (PDF) en el archivo de prensa, registrada una vez por análisis."""
+    edicion = sesion.datos.get("edicion")
+    if edicion is None or edicion[0] != tarea_pdf.id:
+        edicion_id, articulos = obtener_archivo_prensa().registrar_edicion(
+            sesion.datos.get("pdf_nombre", ""), sesion.datos.get("pdf_sha256", ""), noticias
+        )
+        edicion = sesion.datos["edicion"] = (tarea_pdf.id, edicion_id, articulos)
+    return edicion[1], edicion[2]
+
+
+gestor = obtener_gestor()
+id_sesion = obtener_id_sesion()
+sesion = gestor.sesion(id_sesion)
+if gestor.fue_expulsada(id_sesion):
+    st.info("Tu sesión anterior estuvo inactiva y se liberó para ahorrar memoria; vuelve a cargar el PDF.")
+
 # === Carga del PDF y URL ===
 uploaded_pdf = st.file_uploader("Sube el PDF de prensa", type=["pdf"])
 
 pdf_url = st.text_input(
     "Pega aquí la URL del PDF (para que los títulos apunten a la página correcta):",
-    value=st.session_state.get("pdf_url", ""),
+    value=sesion.datos.get("pdf_url", ""),
 )
-st.session_state["pdf_url"] = pdf_url
+sesion.datos["pdf_url"] = pdf_url
 
 # === Selector: ¿el PDF tiene portada? ===
+# Por defecto la página de índice sale del perfil de maquetación de la fuente (perfiles_pdf.py)
 tiene_portada = st.radio(
     "¿Este PDF tiene una portada (página inicial solo con portada/logo antes del índice)?",
-    options=("Sí, tiene portada", "No, empieza directamente con el índice"),
+    options=("Detectar automáticamente", "Sí, tiene portada", "No, empieza directamente con el índice"),
     index=0,
 )
 
+resumir_en_segundo_plano = st.checkbox(
+    "Empezar a resumir en segundo plano en cuanto se detecten las noticias",
+    value=sesion.datos.get("resumir_en_segundo_plano", False),
+    help="Los resúmenes se van generando mientras revisas la lista; "
+         "las noticias que deselecciones se cancelan.",
+)
+sesion.datos["resumir_en_segundo_plano"] = resumir_en_segundo_plano
+
 if uploaded_pdf is not None:
     st.success(f"Archivo cargado: {uploaded_pdf.name}")
-    pdf_bytes = uploaded_pdf.read()
-    doc_pdf = abrir_pdf_desde_bytes(pdf_bytes)
 
     if st.button("Detectar noticias en el PDF"):
         # Si tiene portada: la página de índice es la 2 (índice=1)
         # Si no tiene portada: el índice está en la página 1 (índice=0)
-        pagina_indice = 1 if tiene_portada.startswith("Sí") else 0
+        # Automático (None): la del perfil guardado para esta maquetación o la que detecten las heurísticas
+        pagina_indice = None
+        if tiene_portada.startswith("Sí"):
+            pagina_indice = 1
+        elif tiene_portada.startswith("No"):
+            pagina_indice = 0
+
+        # Un PDF nuevo invalida lo que se estuviera resumiendo del anterior
+        sesion.reiniciar_resumenes()
+        # El PDF se vuelca a un archivo temporal de la sesión: no queda una copia en memoria
+        ruta_pdf = sesion.guardar_pdf(uploaded_pdf.getbuffer())
+        sesion.datos["pdf_nombre"] = uploaded_pdf.name
+        sesion.datos["pdf_sha256"] = hashlib.sha256(uploaded_pdf.getbuffer()).hexdigest()
+        gestor.miniaturas.olvidar_fallidas(sesion.datos["pdf_sha256"])
+        # Traza opcional de este PDF (panel "Diagnóstico"): la heredan las tareas que se lancen
+        sesion.datos.pop("traza", None)
+        if st.session_state.get("trazar_pdf", TRAZAS_ACTIVAS):
+            sesion.datos["traza"] = Traza(
+                uploaded_pdf.name, perfil=st.session_state.get("perfilar_pdf", PERFIL_ACTIVO)
+            )
+        with trazando(sesion.datos.get("traza")):
+            gestor.enviar_pdf(id_sesion, "pdf", analizar_pdf, ruta_pdf, pagina_indice)
 
-        titulos_detectados = detectar_titulos(doc_pdf, pagina_indice)
-        if not titulos_detectados:
-            st.warning("No se detectaron títulos con los criterios actuales.")
-        else:
-            st.session_state["titulos"] = titulos_detectados
-            st.session_state["pdf_bytes"] = pdf_bytes
-            st.session_state["pagina_indice"] = pagina_indice
-            st.success(f"Se detectaron {len(titulos_detectados)} noticias.")
+
+# === Progreso de la detección (solo se consulta mientras la tarea sigue viva) ===
+tarea_pdf = sesion.tareas.get("pdf")
+
+if tarea_pdf is not None and not tarea_pdf.terminada():
+    @st.fragment(run_every=1.0)
+    def progreso_deteccion():
+        if tarea_pdf.terminada():
+            st.rerun()
+        total = max(tarea_pdf.total, 1)
+        st.progress(min(tarea_pdf.hechos / total, 1.0), text=tarea_pdf.mensaje or "Analizando el PDF...")
+
+    progreso_deteccion()
+
+elif tarea_pdf is not None and tarea_pdf.estado() == "error":
+    st.error(f"No se pudo analizar el PDF: {tarea_pdf.error()}")
 
 
 # === Selección de noticias y resúmenes ===
-if "titulos" in st.session_state:
-    st.subheader("Noticias detectadas")
+analisis = tarea_pdf.resultado() if tarea_pdf is not None else None
+
+if analisis is not None and analisis["origen_perfil"] != "manual":
+    st.caption(
+        f"Índice en la página {analisis['pagina_indice'] + 1} "
+        + ("(perfil guardado de esta fuente)." if analisis["origen_perfil"] == "cache" else "(detectado automáticamente).")
+    )
+
+if analisis is not None and not analisis["titulos"]:
+    st.warning("No se detectaron títulos con los criterios actuales.")
 
-    doc_pdf = abrir_pdf_desde_bytes(st.session_state["pdf_bytes"])
-    titulos_detectados = st.session_state["titulos"]
-    noticias = extraer_noticias_completas(doc_pdf, titulos_detectados)
+elif analisis is not None:
+    noticias = analisis["noticias"]
+    grupos = analisis["grupos"]
+    grupos_duplicados = [g for g in grupos if len(g) > 1]
+
+    st.success(f"Se detectaron {len(noticias)} noticias.")
+
+    modo_duplicados = "separadas"
+    if grupos_duplicados:
+        lineas = "\n".join(
+            "- " + " ≈ ".join(f"{i+1}. {noticias[i].titulo}" for i in grupo)
+            for grupo in grupos_duplicados
+        )
+        st.info(f"Se encontraron {len(grupos_duplicados)} grupos de noticias casi duplicadas:\n\n{lineas}")
+        modo_duplicados = st.radio(
+            "¿Qué hacer con las noticias duplicadas?",
+            options=list(MODOS_DUPLICADOS),
+            format_func=MODOS_DUPLICADOS.get,
+            index=1,
+            key=f"modo_duplicados_{tarea_pdf.id}",
+        )
+
+    vistas = analisis["vistas"]
+    previos_permitidos = {}
+    if vistas:
+        lineas = "\n".join(
+            f"- {i+1}. {n.titulo} — vista el {vistas[n.pagina_inicio].fecha}"
+            for i, n in enumerate(noticias)
+            if n.pagina_inicio in vistas
+        )
+        st.info(f"{len(vistas)} noticias ya se reportaron antes:\n\n{lineas}")
+        if st.checkbox(
+            "Reutilizar el resumen anterior de las noticias ya reportadas",
+            value=True,
+            key=f"reutilizar_{tarea_pdf.id}",
+        ):
+            previos_permitidos = vistas
+
+    # Reporte del día: las notas que ya están igual en el reporte de hoy no se vuelven a resumir
+    notas_dia = obtener_reporte_dia().total()
+    actualizar_dia = st.checkbox(
+        "Añadir estas noticias al reporte de hoy (solo se resumen las nuevas o corregidas)",
+        value=True,
+        key=f"reporte_dia_{tarea_pdf.id}",
+    )
+    sesion.datos["actualizar_dia"] = actualizar_dia
+    previos_dia = {}
+    if actualizar_dia and notas_dia:
+        clave_dia = (tarea_pdf.id, modo_duplicados, notas_dia)
+        if sesion.datos.get("estado_dia", (None,))[0] != clave_dia:
+            todos_dia = preparar_envios(noticias, grupos, range(len(noticias)), modo_duplicados)
+            sesion.datos["estado_dia"] = (clave_dia, todos_dia, obtener_reporte_dia().clasificar(todos_dia))
+        _, todos_dia, estados_dia = sesion.datos["estado_dia"]
+        previos_dia = {
+            clave_noticia(e): nota.resumen for e, (estado, nota) in zip(todos_dia, estados_dia) if estado == "igual"
+        }
+        # Una corrección no hereda el resumen archivado de la versión anterior
+        corregidas = {e["pagina_inicio"] for e, (estado, _) in zip(todos_dia, estados_dia) if estado == "cambiada"}
+        previos_permitidos = {p: v for p, v in previos_permitidos.items() if p not in corregidas}
+        conteo = Counter(estado for estado, _ in estados_dia)
+        st.info(
+            f"El reporte de hoy ya tiene {notas_dia} notas. De este PDF: {conteo['igual']} sin cambios "
+            f"(se mantiene su resumen), {conteo['cambiada']} corregidas (se vuelven a resumir y reemplazan "
+            f"a la anterior) y {conteo['nueva']} nuevas."
+        )
+
+    # El consumo de la API se apunta a este PDF (panel "Consumo de la API")
+    etiquetas_consumo = {
+        "reporte": sesion.datos.get("pdf_nombre", ""),
+        "documento": sesion.datos.get("pdf_sha256", ""),
+    }
+
+    # Resumen especulativo: se lanza una sola vez por PDF, al terminar la detección
+    if resumir_en_segundo_plano and not sesion.datos.get("especulacion_lanzada") == tarea_pdf.id:
+        todos = preparar_envios(noticias, grupos, range(len(noticias)), modo_duplicados)
+        with trazando(sesion.datos.get("traza")):
+            gestor.resumir(
+                id_sesion, todos, {**resumenes_previos(todos, previos_permitidos), **previos_dia}, etiquetas_consumo
+            )
+        sesion.datos["especulacion_lanzada"] = tarea_pdf.id
 
-    opciones = [f"{i+1}. {n['titulo']}" for i, n in enumerate(noticias)]
+    st.subheader("Noticias detectadas")
+
+    opciones = [f"{i+1}. {n.titulo}" for i, n in enumerate(noticias)]
     seleccion = st.multiselect(
         "Elige las noticias que quieres resumir:",
         options=opciones,
         default=opciones,
+        key=f"seleccion_{tarea_pdf.id}",
     )
 
+    # Vista previa opcional: miniaturas de la primera página, solo de las noticias
+    # visibles y renderizadas en segundo plano (la lista se pinta sin esperarlas)
+    if sesion.ruta_pdf is not None and st.checkbox(
+        "Mostrar vista previa de las noticias", key=f"vista_previa_{tarea_pdf.id}"
+    ):
+        paginas_vista = -(-len(noticias) // MINIATURAS_POR_PAGINA)
+        pagina_vista = 1
+        if paginas_vista > 1:
+            pagina_vista = st.number_input(
+                f"Página de la vista previa (de {paginas_vista})",
+                min_value=1,
+                max_value=paginas_vista,
+                value=1,
+                key=f"pagina_vista_{tarea_pdf.id}",
+            )
+        inicio_vista = (pagina_vista - 1) * MINIATURAS_POR_PAGINA
+        visibles = list(enumerate(noticias))[inicio_vista:inicio_vista + MINIATURAS_POR_PAGINA]
+        pdf_sha256 = sesion.datos.get("pdf_sha256", "")
+        miniaturas = gestor.miniaturas.pedir(sesion.ruta_pdf, pdf_sha256, [n.pagina_inicio for _, n in visibles])
+        cargando = gestor.miniaturas.pendientes(pdf_sha256) > 0
+
+        columnas = st.columns(4)
+        for j, (i, n) in enumerate(visibles):
+            with columnas[j % 4]:
+                png = miniaturas.get(n.pagina_inicio)
+                if png is not None:
+                    st.image(png, caption=f"{i+1}. {n.titulo}")
+                else:
+                    st.caption(f"{i+1}. {n.titulo} — " + ("cargando vista previa..." if cargando else "sin vista previa"))
+
+        if cargando:
+            @st.fragment(run_every=1.0)
+            def esperar_miniaturas():
+                if gestor.miniaturas.pendientes(pdf_sha256) == 0:
+                    st.rerun()
+
+            esperar_miniaturas()
+
     indices = [opciones.index(op) for op in seleccion]
-    noticias_seleccionadas = [noticias[i] for i in indices]
+    # Con duplicados, se resume por grupo (representante o combinado) y no por noticia
+    envios = preparar_envios(noticias, grupos, indices, modo_duplicados)
+    claves_seleccionadas = [clave_noticia(e) for e in envios]
+
+    resumidor = sesion.resumidor
+    if resumidor is not None:
+        resumidor.ajustar_seleccion(claves_seleccionadas)
+        if "seleccion" not in sesion.datos:
+            hechos, total = resumidor.progreso()
+            st.caption(f"Resúmenes en segundo plano: {hechos} de {total} listos.")
 
     if st.button("Generar resúmenes de las noticias seleccionadas"):
-        resumenes_para_word = []
-        with st.spinner("Generando resúmenes..."):
-            for i, noticia in enumerate(noticias_seleccionadas, 1):
-                titulo_completo = noticia["titulo"]
-                titulo_nota, medio = separar_titulo_y_medio(titulo_completo)
-
-                st.write(f"Resumiendo noticia {i}: {titulo_nota}")                
-                resumen = resumir_con_claude(noticia["texto"], titulo=noticia.get("titulo", ""))
+        # Lo ya resumido (o en curso) se reutiliza; solo se encola lo que falta
+        previos = {**resumenes_previos(envios, previos_permitidos), **previos_dia}
+        with trazando(sesion.datos.get("traza")):
+            resumidor = gestor.resumir(id_sesion, envios, previos, etiquetas_consumo)
+        resumidor.ajustar_seleccion(claves_seleccionadas)
+        sesion.datos["reutilizadas"] = set(previos)
+        sesion.datos["sin_cambios_dia"] = set(previos_dia)
+        sesion.datos["seleccion"] = envios
+        sesion.datos.pop("resumenes", None)
+
+    seleccion_pedida = sesion.datos.get("seleccion")
+    if seleccion_pedida is not None and resumidor is not None:
+        claves_pedidas = [clave_noticia(e) for e in seleccion_pedida]
+        pendientes = [c for c in claves_pedidas if resumidor.estado(c) in ("en_curso", None)]
+
+        if pendientes:
+            @st.fragment(run_every=1.0)
+            def progreso_resumenes():
+                hechos, total = resumidor.progreso(set(claves_pedidas))
+                if all(resumidor.estado(c) not in ("en_curso", None) for c in claves_pedidas):
+                    st.rerun()
+                st.progress(hechos / max(total, 1), text=f"Generando resúmenes... {hechos} de {total}")
+
+            progreso_resumenes()
+        else:
+            resumenes_para_word = []
+            envios_para_word = []  # los envíos de cada resumen, para el reporte del día
+            fallidas = []
+            archivadas = sesion.datos.setdefault("archivadas", set())
+            reutilizadas = sesion.datos.get("reutilizadas", set())
+            sin_cambios_dia = sesion.datos.get("sin_cambios_dia", set())
+            extractivas = sesion.datos.setdefault("extractivas", set())
+            en_archivo_prensa = sesion.datos.setdefault("en_archivo_prensa", set())
+            for i, envio in enumerate(seleccion_pedida, 1):
+                titulo_nota, medio = titulo_y_medio_envio(envio)
+                clave = clave_noticia(envio)
+                resumen = resumidor.recoger(clave, esperar=False)
+                if resumen is None:
+                    # Incluye CircuitoAbiertoError (falla rápido si la API está caída)
+                    fallidas.append((envio, titulo_nota, resumidor.error(clave) or "cancelada"))
+                    continue
+
+                if clave in sin_cambios_dia:
+                    st.caption("Sin cambios respecto al reporte de hoy: se mantiene su resumen.")
+                elif clave in reutilizadas:
+                    st.caption(f"Resumen reutilizado (vista el {vistas[envio['pagina_inicio']].fecha}).")
+                elif clave in extractivas:
+                    # No se archiva: no debe reutilizarse otro día en lugar de uno de la API
+                    st.caption("Resumen extractivo local (sin API): conviene revisarlo.")
+                elif clave not in archivadas:
+                    # Cada nota cubierta queda archivada para detectar reimpresiones otros días
+                    archivo = obtener_archivo_huellas()
+                    for miembro in envio["grupo"]:
+                        archivo.registrar(miembro.huella, miembro.titulo, resumen)
+                    archivadas.add(clave)
+
+                if (tarea_pdf.id, clave) not in en_archivo_prensa:
+                    # Archivo histórico buscable: todo lo reportado, con su origen
+                    edicion_id, articulos = edicion_archivada(sesion, tarea_pdf, noticias)
+                    obtener_archivo_prensa().registrar_resumen(
+                        edicion_id,
+                        titulo_nota,
+                        medio,
+                        resumen,
+                        [articulos[m.pagina_inicio] for m in envio["grupo"]],
+                        "reutilizado" if clave in reutilizadas else "extractivo" if clave in extractivas else "api",
+                    )
+                    en_archivo_prensa.add((tarea_pdf.id, clave))
+
+                st.write(f"Noticia {i}: {titulo_nota}")
+                if len(envio["grupo"]) > 1:
+                    st.caption(f"Cubre {len(envio['grupo'])} notas casi duplicadas.")
                 st.markdown(f"**Resumen {i}:**")
                 st.write(resumen)
 
@@ -581,23 +582,66 @@ if "titulos" in st.session_state:
                         "titulo": titulo_nota,
                         "medio": medio,
                         "resumen": resumen,
-                        "pagina_inicio": noticia["pagina_inicio"],
+                        "pagina_inicio": envio["pagina_inicio"],
                     }
                 )
-
-        st.session_state["resumenes"] = resumenes_para_word
-        st.success("Resúmenes generados.")
+                envios_para_word.append(envio)
+
+            if resumenes_para_word:
+                sesion.datos["resumenes"] = resumenes_para_word
+                sesion.datos["envios_resumidos"] = envios_para_word
+            if fallidas:
+                detalle = "\n".join(f"- {titulo}: {error}" for _, titulo, error in fallidas)
+                st.warning(
+                    f"No se pudieron resumir {len(fallidas)} noticias; "
+                    f"las demás ya están guardadas.\n\n{detalle}"
+                )
+                col_reintentar, col_local = st.columns(2)
+                if col_reintentar.button("Reintentar solo las fallidas"):
+                    resumidor.reintentar_fallidas(set(claves_pedidas))
+                    st.rerun()
+                if col_local.button("Usar un resumen extractivo local para las fallidas"):
+                    from resumen_extractivo import resumen_extractivo  # NumPy solo si hace falta
+
+                    for envio, _, _ in fallidas:
+                        texto = "\n".join(envio["textos"]) if "textos" in envio else envio["texto"]
+                        clave = clave_noticia(envio)
+                        resumidor.fijar_resultado(clave, resumen_extractivo(texto))
+                        extractivas.add(clave)
+                    st.rerun()
+            else:
+                st.success("Resúmenes generados.")
 
 
 # === Generar y descargar el Word ===
-if "resumenes" in st.session_state:
+if "resumenes" in sesion.datos:
     st.subheader("Generar y descargar el reporte en Word")
     if st.button("Crear reporte de prensa"):
-        nombre_archivo, buffer = generar_reporte_word_en_memoria(
-            st.session_state["resumenes"],
-            LOGO_PATH,
-            st.session_state.get("pdf_url", ""),
-        )
+        from gen_reporte import generar_reporte_word_en_memoria  # python-docx solo al generar
+
+        resumenes_word = sesion.datos["resumenes"]
+        pdf_url_word = sesion.datos.get("pdf_url", "")
+        if sesion.datos.get("actualizar_dia"):
+            # Se añaden o reemplazan solo las notas nuevas o corregidas; el Word lleva todas
+            # las del día y las que no cambiaron reutilizan su XML ya renderizado
+            reporte_dia = obtener_reporte_dia()
+            nuevas, reemplazadas = reporte_dia.actualizar(
+                zip(sesion.datos.get("envios_resumidos", []), resumenes_word),
+                sesion.datos.get("pdf_nombre", ""),
+                sesion.datos.get("pdf_url", ""),
+            )
+            resumenes_word = reporte_dia.items()
+            pdf_url_word = None  # cada nota enlaza al PDF del que salió
+            st.caption(
+                f"Reporte de hoy: {len(resumenes_word)} notas ({nuevas} nuevas y {reemplazadas} "
+                "reemplazadas con este PDF)."
+            )
+        with trazando(sesion.datos.get("traza")):
+            nombre_archivo, buffer = generar_reporte_word_en_memoria(
+                resumenes_word,
+                LOGO_PATH,
+                pdf_url_word,
+            )
         st.download_button(
             label="Descargar reporte de prensa",
             data=buffer,
@@ -607,3 +651,10 @@ if "resumenes" in st.session_state:
                 "wordprocessingml.document"
             ),
         )
+
+
+with st.sidebar:
+    # Al final del script: incluye las llamadas de los resúmenes recién recogidos
+    panel_consumo(sesion.datos.get("pdf_sha256", ""), sesion.datos.get("pdf_nombre", ""))
+    if TRAZAS_ACTIVAS or PERFIL_ACTIVO or st.query_params.get("trazas") == "1":
+        panel_diagnostico(sesion.datos.get("traza"))
@@ -0,0 +1,161 @@
+"""
+Archivo persistente de huellas de noticias ya reportadas (entre días).
+
+Cada noticia resumida se guarda con su huella SimHash (duplicados.py), la
+fecha y el resumen producido. Al procesar un PDF nuevo, cada nota se busca
+aquí: si una reimpresión o seguimiento ya se reportó, se marca como "vista el
+día X" y se ofrece reutilizar el resumen anterior en lugar de pedir otro.
+
+La búsqueda usa las mismas 4 bandas de 16 bits que duplicados.py, cada una
+con su índice en SQLite: una consulta por banda devuelve pocos candidatos y
+solo esos se comparan por distancia de Hamming (sub-milisegundo aun con
+decenas de miles de notas archivadas).
+
+Solo cuentan las notas de días anteriores: volver a procesar hoy el mismo PDF
+no lo marca como "ya visto" (eso lo resuelve reporte_dia.py). Una nota se
+guarda una vez por día (volver a registrarla actualiza su resumen) y las que
+no tienen huella (texto casi vacío, ver duplicados.py) no se guardan ni se buscan.
+"""
+import os
+import sqlite3
+import threading
+from datetime import date
+from pathlib import Path
+
+from duplicados import HUELLA_VACIA, UMBRAL_HAMMING, bandas_huella, distancia_hamming, huella_simhash
+
+RUTA_ARCHIVO_HUELLAS = os.getenv(
+    "PRENSA_HUELLAS_DB",
+    str(Path(__file__).resolve().parent / "huellas_noticias.sqlite3"),
+)
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS huellas (
+    id INTEGER PRIMARY KEY,
+    huella INTEGER NOT NULL,
+    b0 INTEGER NOT NULL,
+    b1 INTEGER NOT NULL,
+    b2 INTEGER NOT NULL,
+    b3 INTEGER NOT NULL,
+    fecha TEXT NOT NULL,
+    titulo TEXT NOT NULL,
+    resumen TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_huellas_b0 ON huellas(b0);
+CREATE INDEX IF NOT EXISTS idx_huellas_b1 ON huellas(b1);
+CREATE INDEX IF NOT EXISTS idx_huellas_b2 ON huellas(b2);
+CREATE INDEX IF NOT EXISTS idx_huellas_b3 ON huellas(b3);
+"""
+
+# Archivos creados antes de que registrar fuera idempotente: se quitan las filas
+# repetidas (y las de textos sin huella) antes de crear el índice único
+_MIGRACION_UNICA = """
+DELETE FROM huellas WHERE huella = 0
+    OR id NOT IN (SELECT MAX(id) FROM huellas GROUP BY huella, fecha);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_huellas_unica ON huellas(huella, fecha);
+"""
+
+
+def _a_sqlite(huella: int) -> int:
+    # SQLite guarda enteros de 64 bits con signo
+    return huella - (1 << 64) if huella >= (1 << 63) else huella
+
+
+def _desde_sqlite(valor: int) -> int:
+    return valor + (1 << 64) if valor < 0 else valor
+
+
+class Coincidencia:
+    __slots__ = ("fecha", "titulo", "resumen", "distancia")
+
+    def __init__(self, fecha: str, titulo: str, resumen: str, distancia: int):
+        self.fecha = fecha
+        self.titulo = titulo
+        self.resumen = resumen
+        self.distancia = distancia
+
+
+class ArchivoHuellas:
+    def __init__(self, ruta: str = RUTA_ARCHIVO_HUELLAS):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(ruta, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_ESQUEMA)
+        existe = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_huellas_unica'"
+        ).fetchone()
+        if existe is None:
+            self._conn.executescript(_MIGRACION_UNICA)
+
+    def registrar(self, huella: int, titulo: str, resumen: str, fecha: str | None = None) -> None:
+        """Guarda la nota del día `fecha`; si ya estaba ese día, se actualiza."""
+        if huella == HUELLA_VACIA:
+            return
+        fecha = fecha or date.today().isoformat()
+        bandas = bandas_huella(huella)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO huellas (huella, b0, b1, b2, b3, fecha, titulo, resumen) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(huella, fecha) DO UPDATE SET titulo = excluded.titulo, resumen = excluded.resumen",
+                (_a_sqlite(huella), *bandas, fecha, titulo, resumen),
+            )
+
+    def registrar_texto(self, texto: str, titulo: str, resumen: str, fecha: str | None = None) -> None:
+        self.registrar(huella_simhash(texto), titulo, resumen, fecha)
+
+    def buscar(self, huella: int, umbral: int = UMBRAL_HAMMING, antes_de: str | None = None) -> Coincidencia | None:
+        """
+        La coincidencia más cercana (y, a igual distancia, la más reciente) entre
+        las notas de días anteriores a `antes_de` (por defecto hoy), o None.
+        """
+        if huella == HUELLA_VACIA:
+            return None
+        antes_de = antes_de or date.today().isoformat()
+        b0, b1, b2, b3 = bandas_huella(huella)
+        with self._lock:
+            filas = self._conn.execute(
+                "SELECT huella, fecha, titulo, resumen FROM huellas WHERE b0 = ? AND fecha < ? "
+                "UNION ALL SELECT huella, fecha, titulo, resumen FROM huellas WHERE b1 = ? AND fecha < ? "
+                "UNION ALL SELECT huella, fecha, titulo, resumen FROM huellas WHERE b2 = ? AND fecha < ? "
+                "UNION ALL SELECT huella, fecha, titulo, resumen FROM huellas WHERE b3 = ? AND fecha < ?",
+                (b0, antes_de, b1, antes_de, b2, antes_de, b3, antes_de),
+            ).fetchall()
+
+        mejor = None
+        for valor, fecha, titulo, resumen in filas:
+            distancia = distancia_hamming(huella, _desde_sqlite(valor))
+            if distancia > umbral:
+                continue
+            if (
+                mejor is None
+                or distancia < mejor.distancia
+                or (distancia == mejor.distancia and fecha > mejor.fecha)
+            ):
+                mejor = Coincidencia(fecha, titulo, resumen, distancia)
+        return mejor
+
+    def buscar_texto(self, texto: str, umbral: int = UMBRAL_HAMMING, antes_de: str | None = None) -> Coincidencia | None:
+        return self.buscar(huella_simhash(texto), umbral, antes_de)
+
+    def total(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM huellas").fetchone()[0]
+
+    def cerrar(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_ARCHIVO: ArchivoHuellas | None = None
+_ARCHIVO_LOCK = threading.Lock()
+
+
+def obtener_archivo_huellas() -> ArchivoHuellas:
+    """Archivo único por proceso, abierto en el primer uso."""
+    global _ARCHIVO
+    with _ARCHIVO_LOCK:
+        if _ARCHIVO is None:
+            _ARCHIVO = ArchivoHuellas()
+        return _ARCHIVO
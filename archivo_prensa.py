@@ -0,0 +1,287 @@
+"""
+Archivo histórico de reportes de prensa (SQLite + FTS5), de solo anexado.
+
+Cada PDF procesado (edición) queda guardado con todas sus notas detectadas
+(título, medio, páginas y hash del texto) y con los resúmenes que se
+reportaron. Los resúmenes tienen un índice de texto completo FTS5 (sin
+distinguir acentos) y las tablas índices por fecha y medio, así que "qué
+reportamos sobre el gusano barrenador el mes pasado" es una consulta de
+milisegundos aun con años de reportes.
+
+Nada se actualiza ni se borra: unos triggers lo impiden.
+
+    python archivo_prensa.py "gusano barrenador" --desde 2026-09-01 --medio Reuters
+"""
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from datetime import date, datetime
+from pathlib import Path
+
+from analisis_pdf import separar_titulo_y_medio
+
+RUTA_ARCHIVO_PRENSA = os.getenv(
+    "PRENSA_ARCHIVO_DB",
+    str(Path(__file__).resolve().parent / "archivo_prensa.sqlite3"),
+)
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS ediciones (
+    id INTEGER PRIMARY KEY,
+    fecha TEXT NOT NULL,
+    archivo TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    origen TEXT NOT NULL,
+    creada TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS articulos (
+    id INTEGER PRIMARY KEY,
+    edicion_id INTEGER NOT NULL REFERENCES ediciones(id),
+    fecha TEXT NOT NULL,
+    titulo TEXT NOT NULL,
+    medio TEXT NOT NULL,
+    pagina_inicio INTEGER NOT NULL,
+    pagina_fin INTEGER NOT NULL,
+    hash_texto TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS resumenes (
+    id INTEGER PRIMARY KEY,
+    edicion_id INTEGER NOT NULL REFERENCES ediciones(id),
+    fecha TEXT NOT NULL,
+    titulo TEXT NOT NULL,
+    medio TEXT NOT NULL,
+    resumen TEXT NOT NULL,
+    tipo TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS resumen_articulos (
+    resumen_id INTEGER NOT NULL REFERENCES resumenes(id),
+    articulo_id INTEGER NOT NULL REFERENCES articulos(id),
+    PRIMARY KEY (resumen_id, articulo_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_ediciones_fecha ON ediciones(fecha);
+CREATE INDEX IF NOT EXISTS idx_articulos_fecha ON articulos(fecha);
+CREATE INDEX IF NOT EXISTS idx_articulos_medio ON articulos(medio, fecha);
+CREATE INDEX IF NOT EXISTS idx_articulos_hash ON articulos(hash_texto);
+CREATE INDEX IF NOT EXISTS idx_resumenes_fecha ON resumenes(fecha);
+CREATE INDEX IF NOT EXISTS idx_resumen_articulos_articulo ON resumen_articulos(articulo_id);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS resumenes_fts USING fts5(
+    titulo, medio, resumen,
+    content='resumenes', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS resumenes_ai AFTER INSERT ON resumenes BEGIN
+    INSERT INTO resumenes_fts(rowid, titulo, medio, resumen)
+    VALUES (new.id, new.titulo, new.medio, new.resumen);
+END;
+"""
+
+# Solo anexado: cualquier UPDATE o DELETE sobre el archivo se rechaza
+_TABLAS = ("ediciones", "articulos", "resumenes", "resumen_articulos")
+_ESQUEMA += "".join(
+    f"""
+CREATE TRIGGER IF NOT EXISTS {tabla}_sin_update BEFORE UPDATE ON {tabla} BEGIN
+    SELECT RAISE(ABORT, 'archivo de prensa de solo anexado');
+END;
+CREATE TRIGGER IF NOT EXISTS {tabla}_sin_delete BEFORE DELETE ON {tabla} BEGIN
+    SELECT RAISE(ABORT, 'archivo de prensa de solo anexado');
+END;
+"""
+    for tabla in _TABLAS
+)
+
+_RE_TERMINO = re.compile(r"\w+", re.UNICODE)
+
+
+def hash_texto(texto: str) -> str:
+    return hashlib.sha256((texto or "").encode("utf-8")).hexdigest()
+
+
+def consulta_fts(texto: str) -> str:
+    """
+    Convierte lo que escribe el analista en una consulta FTS5 segura: cada
+    palabra entre comillas (todas deben aparecer) y la última como prefijo.
+    """
+    terminos = _RE_TERMINO.findall(texto or "")
+    if not terminos:
+        return ""
+    partes = [f'"{t}"' for t in terminos]
+    partes[-1] += "*"
+    return " ".join(partes)
+
+
+class ResultadoBusqueda:
+    __slots__ = ("fecha", "titulo", "medio", "resumen", "fragmento", "archivo", "tipo")
+
+    def __init__(self, fecha, titulo, medio, resumen, fragmento, archivo, tipo):
+        self.fecha = fecha
+        self.titulo = titulo
+        self.medio = medio
+        self.resumen = resumen
+        self.fragmento = fragmento
+        self.archivo = archivo
+        self.tipo = tipo
+
+
+class ArchivoPrensa:
+    def __init__(self, ruta: str = RUTA_ARCHIVO_PRENSA):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(ruta, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(_ESQUEMA)
+
+    def registrar_edicion(
+        self,
+        archivo: str,
+        sha256: str,
+        noticias,
+        fecha: str | None = None,
+        origen: str = "app",
+    ) -> tuple[int, dict[int, int]]:
+        """
+        Guarda una edición (PDF) con todas sus notas detectadas (analisis_pdf.Noticia).
+        Devuelve (id de la edición, {pagina_inicio: id del artículo}).
+        """
+        fecha = fecha or date.today().isoformat()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO ediciones (fecha, archivo, sha256, origen, creada) VALUES (?, ?, ?, ?, ?)",
+                (fecha, archivo, sha256, origen, datetime.now().isoformat(timespec="seconds")),
+            )
+            edicion_id = cursor.lastrowid
+            articulos = {}
+            for noticia in noticias:
+                titulo, medio = separar_titulo_y_medio(noticia.titulo, noticia.texto)
+                cursor = self._conn.execute(
+                    "INSERT INTO articulos (edicion_id, fecha, titulo, medio, pagina_inicio, pagina_fin, hash_texto) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (edicion_id, fecha, titulo, medio, noticia.pagina_inicio, noticia.pagina_fin,
+                     hash_texto(noticia.texto)),
+                )
+                articulos[noticia.pagina_inicio] = cursor.lastrowid
+        return edicion_id, articulos
+
+    def registrar_resumen(
+        self,
+        edicion_id: int,
+        titulo: str,
+        medio: str,
+        resumen: str,
+        articulos_ids,
+        tipo: str = "api",
+    ) -> int:
+        """
+        Guarda un resumen reportado y las notas que cubre. `tipo`: 'api',
+        'reutilizado' (del archivo de huellas) o 'extractivo' (local).
+        """
+        with self._lock, self._conn:
+            fecha = self._conn.execute("SELECT fecha FROM ediciones WHERE id = ?", (edicion_id,)).fetchone()[0]
+            cursor = self._conn.execute(
+                "INSERT INTO resumenes (edicion_id, fecha, titulo, medio, resumen, tipo) VALUES (?, ?, ?, ?, ?, ?)",
+                (edicion_id, fecha, titulo, medio or "", resumen, tipo),
+            )
+            resumen_id = cursor.lastrowid
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO resumen_articulos (resumen_id, articulo_id) VALUES (?, ?)",
+                [(resumen_id, articulo_id) for articulo_id in articulos_ids],
+            )
+        return resumen_id
+
+    def buscar(
+        self,
+        texto: str = "",
+        desde: str | None = None,
+        hasta: str | None = None,
+        medio: str | None = None,
+        limite: int = 50,
+    ) -> list[ResultadoBusqueda]:
+        """
+        Resúmenes reportados que contienen `texto` (título, medio o resumen), de
+        los archivados más recientemente a los más antiguos (orden de fecha salvo
+        PDFs viejos procesados tarde). Fechas ISO inclusivas; `medio` filtra por
+        cualquiera de las notas que cubre el resumen.
+        """
+        condiciones, parametros = [], []
+        consulta = consulta_fts(texto)
+        if consulta:
+            origen = "resumenes_fts JOIN resumenes r ON r.id = resumenes_fts.rowid"
+            fragmento = "snippet(resumenes_fts, -1, '**', '**', '…', 24)"
+            condiciones.append("resumenes_fts MATCH ?")
+            parametros.append(consulta)
+            # Orden nativo del índice (más recientes primero): FTS5 recorre las
+            # coincidencias de mayor a menor rowid y se detiene al llegar al límite
+            orden = "resumenes_fts.rowid DESC"
+        else:
+            origen = "resumenes r"
+            fragmento = "substr(r.resumen, 1, 200)"
+            orden = "r.fecha DESC, r.id DESC"
+        if desde:
+            condiciones.append("r.fecha >= ?")
+            parametros.append(desde)
+        if hasta:
+            condiciones.append("r.fecha <= ?")
+            parametros.append(hasta)
+        if medio:
+            condiciones.append(
+                "EXISTS (SELECT 1 FROM resumen_articulos ra JOIN articulos a ON a.id = ra.articulo_id "
+                "WHERE ra.resumen_id = r.id AND a.medio = ?)"
+            )
+            parametros.append(medio)
+
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        sql = (
+            f"SELECT r.fecha, r.titulo, r.medio, r.resumen, {fragmento}, e.archivo, r.tipo "
+            f"FROM {origen} JOIN ediciones e ON e.id = r.edicion_id "
+            f"{where} ORDER BY {orden} LIMIT ?"
+        )
+        with self._lock:
+            filas = self._conn.execute(sql, (*parametros, limite)).fetchall()
+        return [ResultadoBusqueda(*fila) for fila in filas]
+
+    def medios(self) -> list[str]:
+        with self._lock:
+            filas = self._conn.execute(
+                "SELECT DISTINCT medio FROM articulos WHERE medio != '' ORDER BY medio"
+            ).fetchall()
+        return [fila[0] for fila in filas]
+
+    def total_resumenes(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM resumenes").fetchone()[0]
+
+    def cerrar(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_ARCHIVO: ArchivoPrensa | None = None
+_ARCHIVO_LOCK = threading.Lock()
+
+
+def obtener_archivo_prensa() -> ArchivoPrensa:
+    """Archivo único por proceso, abierto en el primer uso."""
+    global _ARCHIVO
+    with _ARCHIVO_LOCK:
+        if _ARCHIVO is None:
+            _ARCHIVO = ArchivoPrensa()
+        return _ARCHIVO
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Busca en el archivo histórico de reportes de prensa.")
+    parser.add_argument("texto", nargs="?", default="", help="Palabras a buscar (título, medio o resumen).")
+    parser.add_argument("--desde", help="Fecha inicial (AAAA-MM-DD).")
+    parser.add_argument("--hasta", help="Fecha final (AAAA-MM-DD).")
+    parser.add_argument("--medio", help="Solo notas de este medio.")
+    parser.add_argument("--limite", type=int, default=20)
+    args = parser.parse_args()
+
+    for r in obtener_archivo_prensa().buscar(args.texto, args.desde, args.hasta, args.medio, args.limite):
+        print(f"{r.fecha}  {r.titulo}" + (f" ({r.medio})" if r.medio else ""))
+        print(f"    {r.fragmento}")
@@ -0,0 +1,300 @@
+"""
+Benchmark de punta a punta del flujo de reportes, con PDFs sintéticos y la API
+simulada (api_simulada.py): nunca llama a la API real.
+
+Para cada escala (número de artículos) genera con PyMuPDF un compendio como los
+reales —portada, página de índice con "• Título, Medio" y artículos de 1 a 3
+páginas con título en negritas de 14 pt, una imagen y encabezado/pie repetidos
+en cada página— y mide:
+
+  - detectar_titulos
+  - extraer_noticias_completas
+  - resumir_con_claude (contra la API simulada, con latencia y errores configurables)
+  - generar_reporte_word_en_memoria (sin la caché de reportes)
+
+Los resultados se guardan en JSON para compararlos entre cambios:
+
+    python benchmark.py --escalas 10,50,200 --salida benchmarks/antes.json
+    python benchmark.py --escalas 10,50,200 --comparar benchmarks/antes.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+LOGO = str(Path(__file__).resolve().parent / "logo_bx.png")
+ETAPAS = ("detectar_titulos", "extraer_noticias_completas", "resumir_con_claude", "generar_reporte_word_en_memoria")
+# Una etapa más lenta que la referencia en más de esto se marca como regresión
+TOLERANCIA_REGRESION = 0.15
+
+_PALABRAS = (
+    "the central bank said inflation rates markets growth economy trade oil prices investors "
+    "government policy bonds yields currency peso dollar tariffs exports jobs report quarter "
+    "analysts expected forecast demand supply energy banks credit housing consumers"
+).split()
+_MEDIOS = ("Reuters", "Bloomberg", "El País", "Financial Times", "The Wall Street Journal", "CNBC")
+
+
+def _oracion(rnd: random.Random) -> str:
+    palabras = [rnd.choice(_PALABRAS) for _ in range(rnd.randint(10, 24))]
+    return " ".join(palabras).capitalize() + "."
+
+
+def generar_pdf_sintetico(ruta, articulos: int, portada: bool = True, semilla: int = 0) -> int:
+    """
+    Escribe en `ruta` un compendio sintético con `articulos` notas. Devuelve
+    el número de páginas.
+    """
+    import fitz
+
+    rnd = random.Random(semilla)
+    doc = fitz.open()
+    imagen = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 160, 100), False)
+    imagen.set_rect(imagen.irect, (150, 40, 40))
+
+    if portada:
+        pagina = doc.new_page()
+        pagina.insert_text((72, 120), "Resumen de prensa internacional", fontsize=24, fontname="hebo")
+        pagina.insert_image(fitz.Rect(72, 200, 520, 480), pixmap=imagen)
+
+    titulos = [
+        f"Titular {i}: " + " ".join(rnd.choice(_PALABRAS) for _ in range(rnd.randint(5, 10)))
+        for i in range(articulos)
+    ]
+    # Todo el índice cabe en una página (la detección solo lee esa): la letra se encoge
+    indice = doc.new_page()
+    tamano = max(1.0, min(9.0, 760 / max(articulos, 1) / 1.3))
+    for i, titulo in enumerate(titulos):
+        indice.insert_text((40, 50 + i * tamano * 1.3), f"• {titulo}, {_MEDIOS[i % len(_MEDIOS)]}", fontsize=tamano)
+
+    for titulo in titulos:
+        for k in range(rnd.randint(1, 3)):
+            pagina = doc.new_page()
+            pagina.insert_text((50, 30), "Uso General", fontsize=8)
+            pagina.insert_text((480, 820), f"Página {doc.page_count}", fontsize=8)
+            y = 60
+            if k == 0:
+                pagina.insert_text((50, 70), titulo, fontsize=14, fontname="hebo")
+                pagina.insert_image(fitz.Rect(50, 90, 290, 240), pixmap=imagen)
+                y = 260
+            cuerpo = " ".join(_oracion(rnd) for _ in range(rnd.randint(15, 30)))
+            pagina.insert_textbox(fitz.Rect(50, y, 545, 800), cuerpo, fontsize=10)
+
+    doc.save(ruta)
+    paginas = doc.page_count
+    doc.close()
+    return paginas
+
+
+def _estadisticas(tiempos: list[float]) -> dict:
+    ordenados = sorted(tiempos)
+    return {
+        "min_s": round(ordenados[0], 6),
+        "mediana_s": round(statistics.median(ordenados), 6),
+        "max_s": round(ordenados[-1], 6),
+    }
+
+
+def _percentil(valores: list[float], p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def medir_escala(
+    ruta_pdf, articulos: int, paginas: int, repeticiones: int, resumenes: int, hilos: int, estado_api
+) -> dict:
+    """Tiempos de cada etapa en `repeticiones` pasadas completas sobre el PDF."""
+    import fitz
+
+    import gen_reporte
+    from analisis_pdf import detectar_titulos, extraer_noticias_completas, separar_titulo_y_medio
+    from summary_claude import resumir_con_claude
+
+    tiempos = {etapa: [] for etapa in ETAPAS}
+    llamadas, errores_api, fallidas = [], 0, 0
+    for _ in range(repeticiones):
+        doc = fitz.open(ruta_pdf)
+        try:
+            inicio = time.perf_counter()
+            titulos = detectar_titulos(doc, 1)
+            tiempos["detectar_titulos"].append(time.perf_counter() - inicio)
+
+            inicio = time.perf_counter()
+            noticias = extraer_noticias_completas(doc, titulos)
+            tiempos["extraer_noticias_completas"].append(time.perf_counter() - inicio)
+        finally:
+            doc.close()
+        if len(noticias) != articulos:
+            raise Exception(f"Se detectaron {len(noticias)} noticias de {articulos}")
+
+        # Resúmenes de una muestra (la etapa la domina la latencia de la API)
+        muestra = noticias[:resumenes]
+        peticiones_antes, errores_antes = estado_api.peticiones, estado_api.errores
+
+        def resumir(noticia):
+            inicio = time.perf_counter()
+            try:
+                resumen = resumir_con_claude(noticia.texto, titulo=noticia.titulo)
+            except Exception:
+                resumen = None
+            return resumen, time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=hilos) as pool:
+            resultados = list(pool.map(resumir, muestra))
+        tiempos["resumir_con_claude"].append(time.perf_counter() - inicio)
+        llamadas.extend(segundos for _, segundos in resultados)
+        fallidas += sum(1 for resumen, _ in resultados if resumen is None)
+        errores_api += estado_api.errores - errores_antes
+        peticiones = estado_api.peticiones - peticiones_antes
+
+        # El reporte lleva todas las noticias (los resúmenes de la muestra se repiten)
+        textos = [r for r, _ in resultados if r] or ["Resumen."]
+        items = []
+        for i, noticia in enumerate(noticias):
+            titulo, medio = separar_titulo_y_medio(noticia.titulo)
+            items.append({
+                "titulo": titulo,
+                "medio": medio,
+                "resumen": textos[i % len(textos)],
+                "pagina_inicio": noticia.pagina_inicio,
+            })
+        # En frío: ni el reporte ni los fragmentos de las notas vienen de la caché
+        with gen_reporte._cache_lock:
+            gen_reporte._cache_reportes.clear()
+            gen_reporte._cache_fragmentos.clear()
+        inicio = time.perf_counter()
+        _, buffer = gen_reporte.generar_reporte_word_en_memoria(items, LOGO, "https://ejemplo.org/prensa.pdf")
+        tiempos["generar_reporte_word_en_memoria"].append(time.perf_counter() - inicio)
+
+    return {
+        "articulos": articulos,
+        "paginas": paginas,
+        "etapas": {etapa: _estadisticas(t) for etapa, t in tiempos.items()},
+        "api": {
+            "resumenes_por_repeticion": len(muestra),
+            "peticiones_por_repeticion": peticiones,
+            "errores_simulados": errores_api,
+            "fallidas": fallidas,
+            "llamada_p50_s": round(_percentil(llamadas, 0.50), 6),
+            "llamada_p95_s": round(_percentil(llamadas, 0.95), 6),
+        },
+        "reporte_bytes": len(buffer.getvalue()),
+    }
+
+
+def comparar(actual: dict, referencia: dict, tolerancia: float = TOLERANCIA_REGRESION) -> int:
+    """Imprime la mediana de cada etapa frente a la referencia; devuelve cuántas empeoraron."""
+    previas = {r["articulos"]: r for r in referencia["resultados"]}
+    regresiones = 0
+    print(f"\nComparación con {referencia.get('fecha', '?')} (mediana; >{tolerancia:.0%} = regresión)")
+    distintas = [
+        clave for clave, valor in actual["config"].items()
+        if clave not in ("escalas", "tolerancia") and referencia.get("config", {}).get(clave) != valor
+    ]
+    if distintas:
+        print(f"  Aviso: la configuración cambió ({', '.join(distintas)}); los tiempos no son comparables del todo.")
+    for resultado in actual["resultados"]:
+        previo = previas.get(resultado["articulos"])
+        if previo is None:
+            continue
+        for etapa in ETAPAS:
+            antes = previo["etapas"][etapa]["mediana_s"]
+            ahora = resultado["etapas"][etapa]["mediana_s"]
+            cambio = (ahora - antes) / antes if antes else 0.0
+            marca = ""
+            if cambio > tolerancia:
+                marca = "  <-- más lento"
+                regresiones += 1
+            elif cambio < -tolerancia:
+                marca = "  (más rápido)"
+            print(
+                f"  {resultado['articulos']:>5} art.  {etapa:<32} {antes * 1000:9.1f} ms -> "
+                f"{ahora * 1000:9.1f} ms  {cambio:+7.1%}{marca}"
+            )
+    return regresiones
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark del flujo completo con PDFs sintéticos y API simulada.")
+    parser.add_argument("--escalas", default="10,50,200", help="Números de artículos, separados por comas.")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--resumenes", type=int, default=20, help="Artículos resumidos por repetición.")
+    parser.add_argument("--hilos-api", type=int, default=4, help="Llamadas simultáneas a la API simulada.")
+    parser.add_argument("--latencia", type=float, default=0.05, help="Latencia de la API simulada (s).")
+    parser.add_argument("--latencia-jitter", type=float, default=0.0)
+    parser.add_argument("--tasa-error", type=float, default=0.0, help="Probabilidad de 429/529/503 simulados.")
+    parser.add_argument("--backoff-base", type=float, default=0.05, help="Backoff entre reintentos (s).")
+    parser.add_argument("--salida", help="JSON de resultados (por defecto benchmarks/benchmark_<fecha>.json).")
+    parser.add_argument("--comparar", help="JSON de una ejecución anterior para comparar.")
+    parser.add_argument(
+        "--tolerancia",
+        type=float,
+        default=TOLERANCIA_REGRESION,
+        help="Aumento relativo de la mediana a partir del cual una etapa cuenta como regresión.",
+    )
+    args = parser.parse_args(argv)
+
+    from api_simulada import ConfigFallos, iniciar_servidor
+
+    servidor, url, estado = iniciar_servidor(
+        ConfigFallos(latencia=args.latencia, latencia_jitter=args.latencia_jitter, tasa_error=args.tasa_error)
+    )
+    # Siempre contra la API simulada, aunque haya una clave real en .env
+    os.environ["ANTHROPIC_API_URL"] = url
+    os.environ["ANTHROPIC_API_KEY"] = "benchmark"
+    os.environ["ANTHROPIC_BACKOFF_BASE"] = str(args.backoff_base)
+
+    escalas = [int(e) for e in args.escalas.split(",") if e.strip()]
+    resultado = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "plataforma": platform.platform(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("salida", "comparar")},
+        "resultados": [],
+    }
+    try:
+        with tempfile.TemporaryDirectory(prefix="prensa_benchmark_") as directorio:
+            # Las llamadas simuladas no se suman al consumo real de la API
+            os.environ["PRENSA_CONSUMO_DB"] = str(Path(directorio) / "consumo_api.sqlite3")
+            for articulos in escalas:
+                ruta_pdf = Path(directorio) / f"sintetico_{articulos}.pdf"
+                paginas = generar_pdf_sintetico(ruta_pdf, articulos)
+                medicion = medir_escala(
+                    ruta_pdf, articulos, paginas, args.repeticiones, args.resumenes, args.hilos_api, estado
+                )
+                resultado["resultados"].append(medicion)
+
+                print(f"{articulos} artículos ({paginas} páginas):")
+                for etapa, t in medicion["etapas"].items():
+                    print(f"  {etapa:<32} mediana {t['mediana_s'] * 1000:9.1f} ms  (min {t['min_s'] * 1000:.1f})")
+                api = medicion["api"]
+                print(
+                    f"  API: {api['peticiones_por_repeticion']} peticiones, llamada p50 "
+                    f"{api['llamada_p50_s'] * 1000:.0f} ms / p95 {api['llamada_p95_s'] * 1000:.0f} ms, "
+                    f"{api['errores_simulados']} errores simulados, {api['fallidas']} fallidas"
+                )
+    finally:
+        servidor.shutdown()
+
+    salida = Path(args.salida or f"benchmarks/benchmark_{datetime.now():%Y%m%d-%H%M%S}.json")
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    salida.write_text(json.dumps(resultado, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"\nResultados en {salida}")
+
+    if args.comparar:
+        referencia = json.loads(Path(args.comparar).read_text(encoding="utf-8"))
+        return 1 if comparar(resultado, referencia, args.tolerancia) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,312 @@
+"""
+Consumo de la API de Anthropic: tokens, reintentos, latencia y coste de cada
+llamada, agregados por reporte y por día.
+
+summary_claude registra aquí cada llamada (incluida la segunda que se hace
+cuando el resumen sale en otro idioma) con el bloque `usage` de la respuesta.
+A qué reporte y nota pertenece se indica con `etiquetar(...)` alrededor de la
+llamada: el resumidor etiqueta cada nota en su hilo y la app o el lote pasan
+el reporte (nombre y hash del PDF).
+
+Las llamadas se guardan en consumo_api.sqlite3 (ruta configurable con
+PRENSA_CONSUMO_DB). El coste se calcula al consultar con PRECIOS_USD_MTOK, así
+que corregir un precio corrige también lo ya registrado.
+
+    python consumo_api.py --desde 2026-10-01 --salida consumo_octubre.json
+"""
+import argparse
+import contextvars
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+RUTA_CONSUMO = os.getenv(
+    "PRENSA_CONSUMO_DB",
+    str(Path(__file__).resolve().parent / "consumo_api.sqlite3"),
+)
+
+# USD por millón de tokens: (entrada, salida, escritura de caché, lectura de caché).
+# Se busca el prefijo más largo del nombre del modelo.
+PRECIOS_USD_MTOK = {
+    "claude-3-haiku": (0.25, 1.25, 0.30, 0.03),
+    "claude-3-5-haiku": (0.80, 4.00, 1.00, 0.08),
+    "claude-haiku-4-5": (1.00, 5.00, 1.25, 0.10),
+    "claude-3-5-sonnet": (3.00, 15.00, 3.75, 0.30),
+    "claude-3-7-sonnet": (3.00, 15.00, 3.75, 0.30),
+    "claude-sonnet-4": (3.00, 15.00, 3.75, 0.30),
+    "claude-3-opus": (15.00, 75.00, 18.75, 1.50),
+    "claude-opus-4": (15.00, 75.00, 18.75, 1.50),
+}
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS llamadas (
+    id INTEGER PRIMARY KEY,
+    fecha TEXT NOT NULL,
+    momento TEXT NOT NULL,
+    modelo TEXT NOT NULL,
+    motivo TEXT NOT NULL,
+    estado TEXT NOT NULL,
+    tokens_entrada INTEGER NOT NULL,
+    tokens_salida INTEGER NOT NULL,
+    tokens_cache_escritura INTEGER NOT NULL,
+    tokens_cache_lectura INTEGER NOT NULL,
+    intentos INTEGER NOT NULL,
+    latencia_s REAL NOT NULL,
+    origen TEXT NOT NULL,
+    reporte TEXT NOT NULL,
+    documento TEXT NOT NULL,
+    articulo TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_llamadas_fecha ON llamadas(fecha);
+CREATE INDEX IF NOT EXISTS idx_llamadas_documento ON llamadas(documento);
+"""
+
+_ETIQUETAS: contextvars.ContextVar[dict] = contextvars.ContextVar("etiquetas_consumo", default={})
+
+
+@contextmanager
+def etiquetar(**etiquetas):
+    """
+    Asocia las llamadas hechas dentro del bloque (en este hilo) a `origen`,
+    `reporte`, `documento` y/o `articulo`; se combina con las etiquetas externas.
+    """
+    token = _ETIQUETAS.set({**_ETIQUETAS.get(), **etiquetas})
+    try:
+        yield
+    finally:
+        _ETIQUETAS.reset(token)
+
+
+def precio_modelo(modelo: str) -> tuple | None:
+    coincidencias = [prefijo for prefijo in PRECIOS_USD_MTOK if modelo.startswith(prefijo)]
+    return PRECIOS_USD_MTOK[max(coincidencias, key=len)] if coincidencias else None
+
+
+def costo_usd(modelo: str, entrada: int, salida: int, cache_escritura: int = 0, cache_lectura: int = 0) -> float | None:
+    """Coste de unos tokens; None si el modelo no está en PRECIOS_USD_MTOK."""
+    precio = precio_modelo(modelo)
+    if precio is None:
+        return None
+    tokens = (entrada, salida, cache_escritura, cache_lectura)
+    return sum(t * p for t, p in zip(tokens, precio)) / 1_000_000
+
+
+class LlamadaAPI:
+    """Una llamada (con sus reintentos) a /v1/messages, tal como se registra."""
+
+    __slots__ = (
+        "modelo", "motivo", "estado", "tokens_entrada", "tokens_salida",
+        "tokens_cache_escritura", "tokens_cache_lectura", "intentos", "latencia_s",
+    )
+
+    def __init__(self, modelo: str, motivo: str):
+        self.modelo = modelo
+        self.motivo = motivo  # 'resumen', 'multifuente' o 'idioma' (segunda llamada)
+        self.estado = ""
+        self.tokens_entrada = 0
+        self.tokens_salida = 0
+        self.tokens_cache_escritura = 0
+        self.tokens_cache_lectura = 0
+        self.intentos = 0
+        self.latencia_s = 0.0
+
+    def leer_uso(self, datos: dict) -> None:
+        """Toma los tokens del bloque `usage` de la respuesta."""
+        uso = datos.get("usage") or {}
+        self.tokens_entrada = int(uso.get("input_tokens") or 0)
+        self.tokens_salida = int(uso.get("output_tokens") or 0)
+        self.tokens_cache_escritura = int(uso.get("cache_creation_input_tokens") or 0)
+        self.tokens_cache_lectura = int(uso.get("cache_read_input_tokens") or 0)
+
+
+def _agregar(filas) -> dict:
+    """Totales de filas (modelo, llamadas, fallidas, intentos, 4 tipos de tokens, latencia total, latencia max)."""
+    total = {
+        "llamadas": 0,
+        "fallidas": 0,
+        "reintentos": 0,
+        "tokens_entrada": 0,
+        "tokens_salida": 0,
+        "tokens_cache_escritura": 0,
+        "tokens_cache_lectura": 0,
+        "costo_usd": 0.0,
+        "latencia_media_s": 0.0,
+        "latencia_max_s": 0.0,
+        "modelos_sin_precio": [],
+    }
+    latencia_total = 0.0
+    for modelo, llamadas, fallidas, intentos, entrada, salida, escritura, lectura, latencia, latencia_max in filas:
+        total["llamadas"] += llamadas
+        total["fallidas"] += fallidas
+        total["reintentos"] += intentos - llamadas
+        total["tokens_entrada"] += entrada
+        total["tokens_salida"] += salida
+        total["tokens_cache_escritura"] += escritura
+        total["tokens_cache_lectura"] += lectura
+        latencia_total += latencia
+        total["latencia_max_s"] = max(total["latencia_max_s"], latencia_max)
+        costo = costo_usd(modelo, entrada, salida, escritura, lectura)
+        if costo is None:
+            total["modelos_sin_precio"].append(modelo)
+        else:
+            total["costo_usd"] += costo
+    if total["llamadas"]:
+        total["latencia_media_s"] = latencia_total / total["llamadas"]
+    total["costo_usd"] = round(total["costo_usd"], 6)
+    total["latencia_media_s"] = round(total["latencia_media_s"], 3)
+    total["latencia_max_s"] = round(total["latencia_max_s"], 3)
+    return total
+
+
+_COLUMNAS_AGREGADAS = (
+    "modelo, COUNT(*), SUM(estado != '200'), SUM(intentos), SUM(tokens_entrada), SUM(tokens_salida), "
+    "SUM(tokens_cache_escritura), SUM(tokens_cache_lectura), SUM(latencia_s), MAX(latencia_s)"
+)
+
+
+class AlmacenConsumo:
+    def __init__(self, ruta: str = RUTA_CONSUMO):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(ruta, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_ESQUEMA)
+
+    def registrar(self, llamada: LlamadaAPI, etiquetas: dict | None = None) -> None:
+        etiquetas = etiquetas or {}
+        ahora = datetime.now()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO llamadas (fecha, momento, modelo, motivo, estado, tokens_entrada, tokens_salida, "
+                "tokens_cache_escritura, tokens_cache_lectura, intentos, latencia_s, origen, reporte, documento, "
+                "articulo) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    ahora.date().isoformat(),
+                    ahora.isoformat(timespec="seconds"),
+                    llamada.modelo,
+                    llamada.motivo,
+                    llamada.estado,
+                    llamada.tokens_entrada,
+                    llamada.tokens_salida,
+                    llamada.tokens_cache_escritura,
+                    llamada.tokens_cache_lectura,
+                    llamada.intentos,
+                    round(llamada.latencia_s, 4),
+                    etiquetas.get("origen", "app"),
+                    etiquetas.get("reporte", ""),
+                    etiquetas.get("documento", ""),
+                    etiquetas.get("articulo", ""),
+                ),
+            )
+
+    def _consultar(self, sql: str, parametros=()) -> list:
+        with self._lock:
+            return self._conn.execute(sql, parametros).fetchall()
+
+    def resumen_documento(self, documento: str) -> dict:
+        """Totales de un reporte (todas las llamadas hechas para ese PDF)."""
+        filas = self._consultar(
+            f"SELECT {_COLUMNAS_AGREGADAS} FROM llamadas WHERE documento = ? GROUP BY modelo", (documento,)
+        )
+        return _agregar(filas)
+
+    def articulos_documento(self, documento: str) -> list[dict]:
+        """Coste por nota de un reporte, de la más cara a la más barata."""
+        filas = self._consultar(
+            f"SELECT articulo, {_COLUMNAS_AGREGADAS} FROM llamadas WHERE documento = ? "
+            "GROUP BY articulo, modelo",
+            (documento,),
+        )
+        por_articulo: dict[str, list] = {}
+        for articulo, *resto in filas:
+            por_articulo.setdefault(articulo, []).append(resto)
+        articulos = [{"articulo": a, **_agregar(f)} for a, f in por_articulo.items()]
+        articulos.sort(key=lambda a: (a["costo_usd"], a["tokens_entrada"] + a["tokens_salida"]), reverse=True)
+        return articulos
+
+    def por_dia(self, desde: str | None = None, hasta: str | None = None) -> list[dict]:
+        """Totales por día (fechas ISO inclusivas), del más reciente al más antiguo."""
+        filas = self._consultar(
+            f"SELECT fecha, {_COLUMNAS_AGREGADAS} FROM llamadas "
+            "WHERE fecha >= ? AND fecha <= ? GROUP BY fecha, modelo",
+            (desde or "0000-00-00", hasta or "9999-99-99"),
+        )
+        por_fecha: dict[str, list] = {}
+        for fecha, *resto in filas:
+            por_fecha.setdefault(fecha, []).append(resto)
+        return [{"fecha": f, **_agregar(por_fecha[f])} for f in sorted(por_fecha, reverse=True)]
+
+    def por_reporte(self, desde: str | None = None, hasta: str | None = None) -> list[dict]:
+        """Totales por reporte (PDF), con su primera fecha y nombre."""
+        filas = self._consultar(
+            f"SELECT documento, MIN(fecha), MAX(reporte), {_COLUMNAS_AGREGADAS} FROM llamadas "
+            "WHERE fecha >= ? AND fecha <= ? GROUP BY documento, modelo",
+            (desde or "0000-00-00", hasta or "9999-99-99"),
+        )
+        reportes: dict[str, dict] = {}
+        for documento, fecha, reporte, *resto in filas:
+            entrada = reportes.setdefault(documento, {"documento": documento, "fecha": fecha, "reporte": reporte, "filas": []})
+            entrada["fecha"] = min(entrada["fecha"], fecha)
+            entrada["filas"].append(resto)
+        resultado = []
+        for entrada in reportes.values():
+            filas_reporte = entrada.pop("filas")
+            resultado.append({**entrada, **_agregar(filas_reporte)})
+        resultado.sort(key=lambda r: r["fecha"], reverse=True)
+        return resultado
+
+    def exportar(self, desde: str | None = None, hasta: str | None = None) -> dict:
+        """Todo lo agregado entre dos fechas, listo para json.dumps."""
+        return {
+            "generado": datetime.now().isoformat(timespec="seconds"),
+            "desde": desde,
+            "hasta": hasta,
+            "precios_usd_mtok": PRECIOS_USD_MTOK,
+            "por_dia": self.por_dia(desde, hasta),
+            "por_reporte": self.por_reporte(desde, hasta),
+        }
+
+    def cerrar(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_ALMACEN: AlmacenConsumo | None = None
+_ALMACEN_LOCK = threading.Lock()
+
+
+def obtener_almacen_consumo() -> AlmacenConsumo:
+    """Almacén único por proceso, abierto en la primera llamada registrada."""
+    global _ALMACEN
+    with _ALMACEN_LOCK:
+        if _ALMACEN is None:
+            _ALMACEN = AlmacenConsumo()
+        return _ALMACEN
+
+
+def registrar_llamada(llamada: LlamadaAPI) -> None:
+    """Guarda la llamada con las etiquetas activas. Un fallo aquí nunca rompe un resumen."""
+    try:
+        obtener_almacen_consumo().registrar(llamada, _ETIQUETAS.get())
+    except sqlite3.Error:
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta el consumo de la API (por día y por reporte) a JSON.")
+    parser.add_argument("--desde", help="Fecha inicial (AAAA-MM-DD).")
+    parser.add_argument("--hasta", help="Fecha final (AAAA-MM-DD).")
+    parser.add_argument("--salida", help="Archivo JSON (por defecto se imprime).")
+    args = parser.parse_args()
+
+    datos = obtener_almacen_consumo().exportar(args.desde, args.hasta)
+    texto = json.dumps(datos, ensure_ascii=False, indent=2)
+    if args.salida:
+        Path(args.salida).write_text(texto, encoding="utf-8")
+        print(f"{len(datos['por_dia'])} días y {len(datos['por_reporte'])} reportes en {args.salida}")
+    else:
+        print(texto)
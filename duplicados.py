@@ -0,0 +1,169 @@
+"""
+Detección de noticias casi duplicadas dentro de un mismo PDF (SimHash).
+
+Los resúmenes de prensa suelen traer la misma nota de varios medios
+(reimpresiones de agencia, la misma pieza con otro titular...). Cada artículo
+se reduce a una huella SimHash de 64 bits a partir de sus shingles de palabras;
+dos textos casi iguales difieren en pocos bits. Para no comparar todos contra
+todos, las huellas se reparten en 4 bandas de 16 bits (LSH): si dos huellas
+difieren en 3 bits o menos, al menos una banda coincide exactamente, así que
+solo se comparan los artículos que comparten cubeta. Coste ~lineal.
+
+Nota: la huella es léxica; la misma historia escrita en otro idioma (Reuters
+en inglés vs. El País en español) no se detecta como duplicado. Los textos con
+muy pocas palabras (notas que son solo una imagen o un escaneo) no tienen
+huella (HUELLA_VACIA) y nunca se agrupan ni se comparan con nada.
+"""
+import hashlib
+import re
+import unicodedata
+
+BITS = 64
+BANDAS = 4
+BITS_BANDA = BITS // BANDAS
+UMBRAL_HAMMING = 3  # con 4 bandas, hasta 3 bits de diferencia se encuentran siempre
+TAMANO_SHINGLE = 3
+# Por debajo, el texto no basta para decir que dos notas son la misma
+MIN_PALABRAS_HUELLA = 20
+HUELLA_VACIA = 0
+
+_RE_PALABRA = re.compile(r"\w+", re.UNICODE)
+
+MODOS_DUPLICADOS = {
+    "separadas": "Resumir todas por separado",
+    "representante": "Resumir un representante por grupo",
+    "combinada": "Un resumen combinado con todas las fuentes del grupo",
+}
+
+
+def normalizar_texto(texto: str) -> list[str]:
+    """Minúsculas, sin acentos, solo palabras."""
+    t = unicodedata.normalize("NFKD", (texto or "").lower())
+    t = "".join(ch for ch in t if not unicodedata.combining(ch))
+    return _RE_PALABRA.findall(t)
+
+
+def _hash64(shingle: str) -> int:
+    # hash() de Python cambia entre procesos; blake2b es estable (necesario para archivarlas)
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def huella_simhash(texto: str) -> int:
+    """
+    Huella SimHash de 64 bits (entero sin signo); HUELLA_VACIA si el texto
+    tiene menos de MIN_PALABRAS_HUELLA palabras.
+    """
+    palabras = normalizar_texto(texto)
+    if len(palabras) < MIN_PALABRAS_HUELLA:
+        return HUELLA_VACIA
+    shingles = [
+        " ".join(palabras[i:i + TAMANO_SHINGLE])
+        for i in range(len(palabras) - TAMANO_SHINGLE + 1)
+    ]
+
+    pesos = [0] * BITS
+    for shingle in shingles:
+        h = _hash64(shingle)
+        for bit in range(BITS):
+            if (h >> bit) & 1:
+                pesos[bit] += 1
+            else:
+                pesos[bit] -= 1
+
+    huella = 0
+    for bit, peso in enumerate(pesos):
+        if peso > 0:
+            huella |= 1 << bit
+    return huella
+
+
+def distancia_hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def bandas_huella(huella: int) -> list[int]:
+    """Las 4 bandas de 16 bits de la huella (claves de las cubetas LSH)."""
+    mascara = (1 << BITS_BANDA) - 1
+    return [(huella >> (i * BITS_BANDA)) & mascara for i in range(BANDAS)]
+
+
+def agrupar_duplicados(textos: list[str], umbral: int = UMBRAL_HAMMING, huellas: list[int] | None = None) -> list[list[int]]:
+    """
+    Agrupa los textos casi duplicados. Devuelve una lista de grupos (índices de
+    `textos`), incluidos los de un solo elemento, en orden de primera aparición.
+    Si ya se calcularon las huellas, se pueden pasar en `huellas`. Los textos
+    sin huella (HUELLA_VACIA) quedan siempre solos.
+    """
+    if huellas is None:
+        huellas = [huella_simhash(t) for t in textos]
+    padre = list(range(len(textos)))
+
+    def raiz(i: int) -> int:
+        while padre[i] != i:
+            padre[i] = padre[padre[i]]
+            i = padre[i]
+        return i
+
+    cubetas: dict[tuple[int, int], list[int]] = {}
+    for i, huella in enumerate(huellas):
+        if huella == HUELLA_VACIA:
+            continue
+        for n_banda, banda in enumerate(bandas_huella(huella)):
+            candidatos = cubetas.setdefault((n_banda, banda), [])
+            for j in candidatos:
+                if raiz(i) != raiz(j) and distancia_hamming(huella, huellas[j]) <= umbral:
+                    padre[max(raiz(i), raiz(j))] = min(raiz(i), raiz(j))
+            candidatos.append(i)
+
+    grupos: dict[int, list[int]] = {}
+    for i in range(len(textos)):
+        grupos.setdefault(raiz(i), []).append(i)
+    return sorted(grupos.values(), key=lambda g: g[0])
+
+
+def _envio(noticia, miembros: list, **extra) -> dict:
+    return dict(
+        titulo=noticia.titulo,
+        pagina_inicio=noticia.pagina_inicio,
+        texto=noticia.texto,
+        huella=noticia.huella,
+        grupo=miembros,
+        **extra,
+    )
+
+
+def preparar_envios(noticias: list, grupos: list[list[int]], indices_seleccionados, modo: str) -> list[dict]:
+    """
+    Decide qué se manda a resumir (analisis_pdf.Noticia -> dict de envío) según
+    el modo elegido para los duplicados:
+      - 'separadas': cada noticia seleccionada tal cual.
+      - 'representante': solo la primera seleccionada de cada grupo.
+      - 'combinada': una noticia sintética por grupo con los textos de todas
+        las fuentes ('textos'/'titulos'), para un prompt multifuente.
+    Cada envío lleva 'grupo' con las noticias originales que cubre.
+    """
+    seleccion = sorted(set(indices_seleccionados))
+    if modo == "separadas":
+        return [_envio(noticias[i], [noticias[i]]) for i in seleccion]
+
+    grupo_de = {i: n_grupo for n_grupo, grupo in enumerate(grupos) for i in grupo}
+    por_grupo: dict[int, list[int]] = {}
+    for i in seleccion:
+        por_grupo.setdefault(grupo_de.get(i, -1 - i), []).append(i)
+
+    envios = []
+    for indices in por_grupo.values():
+        miembros = [noticias[i] for i in indices]
+        representante = miembros[0]
+        if modo == "combinada" and len(miembros) > 1:
+            envios.append(
+                _envio(
+                    representante,
+                    miembros,
+                    textos=[n.texto for n in miembros],
+                    titulos=[n.titulo for n in miembros],
+                )
+            )
+        else:
+            envios.append(_envio(representante, miembros))
+    return envios
@@ -0,0 +1,157 @@
+"""
+Escritor de .docx en streaming para el cuerpo del reporte de prensa.
+
+python-docx crea varios objetos por nota (párrafos, runs, el árbol OxmlElement
+de cada hipervínculo, párrafos vacíos de separación) y al final serializa todo
+el DOM en memoria. Con compilaciones semanales de cientos de notas eso es lento
+y pesado. Aquí el encabezado (márgenes, estilos, tabla con logo, título) sale
+de la plantilla ya serializada de gen_reporte, y el XML de cada nota se escribe
+directamente en el zip a partir de fragmentos pre-renderizados, con el mismo
+formato que generaba python-docx. Las relaciones de hipervínculo se acumulan
+mientras se escribe y se emiten una sola vez al final.
+"""
+import io
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+DOCUMENTO = "word/document.xml"
+RELACIONES = "word/_rels/document.xml.rels"
+TIPO_HIPERVINCULO = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink"
+
+# Formato de cada párrafo, idéntico al que producía python-docx
+_RPR_TIMES = '<w:rFonts w:ascii="Times New Roman" w:hAnsi="Times New Roman"/>'
+_P_MEDIO = (
+    '<w:p><w:pPr><w:spacing w:before="120" w:after="0"/></w:pPr>'
+    f'<w:r><w:rPr>{_RPR_TIMES}<w:b/><w:sz w:val="22"/></w:rPr>{{runs}}</w:r></w:p>'
+)
+_P_TITULO = (
+    '<w:p><w:pPr><w:spacing w:before="0" w:after="0"/></w:pPr>'
+    f'<w:r><w:rPr>{_RPR_TIMES}<w:b/><w:sz w:val="22"/></w:rPr>{{runs}}</w:r></w:p>'
+)
+_P_TITULO_ENLACE = (
+    '<w:p><w:pPr><w:spacing w:before="0" w:after="0"/></w:pPr>'
+    '<w:hyperlink r:id="{rid}"><w:r><w:rPr><w:color w:val="0000EE"/><w:u w:val="single"/></w:rPr>'
+    '<w:t>{texto}</w:t></w:r></w:hyperlink></w:p>'
+)
+_PPR_RESUMEN = (
+    '<w:pPr><w:spacing w:before="0" w:after="120" w:line="240" w:lineRule="auto"/>'
+    '<w:jc w:val="both"/></w:pPr>'
+)
+_P_RESUMEN = f'<w:p>{_PPR_RESUMEN}<w:r><w:rPr>{_RPR_TIMES}<w:sz w:val="22"/></w:rPr>{{runs}}</w:r></w:p>'
+_P_RESUMEN_VACIO = f'<w:p>{_PPR_RESUMEN}</w:p>'
+_P_VACIO = "<w:p/>"
+
+# Caracteres que no caben en XML 1.0 (python-docx fallaría con ellos)
+_RE_NO_XML = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+_RE_RID = re.compile(r'Id="rId(\d+)"')
+
+
+def _texto_xml(texto: str) -> str:
+    return escape(_RE_NO_XML.sub("", texto))
+
+
+def _w_t(texto: str) -> str:
+    if texto != texto.strip():
+        return f'<w:t xml:space="preserve">{_texto_xml(texto)}</w:t>'
+    return f"<w:t>{_texto_xml(texto)}</w:t>"
+
+
+def _runs(texto: str) -> str:
+    """Contenido de un run como lo escribe python-docx: \\t -> <w:tab/>, \\n/\\r -> <w:br/>."""
+    partes = []
+    actual = []
+    for ch in texto:
+        if ch == "\t" or ch in "\r\n":
+            if actual:
+                partes.append(_w_t("".join(actual)))
+                actual = []
+            partes.append("<w:tab/>" if ch == "\t" else "<w:br/>")
+        else:
+            actual.append(ch)
+    if actual:
+        partes.append(_w_t("".join(actual)))
+    return "".join(partes)
+
+
+class PlantillaStreaming:
+    """
+    Plantilla .docx ya desarmada una sola vez: el resto de partes del paquete,
+    el document.xml cortado antes del <w:sectPr> final y las relaciones.
+    """
+
+    def __init__(self, plantilla_docx: bytes):
+        self.partes: list[tuple[str, bytes]] = []
+        with zipfile.ZipFile(io.BytesIO(plantilla_docx)) as zf:
+            for info in zf.infolist():
+                self.partes.append((info.filename, zf.read(info.filename)))
+
+        documento = dict(self.partes)[DOCUMENTO]
+        corte = documento.rfind(b"<w:sectPr")
+        self.prefijo = documento[:corte]
+        self.sufijo = documento[corte:]
+
+        relaciones = dict(self.partes)[RELACIONES]
+        cierre = relaciones.rfind(b"</Relationships>")
+        self.rels_prefijo = relaciones[:cierre]
+        self.rels_sufijo = relaciones[cierre:]
+        ids = [int(n) for n in _RE_RID.findall(relaciones.decode("utf-8"))]
+        self.primer_rid = max(ids, default=0) + 1
+
+
+def fragmento_nota(item: dict, rid: str | None) -> str:
+    """XML de una nota (medio, título, resumen y párrafo vacío de separación)."""
+    medio = item.get("medio", "").strip()
+    titulo = item["titulo"]
+    resumen = item["resumen"]
+
+    xml = []
+    if medio:
+        xml.append(_P_MEDIO.format(runs=_runs(medio)))
+    if rid is not None:
+        xml.append(_P_TITULO_ENLACE.format(rid=rid, texto=_texto_xml(titulo)))
+    else:
+        xml.append(_P_TITULO.format(runs=_runs(titulo)))
+    xml.append(_P_RESUMEN.format(runs=_runs(resumen)) if resumen else _P_RESUMEN_VACIO)
+    xml.append(_P_VACIO)
+    return "".join(xml)
+
+
+def escribir_reporte(plantilla: PlantillaStreaming, resumenes, pdf_url: str | None, destino, fragmentos=None) -> None:
+    """
+    Escribe el .docx completo en `destino` (archivo o BytesIO) nota a nota.
+    `fragmentos` (opcional) es una función item, rid -> XML para reutilizar
+    fragmentos ya renderizados; por defecto fragmento_nota. Un item con su
+    propio 'pdf_url' (reporte del día con varios PDFs) enlaza a ese PDF.
+    """
+    fragmentos = fragmentos or fragmento_nota
+    enlaces: dict[str, str] = {}  # url -> rId (python-docx reutiliza el mismo id por URL)
+
+    with zipfile.ZipFile(destino, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for nombre, datos in plantilla.partes:
+            if nombre == DOCUMENTO:
+                with zf.open(DOCUMENTO, "w") as salida:
+                    salida.write(plantilla.prefijo)
+                    for item in resumenes:
+                        rid = None
+                        pagina_inicio = item.get("pagina_inicio")
+                        url_item = item.get("pdf_url") or pdf_url
+                        if url_item and pagina_inicio:
+                            url = f"{url_item}#page={pagina_inicio}"
+                            rid = enlaces.get(url)
+                            if rid is None:
+                                rid = enlaces[url] = f"rId{plantilla.primer_rid + len(enlaces)}"
+                        salida.write(fragmentos(item, rid).encode("utf-8"))
+                    salida.write(plantilla.sufijo)
+            elif nombre == RELACIONES:
+                # Se escriben al final, cuando ya se conocen todos los hipervínculos
+                continue
+            else:
+                zf.writestr(nombre, datos)
+
+        nuevas = "".join(
+            f'<Relationship Id="{rid}" Type="{TIPO_HIPERVINCULO}" '
+            f'Target="{escape(url, {chr(34): "&quot;"})}" TargetMode="External"/>'
+            for url, rid in enlaces.items()
+        )
+        zf.writestr(RELACIONES, plantilla.rels_prefijo + nuevas.encode("utf-8") + plantilla.rels_sufijo)
@@ -1,12 +1,21 @@
+import hashlib
+import io
 import json
 import os
+import threading
+from collections import OrderedDict
 from datetime import datetime
+from functools import lru_cache
 
 from docx import Document
 from docx.shared import Inches, Pt, RGBColor
+from docx.enum.style import WD_STYLE_TYPE
 from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_LINE_SPACING
 from docx.enum.table import WD_ALIGN_VERTICAL
 
+from escritor_docx import PlantillaStreaming, escribir_reporte, fragmento_nota
+from trazas import perfilar, tramo
+
 
 def mes_espanol(dt: datetime) -> str:
     meses = {
@@ -119,6 +128,204 @@ def generar_reporte_word(resumenes, ruta_logo) -> str:
     return nombre_archivo
 
 
+# ======== Reporte en memoria (app de Streamlit) ========
+
+def _construir_encabezado(ruta_logo: str | None, fecha_larga: str) -> Document:
+    """
+    Todo lo que no depende de los resúmenes: márgenes, estilos, tabla con logo
+    y fecha, "Gerencia", línea divisoria y título principal.
+    """
+    doc = Document()
+
+    # Márgenes un poco más amplios de texto (más ancho útil)
+    for section in doc.sections:
+        section.left_margin = Inches(1)   # ~2.54 cm -> puedes bajar a 0.9 si quieres aún más ancho
+        section.right_margin = Inches(1)
+        section.top_margin = Inches(0.5)      # prueba 0.6 / 0.5 / 0.4
+        section.bottom_margin = Inches(1)     # opcional
+
+    # Estilo por defecto del documento: Times New Roman 11
+    normal_style = doc.styles["Normal"]
+    normal_style.font.name = "Times New Roman"
+    normal_style.font.size = Pt(11)
+
+    # Estilo de hipervínculo: si no existe, lo creamos
+    try:
+        hyperlink_style = doc.styles["Hyperlink"]
+    except KeyError:
+        hyperlink_style = doc.styles.add_style("Hyperlink", WD_STYLE_TYPE.CHARACTER)
+
+    hyperlink_style.font.name = "Times New Roman"
+    hyperlink_style.font.size = Pt(11)
+
+    # Encabezado con tabla
+    table = doc.add_table(rows=1, cols=2)
+    table.autofit = False
+    row = table.rows[0]
+    row.cells[0].width = Inches(3)
+    row.cells[1].width = Inches(3)
+
+    # Logo
+    if ruta_logo:
+        try:
+            row.cells[0].paragraphs[0].add_run().add_picture(
+                ruta_logo, width=Inches(1.2)
+            )
+        except Exception:
+            # si falla el logo, seguimos sin detenernos
+            pass
+
+    # Fecha
+    p_fecha = row.cells[1].paragraphs[0]
+    p_fecha.alignment = WD_ALIGN_PARAGRAPH.RIGHT
+    run_fecha = p_fecha.add_run(fecha_larga)
+    run_fecha.font.name = "Arial"
+    run_fecha.font.size = Pt(17)
+
+    # Gerencia
+    p_gg = doc.add_paragraph()
+    p_gg.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    run_gg = p_gg.add_run("Gerencia de Asuntos Económicos Internacionales")
+    run_gg.font.name = "Arial"
+    run_gg.font.size = Pt(17)
+
+    # Línea divisoria
+    p_linea = doc.add_paragraph()
+    p_linea.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    p_linea.paragraph_format.space_before = Pt(5)
+    run_linea = p_linea.add_run(
+        "_____________________________________________________________"
+    )
+    run_linea.font.color.rgb = RGBColor(0, 0, 0)
+
+    # Título principal
+    p_titulo = doc.add_paragraph()
+    p_titulo.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    run_titulo = p_titulo.add_run("REPORTE DE PRENSA")
+    run_titulo.bold = True
+    run_titulo.font.name = "Arial"
+    run_titulo.font.size = Pt(28.5)
+
+    doc.add_paragraph()
+    return doc
+
+
+def _firma_logo(ruta_logo: str | None):
+    """Cambia si el archivo del logo cambia en disco (invalida la plantilla)."""
+    if not ruta_logo:
+        return None
+    try:
+        st_logo = os.stat(ruta_logo)
+    except OSError:
+        return None
+    return (st_logo.st_mtime_ns, st_logo.st_size)
+
+
+@lru_cache(maxsize=8)
+def _plantilla_encabezado(ruta_logo: str | None, firma_logo, fecha_larga: str) -> bytes:
+    """
+    El encabezado ya construido y serializado una sola vez (por logo y fecha);
+    cada reporte parte de una copia en lugar de rehacerlo y volver a leer el logo.
+    """
+    buffer = io.BytesIO()
+    _construir_encabezado(ruta_logo, fecha_larga).save(buffer)
+    return buffer.getvalue()
+
+
+@lru_cache(maxsize=8)
+def _plantilla_streaming(ruta_logo: str | None, firma_logo, fecha_larga: str) -> PlantillaStreaming:
+    """La plantilla desarmada para el escritor en streaming (se hace una vez)."""
+    return PlantillaStreaming(_plantilla_encabezado(ruta_logo, firma_logo, fecha_larga))
+
+
+# Reportes ya generados: hash(resúmenes, URL, fecha, logo) -> bytes del .docx
+MAX_REPORTES_CACHE = 32
+_cache_reportes: OrderedDict[str, bytes] = OrderedDict()
+_cache_lock = threading.Lock()
+# XML ya renderizado de cada nota: (medio, título, resumen, rId) -> fragmento. Al
+# volver a emitir un reporte con pocas notas nuevas (reporte_dia) solo se
+# renderizan esas
+MAX_FRAGMENTOS_CACHE = 4096
+_cache_fragmentos: OrderedDict[tuple, str] = OrderedDict()
+
+
+def fragmento_en_cache(item: dict, rid: str | None) -> str:
+    """fragmento_nota con caché; se pasa como `fragmentos` a escribir_reporte."""
+    clave = (item.get("medio", ""), item["titulo"], item["resumen"], rid)
+    with _cache_lock:
+        xml = _cache_fragmentos.get(clave)
+        if xml is not None:
+            _cache_fragmentos.move_to_end(clave)
+            return xml
+    xml = fragmento_nota(item, rid)
+    with _cache_lock:
+        _cache_fragmentos[clave] = xml
+        while len(_cache_fragmentos) > MAX_FRAGMENTOS_CACHE:
+            _cache_fragmentos.popitem(last=False)
+    return xml
+
+
+def _clave_reporte(resumenes, ruta_logo, pdf_url, fecha_larga) -> str:
+    contenido = json.dumps(
+        {
+            "resumenes": list(resumenes),
+            "logo": [ruta_logo, _firma_logo(ruta_logo)],
+            "url": pdf_url or "",
+            "fecha": fecha_larga,
+        },
+        ensure_ascii=False,
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+
+def generar_reporte_word_en_memoria(resumenes, ruta_logo: str | None = None, pdf_url: str | None = None):
+    """
+    Devuelve (nombre_archivo, BytesIO con el .docx). Si ya se generó un reporte
+    con los mismos resúmenes, URL, fecha y logo, se devuelven esos bytes.
+    """
+    fecha_larga = formatear_fecha_larga()
+    clave = _clave_reporte(resumenes, ruta_logo, pdf_url, fecha_larga)
+
+    with _cache_lock:
+        datos = _cache_reportes.get(clave)
+        if datos is not None:
+            _cache_reportes.move_to_end(clave)
+
+    if datos is None:
+        # El cuerpo se escribe nota a nota directo en el zip (escritor_docx)
+        with tramo("reporte_word", "docx", notas=len(resumenes)), perfilar():
+            plantilla = _plantilla_streaming(ruta_logo, _firma_logo(ruta_logo), fecha_larga)
+            buffer = io.BytesIO()
+            escribir_reporte(plantilla, resumenes, pdf_url, buffer, fragmentos=fragmento_en_cache)
+            datos = buffer.getvalue()
+
+        with _cache_lock:
+            _cache_reportes[clave] = datos
+            while len(_cache_reportes) > MAX_REPORTES_CACHE:
+                _cache_reportes.popitem(last=False)
+
+    return generar_nombre_archivo(), io.BytesIO(datos)
+
+
+def guardar_reporte_word(resumenes, ruta_salida, ruta_logo: str | None = None, pdf_url: str | None = None) -> str:
+    """
+    Igual que generar_reporte_word_en_memoria, pero escribe el .docx directo en
+    `ruta_salida` (procesamiento por lotes) sin pasar por la caché en memoria.
+    """
+    fecha_larga = formatear_fecha_larga()
+    ruta_salida = str(ruta_salida)
+    temporal = ruta_salida + ".tmp"
+    with tramo("reporte_word", "docx", notas=len(resumenes)), perfilar():
+        plantilla = _plantilla_streaming(ruta_logo, _firma_logo(ruta_logo), fecha_larga)
+        with open(temporal, "wb") as f:
+            escribir_reporte(plantilla, resumenes, pdf_url, f, fragmentos=fragmento_en_cache)
+    # Reemplazo atómico: un lote interrumpido no deja un .docx a medias
+    os.replace(temporal, ruta_salida)
+    return ruta_salida
+
+
 if __name__ == "__main__":
     # Cargar resúmenes guardados
     with open("resumenes_aprobados.json", "r", encoding="utf-8") as f:
@@ -0,0 +1,317 @@
+"""
+Gestor de tareas en segundo plano, independiente de los reruns de Streamlit.
+
+Cada interacción con un widget (o un refresco del navegador) vuelve a ejecutar
+el script completo; si el análisis del PDF o los resúmenes se ejecutan dentro
+de esa ejecución, se interrumpen y se pierden. Aquí las tareas viven en pools
+de hilos del proceso y se guardan por id de sesión, de modo que la interfaz
+solo consulta su progreso y sus resultados en cada rerun.
+
+Memoria acotada: el PDF subido se vuelca a un archivo temporal (no se guarda
+en memoria), cada sesión tiene un tope de memoria para sus resultados y, si el
+total de sesiones supera el presupuesto del proceso, se expulsan primero las
+sesiones inactivas usadas hace más tiempo (LRU).
+"""
+import contextvars
+import itertools
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+from miniaturas import GeneradorMiniaturas
+from resumen_especulativo import ResumidorEspeculativo
+from trazas import perfilar, tramo
+
+# PyMuPDF no es thread-safe: un único hilo para todo lo que toca PDFs
+HILOS_PDF = 1
+HILOS_API = int(os.getenv("RESUMEN_HILOS", "4"))
+# Sesiones sin actividad durante más de esto se descartan
+TTL_SESION = float(os.getenv("SESION_TTL_SEGUNDOS", str(6 * 3600)))
+# Tope por sesión para lo que guarda en memoria (análisis del PDF, resúmenes...)
+MEMORIA_SESION_MAX = int(float(os.getenv("SESION_MEMORIA_MAX_MB", "64")) * 1024 * 1024)
+# Presupuesto de todas las sesiones juntas; por encima se expulsan las inactivas (LRU)
+MEMORIA_TOTAL_MAX = int(float(os.getenv("SESIONES_MEMORIA_MAX_MB", "512")) * 1024 * 1024)
+# Ids de sesiones expulsadas que se recuerdan para avisar al volver
+MAX_EXPULSADAS_RECORDADAS = 1000
+# El id de sesión (uuid4 en hexadecimal) nombra su directorio temporal: nada de rutas
+ID_SESION = re.compile(r"[0-9a-f]{32}")
+
+_contador_tareas = itertools.count(1)
+
+
+def estimar_memoria(obj, _vistos: set | None = None) -> int:
+    """
+    Bytes aproximados de un resultado (sys.getsizeof recursivo sobre
+    str/bytes, contenedores y objetos con __slots__). Los objetos compartidos
+    se cuentan una sola vez.
+    """
+    vistos = set() if _vistos is None else _vistos
+    if id(obj) in vistos:
+        return 0
+    vistos.add(id(obj))
+    tamano = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool, type(None))):
+        return tamano
+    if isinstance(obj, dict):
+        for clave, valor in obj.items():
+            tamano += estimar_memoria(clave, vistos) + estimar_memoria(valor, vistos)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for elemento in obj:
+            tamano += estimar_memoria(elemento, vistos)
+    else:
+        for nombre in getattr(type(obj), "__slots__", ()):
+            tamano += estimar_memoria(getattr(obj, nombre, None), vistos)
+        if hasattr(obj, "__dict__"):
+            tamano += estimar_memoria(vars(obj), vistos)
+    return tamano
+
+
+class Tarea:
+    """Una tarea (función) ejecutándose en un pool, con progreso consultable."""
+
+    def __init__(self, tipo: str):
+        self.id = next(_contador_tareas)
+        self.tipo = tipo
+        self.futuro: Future | None = None
+        self.hechos = 0
+        self.total = 0
+        self.mensaje = ""
+        self.memoria = 0  # bytes estimados del resultado, al terminar
+
+    def avance(self, hechos: int, total: int, mensaje: str = "") -> None:
+        """Callback que recibe la función de la tarea para informar su progreso."""
+        self.hechos, self.total, self.mensaje = hechos, total, mensaje
+
+    def terminada(self) -> bool:
+        return self.futuro is not None and self.futuro.done()
+
+    def estado(self) -> str:
+        if self.futuro is None or not self.futuro.done():
+            return "en_curso"
+        if self.futuro.cancelled():
+            return "cancelada"
+        return "error" if self.futuro.exception() is not None else "hecha"
+
+    def resultado(self):
+        return self.futuro.result() if self.estado() == "hecha" else None
+
+    def error(self) -> str:
+        return str(self.futuro.exception()) if self.estado() == "error" else ""
+
+    def cancelar(self) -> None:
+        if self.futuro is not None:
+            self.futuro.cancel()
+
+
+class SesionTrabajo:
+    """Todo lo que una sesión del analista tiene en curso o ya calculado."""
+
+    def __init__(self, directorio: Path, raiz: Path):
+        self.tareas: dict[str, Tarea] = {}
+        self.resumidor: ResumidorEspeculativo | None = None
+        self.datos: dict = {}
+        self.ultimo_uso = time.monotonic()
+        self.directorio = directorio  # archivos temporales de la sesión (PDF subido)
+        self.raiz = raiz  # directorio de todas las sesiones; solo se borra lo que cuelga de él
+        self.ruta_pdf: Path | None = None
+
+    def guardar_pdf(self, contenido) -> Path:
+        """
+        Vuelca el PDF subido (bytes o memoryview, sin copiarlo) a un archivo
+        temporal de la sesión y borra el anterior.
+        """
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        fd, nombre = tempfile.mkstemp(suffix=".pdf", dir=self.directorio)
+        with os.fdopen(fd, "wb") as f:
+            f.write(contenido)
+        anterior, self.ruta_pdf = self.ruta_pdf, Path(nombre)
+        if anterior is not None:
+            # En Linux se puede borrar aunque una tarea anterior lo tenga abierto
+            anterior.unlink(missing_ok=True)
+        return self.ruta_pdf
+
+    def ocupada(self) -> bool:
+        """Tiene un análisis o resúmenes en curso (no se expulsa)."""
+        if any(not t.terminada() for t in self.tareas.values()):
+            return True
+        return self.resumidor is not None and self.resumidor.en_curso() > 0
+
+    def memoria(self) -> int:
+        """Bytes estimados que la sesión retiene en memoria."""
+        total = sum(t.memoria for t in self.tareas.values())
+        total += estimar_memoria(self.datos)
+        if self.resumidor is not None:
+            total += self.resumidor.memoria()
+        return total
+
+    def reiniciar_resumenes(self) -> None:
+        if self.resumidor is not None:
+            self.resumidor.cerrar()
+        self.resumidor = None
+        self.datos.pop("seleccion", None)
+        self.datos.pop("resumenes", None)
+
+    def cerrar(self) -> None:
+        for tarea in self.tareas.values():
+            tarea.cancelar()
+        self.tareas.clear()
+        self.reiniciar_resumenes()
+        self.datos.clear()
+        directorio = self.directorio.resolve()
+        if directorio.parent != self.raiz.resolve():
+            raise Exception(f"El directorio de la sesión no está dentro de {self.raiz}: {directorio}")
+        shutil.rmtree(directorio, ignore_errors=True)
+        self.ruta_pdf = None
+
+
+class GestorTareas:
+    def __init__(
+        self,
+        hilos_pdf: int = HILOS_PDF,
+        hilos_api: int = HILOS_API,
+        memoria_sesion_max: int = MEMORIA_SESION_MAX,
+        memoria_total_max: int = MEMORIA_TOTAL_MAX,
+    ):
+        self._pool_pdf = ThreadPoolExecutor(max_workers=hilos_pdf, thread_name_prefix="pdf")
+        self._pool_api = ThreadPoolExecutor(max_workers=hilos_api, thread_name_prefix="api")
+        # Vistas previas en el mismo hilo de PDFs, en lotes pequeños (no retrasan la detección)
+        self.miniaturas = GeneradorMiniaturas(self._pool_pdf)
+        self._lock = threading.Lock()
+        # Orden de uso: la primera es la usada hace más tiempo (LRU)
+        self._sesiones: OrderedDict[str, SesionTrabajo] = OrderedDict()
+        self._expulsadas: OrderedDict[str, None] = OrderedDict()
+        self._directorio = Path(tempfile.mkdtemp(prefix="prensa_sesiones_"))
+        self.memoria_sesion_max = memoria_sesion_max
+        self.memoria_total_max = memoria_total_max
+
+    def sesion(self, id_sesion: str) -> SesionTrabajo:
+        """Devuelve (o crea) la sesión y la marca como usada."""
+        if not ID_SESION.fullmatch(id_sesion):
+            raise Exception(f"Id de sesión no válido: {id_sesion!r}")
+        with self._lock:
+            sesion = self._sesiones.get(id_sesion)
+            if sesion is None:
+                sesion = self._sesiones[id_sesion] = SesionTrabajo(self._directorio / id_sesion, self._directorio)
+            self._sesiones.move_to_end(id_sesion)
+            sesion.ultimo_uso = time.monotonic()
+        self.purgar_inactivas()
+        return sesion
+
+    def fue_expulsada(self, id_sesion: str) -> bool:
+        """La sesión se liberó por falta de memoria (para avisar al analista una vez)."""
+        with self._lock:
+            if id_sesion not in self._expulsadas:
+                return False
+            del self._expulsadas[id_sesion]
+            return True
+
+    def enviar_pdf(self, id_sesion: str, tipo: str, funcion, *args, **kwargs) -> Tarea:
+        """
+        Lanza `funcion(*args, avance=tarea.avance, **kwargs)` en el pool de PDFs.
+        Sustituye (y cancela) la tarea anterior del mismo tipo en la sesión.
+        Si el resultado supera el tope de memoria por sesión, la tarea falla.
+        La tarea hereda el contexto de quien la lanza (la traza activa, si hay).
+        """
+        sesion = self.sesion(id_sesion)
+        tarea = Tarea(tipo)
+        anterior = sesion.tareas.get(tipo)
+        if anterior is not None:
+            anterior.cancelar()
+
+        def ejecutar():
+            with tramo(f"tarea_{tipo}", "tarea"), perfilar():
+                resultado = funcion(*args, avance=tarea.avance, **kwargs)
+            memoria = estimar_memoria(resultado)
+            if memoria > self.memoria_sesion_max:
+                raise Exception(
+                    f"El resultado ocupa {memoria / 2**20:.1f} MB, más que el límite por "
+                    f"sesión ({self.memoria_sesion_max / 2**20:.1f} MB). Divide el PDF en partes."
+                )
+            tarea.memoria = memoria
+            self.liberar_memoria(excepto=id_sesion)
+            return resultado
+
+        tarea.futuro = self._pool_pdf.submit(contextvars.copy_context().run, ejecutar)
+        sesion.tareas[tipo] = tarea
+        return tarea
+
+    def resumir(
+        self,
+        id_sesion: str,
+        noticias: list[dict],
+        previos: dict | None = None,
+        etiquetas: dict | None = None,
+    ) -> ResumidorEspeculativo:
+        """
+        Encola los resúmenes de `noticias` en el pool de la API (reutiliza lo ya
+        lanzado). `previos` (clave -> resumen) se dan por hechos sin llamar a la API.
+        `etiquetas` (reporte, documento) se usan al crear el resumidor de la sesión.
+        """
+        sesion = self.sesion(id_sesion)
+        if sesion.resumidor is None:
+            sesion.resumidor = ResumidorEspeculativo(executor=self._pool_api, etiquetas=etiquetas)
+        sesion.resumidor.lanzar(noticias, previos)
+        return sesion.resumidor
+
+    def purgar_inactivas(self, ttl: float = TTL_SESION) -> None:
+        ahora = time.monotonic()
+        with self._lock:
+            caducadas = [sid for sid, s in self._sesiones.items() if ahora - s.ultimo_uso > ttl]
+            sesiones = [self._sesiones.pop(sid) for sid in caducadas]
+        for sesion in sesiones:
+            sesion.cerrar()
+
+    def memoria_total(self) -> int:
+        with self._lock:
+            sesiones = list(self._sesiones.values())
+        return sum(s.memoria() for s in sesiones)
+
+    def liberar_memoria(self, excepto: str | None = None) -> int:
+        """
+        Si las sesiones superan el presupuesto total, expulsa las inactivas
+        empezando por la usada hace más tiempo. Devuelve cuántas expulsó.
+        """
+        with self._lock:
+            candidatas = list(self._sesiones.items())
+        memorias = {sid: s.memoria() for sid, s in candidatas}
+        total = sum(memorias.values())
+
+        expulsadas = []
+        for sid, sesion in candidatas:
+            if total <= self.memoria_total_max:
+                break
+            if sid == excepto or sesion.ocupada():
+                continue
+            with self._lock:
+                if self._sesiones.get(sid) is not sesion:
+                    continue
+                del self._sesiones[sid]
+                self._expulsadas[sid] = None
+                while len(self._expulsadas) > MAX_EXPULSADAS_RECORDADAS:
+                    self._expulsadas.popitem(last=False)
+            expulsadas.append(sesion)
+            total -= memorias[sid]
+
+        for sesion in expulsadas:
+            sesion.cerrar()
+        return len(expulsadas)
+
+
+_GESTOR: GestorTareas | None = None
+_GESTOR_LOCK = threading.Lock()
+
+
+def obtener_gestor() -> GestorTareas:
+    """Gestor único por proceso (compartido por todas las sesiones de Streamlit)."""
+    global _GESTOR
+    with _GESTOR_LOCK:
+        if _GESTOR is None:
+            _GESTOR = GestorTareas()
+        return _GESTOR
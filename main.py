@@ -1,225 +1,383 @@
-
-import fitz #importar módelulo de PDF
-print ("el lector de pdf está instalado y funcionando")
-
-
-
-
-
-
-def extract_text_from_pdf(pdf_path):
-    doc = fitz.open(pdf_path)
-    full_text = ""
-    for page in doc:
-        full_text += page.get_text()
-    return full_text
-
-
-
-# Cargar y extraer texto del PDF
-pdf_path = "nov4.pdf"  # Cambia esto por el nombre de tu archivo PDF
-texto = extract_text_from_pdf(pdf_path)
-print(texto)  # Aquí ves el texto extraído
-
-pdf_path = "nov4.pdf"  # Cambia esto si tu archivo se llama diferente
-
-texto = extract_text_from_pdf(pdf_path)  # Usamos la función que definiste en Celda 21,10
-
-print(texto[:1000])  # Mostramos los primeros 1000 caracteres del texto
-
-
-
-
-
-
-pdf_path = "nov4.pdf"
-doc = fitz.open(pdf_path)
-
-page = doc.load_page(2)  # página 3
-texto_dict = page.get_text("dict")
-blocks = texto_dict["blocks"]
-
-print(f"Spans detectados en página 3:\n")
-
-for block in blocks:
-    if block['type'] != 0:
-        continue
-    for line in block['lines']:
-        for span in line['spans']:
-            texto = span['text'].strip()
-            if texto:
-                print(f"Texto: '{texto}'")
-                print(f"Fuente: {span['font']}")
-                print(f"Tamaño: {span['size']}")
-                print(f"Número de caracteres: {len(texto)}")
-                print("---")
-
-
-def detectar_titulos(pdf_path):
-    import fitz
-
-    doc = fitz.open(pdf_path)
-    titulos = []
-    textos_excluidos = {"Uso General", "Información"}
-
-    # Empieza en la página 2 (índice 1) porque la 1 es la portada
-    for page_num in range(1, doc.page_count):
-        page = doc.load_page(page_num)
-        texto_dict = page.get_text("dict")
-        blocks = texto_dict["blocks"]
-
-        titulo_encontrado = False
-
-        for block in blocks:
-            if block["type"] != 0:  # solo texto
+"""
+Procesamiento por lotes de PDFs de prensa, sin navegador (p. ej. ejecuciones
+nocturnas programadas).
+
+Para cada PDF: detecta y extrae las noticias, agrupa los duplicados, resume
+(reutilizando lo ya reportado en el archivo de huellas) y genera el .docx con
+el mismo formato que la app. Cada archivo terminado añade una línea al JSONL de
+resultados; al volver a ejecutar, los PDFs ya completados (mismo contenido) se
+saltan, así que un lote interrumpido se reanuda donde se quedó.
+
+    python main.py "prensa/*.pdf" --salida reportes
+    python main.py prensa/ --sin-portada --duplicados combinada --procesos 4
+    python main.py prensa/ --con-portada      # sin detectar el índice (portada + índice en la página 2)
+    python main.py prensa/ --trazas --perfil   # traza y perfil de cada PDF en trazas/
+    python main.py tardio.pdf --reporte-dia   # añade al reporte de hoy solo lo nuevo o corregido
+
+El análisis de los PDFs corre en procesos aparte (PyMuPDF no es thread-safe) y
+los resúmenes comparten un pool de hilos (RESUMEN_HILOS llamadas simultáneas).
+"""
+import argparse
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+from analisis_pdf import analizar_documento, buscar_vistas, titulo_y_medio_envio
+from archivo_huellas import obtener_archivo_huellas
+from archivo_prensa import obtener_archivo_prensa
+from consumo_api import obtener_almacen_consumo
+from duplicados import MODOS_DUPLICADOS, preparar_envios
+from gen_reporte import guardar_reporte_word
+from reporte_dia import obtener_reporte_dia
+from resumen_especulativo import HILOS_RESUMEN, ResumidorEspeculativo, clave_noticia, resumenes_previos
+from trazas import (
+    DIRECTORIO_TRAZAS,
+    PERFIL_ACTIVO,
+    TRAZAS_ACTIVAS,
+    Traza,
+    ejecutar_con_traza,
+    traza_actual,
+    tramo,
+    trazando,
+)
+
+RESULTADOS_POR_DEFECTO = "resultados.jsonl"
+SALIDA_POR_DEFECTO = "reportes"
+LOGO_POR_DEFECTO = "logo_bx.png"
+
+
+def listar_pdfs(entradas: list[str]) -> list[Path]:
+    """Directorios (sus *.pdf), patrones glob o rutas sueltas; sin repetidos."""
+    rutas = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            rutas.extend(sorted(Path(entrada).glob("*.pdf")))
+        else:
+            rutas.extend(Path(r) for r in sorted(glob.glob(entrada, recursive=True)))
+    vistas = set()
+    unicas = []
+    for ruta in rutas:
+        clave = ruta.resolve()
+        if ruta.suffix.lower() == ".pdf" and clave not in vistas:
+            vistas.add(clave)
+            unicas.append(ruta)
+    return unicas
+
+
+def hash_archivo(ruta: Path) -> str:
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def leer_completados(ruta_resultados: str) -> set[str]:
+    """Hashes de los PDFs que ya terminaron bien en ejecuciones anteriores."""
+    completados = set()
+    if not os.path.exists(ruta_resultados):
+        return completados
+    with open(ruta_resultados, encoding="utf-8") as f:
+        for linea in f:
+            try:
+                registro = json.loads(linea)
+            except ValueError:
+                # Última línea cortada por una interrupción
                 continue
-
-            buffer_lineas = []
-            estilo_actual = None  # (font_name, size_redondeado)
-
-            for line in block["lines"]:
-                spans = line.get("spans", [])
-                if not spans:
-                    continue
-
-                # Texto completo de la línea (todos los spans)
-                line_text = "".join(span["text"] for span in spans).strip()
-                if not line_text:
+            if registro.get("estado") == "hecho":
+                completados.add(registro["sha256"])
+    return completados
+
+
+class Lote:
+    """Estado compartido del lote: pools, opciones y el JSONL de resultados."""
+
+    def __init__(self, args, pool_pdf: ProcessPoolExecutor, pool_api: ThreadPoolExecutor):
+        self.args = args
+        self.pool_pdf = pool_pdf
+        self.pool_api = pool_api
+        self._lock = threading.Lock()
+
+    def escribir_resultado(self, registro: dict) -> None:
+        with self._lock, open(self.args.resultados, "a", encoding="utf-8") as f:
+            f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def procesar(self, ruta: Path, sha256: str) -> dict:
+        if not self.args.trazas:
+            return self._procesar(ruta, sha256)
+        traza = Traza(ruta.name, perfil=self.args.perfil)
+        with trazando(traza), tramo("procesar", "lote", archivo=ruta.name):
+            registro = self._procesar(ruta, sha256)
+        registro["trazas"] = traza.guardar(Path(self.args.trazas) / ruta.stem)
+        return registro
+
+    def _procesar(self, ruta: Path, sha256: str) -> dict:
+        args = self.args
+        inicio = time.perf_counter()
+        pagina_indice = args.pagina_indice  # None: perfil de maquetación (perfiles_pdf.py)
+        traza = traza_actual()
+        if traza is None:
+            analisis = self.pool_pdf.submit(analizar_documento, str(ruta), pagina_indice).result()
+        else:
+            # El análisis corre en otro proceso: trae su propia traza y se suma a esta
+            analisis, *traza_proceso = self.pool_pdf.submit(
+                ejecutar_con_traza, analizar_documento, str(ruta), pagina_indice, perfil=traza.perfil
+            ).result()
+            traza.absorber(*traza_proceso)
+        noticias = analisis["noticias"]
+
+        envios = preparar_envios(noticias, analisis["grupos"], range(len(noticias)), args.duplicados)
+        vistas = buscar_vistas(noticias) if args.reutilizar else {}
+        previos_dia = {}
+        if args.reporte_dia:
+            # Lo que ya está igual en el reporte de hoy no se vuelve a resumir; una
+            # corrección no hereda el resumen archivado de la versión anterior
+            estados = obtener_reporte_dia().clasificar(envios)
+            previos_dia = {
+                clave_noticia(e): nota.resumen for e, (estado, nota) in zip(envios, estados) if estado == "igual"
+            }
+            corregidas = {e["pagina_inicio"] for e, (estado, _) in zip(envios, estados) if estado == "cambiada"}
+            vistas = {p: v for p, v in vistas.items() if p not in corregidas}
+        previos = {**resumenes_previos(envios, vistas), **previos_dia}
+
+        resumidor = ResumidorEspeculativo(
+            executor=self.pool_api, etiquetas={"origen": "lote", "reporte": ruta.name, "documento": sha256}
+        )
+        try:
+            resumidor.lanzar(envios, previos)
+            resumenes, fallidas, extractivas = [], [], 0
+            reportadas = []  # (envío, item del reporte, tipo) para el archivo de prensa
+            archivo = obtener_archivo_huellas()
+            for envio in envios:
+                clave = clave_noticia(envio)
+                titulo_nota, medio = titulo_y_medio_envio(envio)
+                resumen = resumidor.recoger(clave, esperar=True)
+                tipo = "reutilizado" if clave in previos else "api"
+                if resumen is None and args.extractivo_fallidas:
+                    from resumen_extractivo import resumen_extractivo
+                    texto = "\n".join(envio["textos"]) if "textos" in envio else envio["texto"]
+                    resumen = resumen_extractivo(texto)
+                    extractivas += 1
+                    tipo = "extractivo"
+                elif resumen is not None and clave not in previos:
+                    for miembro in envio["grupo"]:
+                        archivo.registrar(miembro.huella, miembro.titulo, resumen)
+                if resumen is None:
+                    fallidas.append({"titulo": titulo_nota, "error": resumidor.error(clave) or "cancelada"})
                     continue
-
-                span0 = spans[0]
-                font = span0["font"]
-                size = span0["size"]
-                es_negrita = "bold" in font.lower()
-
-                # ¿Esta línea forma parte del título?
-                if es_negrita and size >= 12:
-                    estilo_linea = (font, int(round(size)))
-
-                    if estilo_actual is None:
-                        # Empezamos a acumular un posible título
-                        estilo_actual = estilo_linea
-                        buffer_lineas.append(line_text)
-                    elif estilo_linea == estilo_actual:
-                        # Misma fuente/tamaño → sigue siendo el mismo título
-                        buffer_lineas.append(line_text)
-                    else:
-                        # Cambió de estilo → cerrar título si ya había algo
-                        if buffer_lineas:
-                            titulo = " ".join(buffer_lineas).strip()
-                            if (
-                                len(titulo) >= 25
-                                and titulo not in textos_excluidos
-                            ):
-                                titulos.append((titulo, page_num + 1))
-                                titulo_encontrado = True
-                                break
-                        # Reiniciar acumulador con esta nueva línea
-                        estilo_actual = estilo_linea
-                        buffer_lineas = [line_text]
-                else:
-                    # Línea que ya no es del título → cerrar, si había uno
-                    if buffer_lineas:
-                        titulo = " ".join(buffer_lineas).strip()
-                        if (
-                            len(titulo) >= 25
-                            and titulo not in textos_excluidos
-                        ):
-                            titulos.append((titulo, page_num + 1))
-                            titulo_encontrado = True
-                            break
-                        buffer_lineas = []
-                        estilo_actual = None
-
-            # Por si el título llega hasta la última línea del bloque
-            if not titulo_encontrado and buffer_lineas:
-                titulo = " ".join(buffer_lineas).strip()
-                if (
-                    len(titulo) >= 25
-                    and titulo not in textos_excluidos
-                ):
-                    titulos.append((titulo, page_num + 1))
-                    titulo_encontrado = True
-
-            if titulo_encontrado:
-                break  # ya tenemos el título de esta página
-
-    return titulos
-
-
-titulos_detectados = detectar_titulos(pdf_path)
-
-for idx, (titulo, pagina) in enumerate(titulos_detectados, 1):
-    print(f"{idx}. {titulo} - Página {pagina}")
-
-
-def extraer_noticias_completas(pdf_path, titulos_detectados):
-    doc = fitz.open(pdf_path)
-    noticias = []
-
-    for i, (titulo, pagina_inicio) in enumerate(titulos_detectados):
-        # Calcular la página final de esta noticia
-        if i + 1 < len(titulos_detectados):
-            pagina_siguiente = titulos_detectados[i + 1][1]
-            pagina_fin = pagina_siguiente - 1
+                item = {
+                    "titulo": titulo_nota,
+                    "medio": medio,
+                    "resumen": resumen,
+                    "pagina_inicio": envio["pagina_inicio"],
+                }
+                resumenes.append(item)
+                reportadas.append((envio, item, tipo))
+        finally:
+            resumidor.cerrar()
+
+        if not fallidas:
+            # Un archivo incompleto se reprocesa en la próxima ejecución: se archiva entonces
+            archivo_prensa = obtener_archivo_prensa()
+            edicion_id, articulos = archivo_prensa.registrar_edicion(ruta.name, sha256, noticias, origen="lote")
+            for envio, item, tipo in reportadas:
+                archivo_prensa.registrar_resumen(
+                    edicion_id,
+                    item["titulo"],
+                    item["medio"],
+                    item["resumen"],
+                    [articulos[m.pagina_inicio] for m in envio["grupo"]],
+                    tipo,
+                )
+
+        pdf_url = args.url_base + ruta.name if args.url_base else None
+        dia = None
+        if args.reporte_dia:
+            nuevas, reemplazadas = obtener_reporte_dia().actualizar(
+                [(envio, item) for envio, item, _ in reportadas], ruta.name, pdf_url or ""
+            )
+            dia = {"nuevas": nuevas, "reemplazadas": reemplazadas}
+
+        reporte = None
+        if resumenes:
+            reporte = guardar_reporte_word(
+                resumenes, Path(args.salida) / f"{ruta.stem}.docx", args.logo, pdf_url
+            )
+
+        return {
+            "archivo": str(ruta),
+            "sha256": sha256,
+            # Con fallidas el archivo no cuenta como completado: se reintenta en la próxima ejecución
+            "estado": "incompleto" if fallidas else "hecho",
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "noticias": len(noticias),
+            "pagina_indice": analisis["pagina_indice"] + 1,
+            "perfil": analisis["origen_perfil"],
+            "resumenes": resumenes,
+            "reutilizados": len(previos),
+            "extractivos": extractivas,
+            "fallidas": fallidas,
+            # Tokens y coste de todas las llamadas hechas para este PDF (también en ejecuciones previas)
+            "consumo": obtener_almacen_consumo().resumen_documento(sha256),
+            "reporte": reporte,
+            "reporte_dia": dia,
+            "segundos": round(time.perf_counter() - inicio, 3),
+        }
+
+
+def parsear_argumentos(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Genera reportes de prensa (.docx) para un lote de PDFs, sin interfaz."
+    )
+    parser.add_argument("entradas", nargs="+", help="Directorios, patrones glob o PDFs sueltos.")
+    parser.add_argument("--salida", default=SALIDA_POR_DEFECTO, help="Carpeta de los .docx generados.")
+    parser.add_argument(
+        "--resultados",
+        default=RESULTADOS_POR_DEFECTO,
+        help="Archivo JSONL de resultados (también sirve para reanudar el lote).",
+    )
+    portada = parser.add_mutually_exclusive_group()
+    portada.add_argument(
+        "--sin-portada",
+        dest="pagina_indice",
+        action="store_const",
+        const=0,
+        help="Los PDFs empiezan directamente con el índice (sin página de portada).",
+    )
+    portada.add_argument(
+        "--con-portada",
+        dest="pagina_indice",
+        action="store_const",
+        const=1,
+        help="Los PDFs traen portada y el índice en la página 2. Sin ninguna de las dos "
+             "opciones, se detecta con el perfil de maquetación de cada fuente.",
+    )
+    parser.add_argument(
+        "--duplicados",
+        choices=list(MODOS_DUPLICADOS),
+        default="representante",
+        help="Qué hacer con las noticias casi duplicadas.",
+    )
+    parser.add_argument(
+        "--no-reutilizar",
+        dest="reutilizar",
+        action="store_false",
+        help="Pedir un resumen nuevo aunque la noticia ya se haya reportado otro día.",
+    )
+    parser.add_argument(
+        "--extractivo-fallidas",
+        action="store_true",
+        help="Usar un resumen extractivo local para las noticias que fallen en la API.",
+    )
+    parser.add_argument("--url-base", default="", help="Prefijo de URL de los PDFs para los enlaces del reporte.")
+    parser.add_argument("--logo", default=LOGO_POR_DEFECTO, help="Logo del encabezado del reporte.")
+    parser.add_argument(
+        "--procesos",
+        type=int,
+        default=min(4, os.cpu_count() or 1),
+        help="PDFs analizados a la vez (procesos).",
+    )
+    parser.add_argument("--hilos-api", type=int, default=HILOS_RESUMEN, help="Llamadas simultáneas a la API.")
+    parser.add_argument("--rehacer", action="store_true", help="Procesar también los PDFs ya completados.")
+    parser.add_argument(
+        "--reporte-dia",
+        action="store_true",
+        help="Añadir cada PDF al reporte de hoy (solo se resumen las notas nuevas o corregidas) "
+             "y emitir además reporte_<fecha>.docx con todas las notas del día.",
+    )
+    parser.add_argument(
+        "--trazas",
+        nargs="?",
+        const=DIRECTORIO_TRAZAS,
+        default=DIRECTORIO_TRAZAS if TRAZAS_ACTIVAS else None,
+        metavar="DIR",
+        help=f"Guardar la traza de cada PDF (JSON de Chrome trace events) en DIR (por defecto {DIRECTORIO_TRAZAS}).",
+    )
+    parser.add_argument(
+        "--perfil",
+        action="store_true",
+        default=PERFIL_ACTIVO,
+        help="Perfilar además cada PDF con cProfile (un .prof junto a su traza).",
+    )
+    args = parser.parse_args(argv)
+    if args.perfil and not args.trazas:
+        args.trazas = DIRECTORIO_TRAZAS
+    return args
+
+
+def main(argv=None) -> int:
+    args = parsear_argumentos(argv)
+    rutas = listar_pdfs(args.entradas)
+    if not rutas:
+        print("No se encontraron PDFs en las entradas indicadas.")
+        return 1
+
+    completados = set() if args.rehacer else leer_completados(args.resultados)
+    pendientes = []
+    for ruta in rutas:
+        sha256 = hash_archivo(ruta)
+        if sha256 in completados:
+            print(f"= {ruta} (ya completado)")
         else:
-            pagina_fin = doc.page_count  # última noticia llega hasta el final
-
-        # Extraer texto de todas las páginas correspondientes
-        texto = ""
-        for num in range(pagina_inicio - 1, pagina_fin):
-            page = doc.load_page(num)
-            texto += page.get_text()
-
-        noticias.append({
-            "titulo": titulo,
-            "pagina_inicio": pagina_inicio,
-            "pagina_fin": pagina_fin,
-            "paginas": list(range(pagina_inicio, pagina_fin + 1)),
-            "texto": texto.strip()
-        })
-
-    return noticias
-
-noticias = extraer_noticias_completas(pdf_path, titulos_detectados)
-
-for i, noticia in enumerate(noticias, 1):
-    print(f"Noticia {i}")
-    print(f"Título: {noticia['titulo']}")
-    print(f"Páginas: {noticia['paginas']}")
-    print(f"Texto (primeros 300 caracteres):\n{noticia['texto'][:300]}")
-    print("-" * 80)
-
-#elección de las noticias a resumir 
-selección = input ("Escribe los números de las noticias que quieres resumir (separados por comas): ")
-indices = [int(n.strip()) - 1 for n in selección.split(",") if n.strip().isdigit()]
-
-#Obtener los textos de las noticias seleccionadas
-noticias_seleccionadas = [noticias[i] for i in indices if 0 <= i < len(noticias)]
-
-
-from summary_claude import resumir_con_claude
-
-import json
-
-resumenes_para_word = []
-
-print("\n=== Resúmenes generados ===\n")
-for i, noticia in enumerate(noticias_seleccionadas, 1):
-    print(f"▶ Resumiendo noticia {i}: {noticia['titulo']}")
-    resumen = resumir_con_claude(noticia["texto"])
-    print(f"\n📝 Resumen {i}:\n{resumen}")
-    print("-" * 80)
-
-    resumenes_para_word.append({
-        "titulo": noticia["titulo"],
-        "resumen": resumen
-    })
-
-# Guardar los resúmenes en un archivo temporal
-with open("resumenes_aprobados.json", "w", encoding="utf-8") as f:
-    json.dump(resumenes_para_word, f, ensure_ascii=False, indent=2)
-
-print("Resúmenes guardados en 'resumenes_aprobados.json'")
-
-
+            pendientes.append((ruta, sha256))
+    if not pendientes:
+        print("Nada que hacer: todos los PDFs ya están completados.")
+        return 0
+
+    Path(args.salida).mkdir(parents=True, exist_ok=True)
+    errores = 0
+    inicio = time.perf_counter()
+    # spawn: los procesos hijos no heredan los hilos (ni sus locks) del proceso principal
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=args.procesos, mp_context=contexto) as pool_pdf, \
+            ThreadPoolExecutor(max_workers=args.hilos_api, thread_name_prefix="api") as pool_api, \
+            ThreadPoolExecutor(max_workers=args.procesos, thread_name_prefix="lote") as pool_lote:
+        lote = Lote(args, pool_pdf, pool_api)
+        futuros = {pool_lote.submit(lote.procesar, ruta, sha256): (ruta, sha256) for ruta, sha256 in pendientes}
+        for n, futuro in enumerate(as_completed(futuros), 1):
+            ruta, sha256 = futuros[futuro]
+            try:
+                registro = futuro.result()
+            except Exception as e:
+                errores += 1
+                registro = {
+                    "archivo": str(ruta),
+                    "sha256": sha256,
+                    "estado": "error",
+                    "fecha": datetime.now().isoformat(timespec="seconds"),
+                    "error": str(e),
+                }
+                print(f"[{n}/{len(pendientes)}] {ruta}: error: {e}")
+            else:
+                print(
+                    f"[{n}/{len(pendientes)}] {ruta}: {registro['noticias']} noticias, "
+                    f"{len(registro['resumenes'])} resúmenes ({registro['reutilizados']} reutilizados), "
+                    f"{len(registro['fallidas'])} fallidas, {registro['segundos']:.1f} s"
+                )
+                if registro["estado"] != "hecho":
+                    errores += 1
+            lote.escribir_resultado(registro)
+
+    if args.reporte_dia:
+        items = obtener_reporte_dia().items()
+        if items:
+            ruta_dia = Path(args.salida) / f"reporte_{datetime.now().date().isoformat()}.docx"
+            guardar_reporte_word(items, ruta_dia, args.logo)
+            print(f"Reporte del día: {len(items)} notas en {ruta_dia}")
+
+    print(f"Lote terminado en {time.perf_counter() - inicio:.1f} s; resultados en {args.resultados}")
+    return 1 if errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
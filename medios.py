@@ -0,0 +1,236 @@
+"""
+Registro de medios y atribución de cada nota a su medio.
+
+Los medios y sus alias (p. ej. "WSJ" -> "The Wall Street Journal") se leen de
+medios.json (ruta configurable con PRENSA_MEDIOS). Todos los alias se compilan
+una sola vez en una única expresión regular factorizada como un trie (los
+prefijos comunes se comparten), así que una búsqueda recorre el texto una sola
+vez sin importar cuántos medios haya, en lugar de probar medio por medio.
+
+La atribución busca primero el medio al final del título del índice
+("..., Bloomberg") y, si no lo trae, en la firma de las primeras líneas del
+texto de la nota. Solo cuentan las formas de firma ("By Jane Doe, Reuters",
+"Por Ana Gómez | El País", el medio solo en una línea, "MADRID (Reuters) -"):
+un medio citado en el titular o la entradilla ("...según Reuters") no es el
+de la nota.
+
+    python medios.py --titulos 200000    # benchmark de rendimiento
+"""
+import json
+import os
+import re
+import threading
+from pathlib import Path
+
+RUTA_MEDIOS = os.getenv("PRENSA_MEDIOS", str(Path(__file__).resolve().parent / "medios.json"))
+LINEAS_FIRMA = 6
+
+
+def _normalizar(texto: str) -> str:
+    return " ".join(texto.split()).lower()
+
+
+def _patron_trie(nodo: dict) -> str:
+    """Alternativa factorizada por prefijos; la clave "" marca el fin de un alias."""
+    ramas = [
+        (r"\s+" if caracter == " " else re.escape(caracter)) + _patron_trie(hijo)
+        for caracter, hijo in sorted(nodo.items())
+        if caracter
+    ]
+    if not ramas:
+        return ""
+    cuerpo = ramas[0] if len(ramas) == 1 else "(?:" + "|".join(ramas) + ")"
+    if "" in nodo:
+        # Opcional y codicioso: prefiere el alias más largo ("Bloomberg News" sobre "Bloomberg")
+        return f"(?:{cuerpo})?"
+    return cuerpo
+
+
+def compilar_alias(alias) -> re.Pattern:
+    trie: dict = {}
+    for a in alias:
+        nodo = trie
+        for caracter in _normalizar(a):
+            nodo = nodo.setdefault(caracter, {})
+        nodo[""] = {}
+    return re.compile(rf"(?<!\w){_patron_trie(trie)}(?!\w)", re.IGNORECASE)
+
+
+class Atribucion:
+    """Medio reconocido y dónde: `origen` 'titulo' o 'firma', span [inicio, fin) en ese texto."""
+
+    __slots__ = ("medio", "inicio", "fin", "origen")
+
+    def __init__(self, medio: str, inicio: int, fin: int, origen: str):
+        self.medio = medio
+        self.inicio = inicio
+        self.fin = fin
+        self.origen = origen
+
+    def __repr__(self):
+        return f"Atribucion({self.medio!r}, {self.inicio}, {self.fin}, {self.origen!r})"
+
+
+class RegistroMedios:
+    def __init__(self, medios: dict[str, list[str]]):
+        """`medios`: nombre canónico -> alias (el nombre también cuenta como alias)."""
+        self.medios = list(medios)
+        self._canonico = {}
+        for nombre, alias in medios.items():
+            for a in [nombre, *alias]:
+                self._canonico[_normalizar(a)] = nombre
+        self._regex = compilar_alias(self._canonico)
+        medio = self._regex.pattern
+        # Formas de firma, línea a línea: el medio es siempre el grupo 1
+        self._firmas = (
+            # "Reuters" solo en su línea (tras "By Jane Doe")
+            (re.compile(rf"\s*({medio})\s*\.?\s*", re.IGNORECASE), re.Pattern.fullmatch),
+            # "By Jane Doe, Reuters", "Por Ana Gómez | El País", "By Jane Doe - Bloomberg"
+            (
+                re.compile(rf"\s*(?:by|por)\s+[^,|\n]+?\s*(?:,|\||\s[-–—])\s*({medio})\s*\.?\s*", re.IGNORECASE),
+                re.Pattern.fullmatch,
+            ),
+            # Data: "(Reuters) -", "MADRID, 3 jun (Reuters) -", "NUEVA YORK (Bloomberg) —"
+            (re.compile(rf"[^()\n]{{0,60}}\(({medio})\)\s*[-–—:]", re.IGNORECASE), re.Pattern.match),
+        )
+
+    @classmethod
+    def desde_archivo(cls, ruta: str = RUTA_MEDIOS) -> "RegistroMedios":
+        with open(ruta, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def _atribucion(self, m: re.Match, origen: str) -> Atribucion:
+        return Atribucion(self._canonico[_normalizar(m.group())], m.start(), m.end(), origen)
+
+    def buscar(self, texto: str, inicio: int = 0, fin: int | None = None, origen: str = "") -> Atribucion | None:
+        """Primer medio en texto[inicio:fin]."""
+        m = self._regex.search(texto, inicio, len(texto) if fin is None else fin)
+        return self._atribucion(m, origen) if m else None
+
+    def en_titulo(self, titulo: str) -> Atribucion | None:
+        """Medio en la última parte (tras la última coma) de un título del índice."""
+        coma = titulo.rfind(",")
+        if coma < 0:
+            return None
+        return self.buscar(titulo, coma + 1, origen="titulo")
+
+    def en_firma(self, texto: str, lineas: int = LINEAS_FIRMA) -> Atribucion | None:
+        """
+        Medio en la firma: se recorren las primeras `lineas` del texto de la nota
+        y solo cuenta una línea con forma de firma (ver docstring del módulo).
+        """
+        inicio = 0
+        for _ in range(lineas):
+            fin = texto.find("\n", inicio)
+            if fin < 0:
+                fin = len(texto)
+            for patron, casar in self._firmas:
+                m = casar(patron, texto, inicio, fin)
+                if m:
+                    medio = self._canonico[_normalizar(m.group(1))]
+                    return Atribucion(medio, m.start(1), m.end(1), "firma")
+            if fin == len(texto):
+                break
+            inicio = fin + 1
+        return None
+
+    def separar(self, titulo_completo: str, texto: str = "") -> tuple[str, str, Atribucion | None]:
+        """
+        (título sin medio, medio canónico, atribución). Si el título no trae el
+        medio se busca en la firma de `texto` y el título se deja completo.
+        """
+        t = titulo_completo.strip()
+        # Quitar punto final suelto, si lo hay
+        if t.endswith("."):
+            t = t[:-1].strip()
+
+        atribucion = self.en_titulo(t)
+        if atribucion is not None:
+            titulo_sin_medio = ", ".join(p.strip() for p in t[:t.rfind(",")].split(",") if p.strip())
+            if titulo_sin_medio:
+                return titulo_sin_medio, atribucion.medio, atribucion
+        if texto:
+            atribucion = self.en_firma(texto)
+            if atribucion is not None:
+                return t, atribucion.medio, atribucion
+        return t, "", None
+
+
+_REGISTRO: RegistroMedios | None = None
+_REGISTRO_LOCK = threading.Lock()
+
+
+def obtener_registro_medios() -> RegistroMedios:
+    """Registro único por proceso, leído y compilado en el primer uso."""
+    global _REGISTRO
+    with _REGISTRO_LOCK:
+        if _REGISTRO is None:
+            _REGISTRO = RegistroMedios.desde_archivo()
+        return _REGISTRO
+
+
+if __name__ == "__main__":
+    import argparse
+    import random
+    import time
+
+    parser = argparse.ArgumentParser(description="Benchmark de atribución de medios.")
+    parser.add_argument("--titulos", type=int, default=200_000, help="Títulos sintéticos a procesar.")
+    parser.add_argument("--medios-extra", type=int, default=500, help="Medios sintéticos añadidos al registro.")
+    args = parser.parse_args()
+
+    with open(RUTA_MEDIOS, encoding="utf-8") as f:
+        config = json.load(f)
+    rnd = random.Random(0)
+    palabras = ("markets", "bank", "rates", "inflation", "oil", "trade", "Mexico", "peso", "Fed", "growth",
+                "tariffs", "earnings", "bond", "yields", "China", "jobs", "housing", "outlook")
+    for i in range(args.medios_extra):
+        config[f"Gaceta {i} {rnd.choice(palabras).title()}"] = [f"G{i}Press"]
+    registro = RegistroMedios(config)
+    alias = [a for nombre, otros in config.items() for a in [nombre, *otros]]
+
+    titulos = []
+    for _ in range(args.titulos):
+        titulo = " ".join(rnd.choice(palabras) for _ in range(rnd.randint(6, 14)))
+        r = rnd.random()
+        if r < 0.7:
+            titulo += ", " + rnd.choice(alias)
+        elif r < 0.85:
+            titulo += ", " + rnd.choice(alias) + ", " + rnd.choice(alias)
+        titulos.append(titulo)
+    firmas = [f"{t}\nBy Jane Doe\n{rnd.choice(alias)}\n" + "Body text. " * 200 for t in titulos[:20_000]]
+
+    def separar_lineal(t):
+        # Algoritmo anterior: búsqueda exacta y luego subcadena medio por medio
+        partes = [p.strip() for p in t.split(",") if p.strip()]
+        if len(partes) < 2:
+            return t, ""
+        if partes[-1] in config:
+            return ", ".join(partes[:-1]), partes[-1]
+        for medio in config:
+            if medio in partes[-1]:
+                return ", ".join(partes[:-1]), medio
+        return t, ""
+
+    alternativa = re.compile(
+        r"(?<!\w)(?:" + "|".join(re.escape(a) for a in sorted(alias, key=len, reverse=True)) + r")(?!\w)",
+        re.IGNORECASE,
+    )
+
+    def medir(nombre, funcion, datos):
+        inicio = time.perf_counter()
+        for dato in datos:
+            funcion(dato)
+        segundos = time.perf_counter() - inicio
+        print(f"{nombre:<38} {segundos * 1000:8.1f} ms  {len(datos) / segundos:12,.0f} /s")
+
+    inicio = time.perf_counter()
+    RegistroMedios(config)
+    print(f"Medios: {len(config)}  alias: {len(alias)}  compilación: {(time.perf_counter() - inicio) * 1000:.1f} ms")
+    print(f"Títulos: {len(titulos)}  firmas: {len(firmas)}")
+    medir("separar (regex trie)", registro.separar, titulos)
+    medir("separar lineal (anterior)", separar_lineal, titulos)
+    medir("búsqueda regex trie", lambda t: registro._regex.search(t), titulos)
+    # La alternativa plana prueba cada alias en cada posición: se mide con una muestra
+    medir("búsqueda alternativa plana (10 %)", lambda t: alternativa.search(t), titulos[:len(titulos) // 10])
+    medir("firma (primeras líneas)", registro.en_firma, firmas)
@@ -0,0 +1,149 @@
+"""
+Miniaturas de la primera página de cada noticia, para la vista previa de la
+lista de selección.
+
+Se renderizan con `page.get_pixmap` a baja resolución en el mismo pool de un
+hilo que el análisis (PyMuPDF no es thread-safe), pero en lotes pequeños: cada
+lote, al terminar, vuelve a encolar el siguiente, así que una detección pedida
+mientras tanto espera como mucho un lote (unas decenas de ms), nunca a todas
+las miniaturas. Solo se piden las de las noticias visibles, y cada nueva
+petición de un PDF sustituye a las pendientes (cambiar de página en la lista
+descarta lo que ya no se ve).
+
+Las miniaturas se guardan por (hash del PDF, página) en una caché LRU del
+proceso con tope de memoria, compartida por todas las sesiones.
+"""
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor
+
+MINIATURA_DPI = int(os.getenv("MINIATURA_DPI", "40"))
+MINIATURAS_CACHE_MAX = int(float(os.getenv("MINIATURAS_CACHE_MB", "32")) * 1024 * 1024)
+# Páginas por lote: lo máximo que una detección puede tener que esperar
+PAGINAS_POR_LOTE = 4
+
+
+def renderizar_miniaturas(ruta_pdf, paginas, dpi: int = MINIATURA_DPI) -> dict[int, bytes]:
+    """PNG de cada página (1-based) del PDF."""
+    import fitz  # PyMuPDF; solo al renderizar
+
+    with fitz.open(ruta_pdf) as doc:
+        return {
+            pagina: doc.load_page(pagina - 1).get_pixmap(dpi=dpi).tobytes("png")
+            for pagina in paginas
+            if 1 <= pagina <= doc.page_count
+        }
+
+
+class GeneradorMiniaturas:
+    def __init__(self, executor: Executor, memoria_max: int = MINIATURAS_CACHE_MAX, dpi: int = MINIATURA_DPI):
+        self._executor = executor
+        self.memoria_max = memoria_max
+        self.dpi = dpi
+        self._lock = threading.Lock()
+        self._cache: OrderedDict[tuple[str, int], bytes] = OrderedDict()
+        self._memoria = 0
+        # sha256 -> (ruta, páginas pendientes en orden); orden de llegada de los PDFs
+        self._pendientes: OrderedDict[str, tuple[str, list[int]]] = OrderedDict()
+        self._en_curso: set[tuple[str, int]] = set()
+        self._fallidas: set[tuple[str, int]] = set()
+        self._trabajando = False
+
+    def olvidar_fallidas(self, sha256: str) -> None:
+        """Permite reintentar las miniaturas fallidas de un PDF (p. ej. al volver a subirlo)."""
+        with self._lock:
+            self._fallidas = {clave for clave in self._fallidas if clave[0] != sha256}
+
+    def pedir(self, ruta_pdf, sha256: str, paginas) -> dict[int, bytes]:
+        """
+        Devuelve las miniaturas ya disponibles de `paginas` y encola el resto
+        (sustituyendo lo pendiente de ese PDF). No bloquea.
+        """
+        listas, faltan = {}, []
+        with self._lock:
+            for pagina in paginas:
+                clave = (sha256, pagina)
+                png = self._cache.get(clave)
+                if png is not None:
+                    self._cache.move_to_end(clave)
+                    listas[pagina] = png
+                elif clave not in self._fallidas and clave not in self._en_curso:
+                    faltan.append(pagina)
+            if faltan:
+                self._pendientes[sha256] = (str(ruta_pdf), faltan)
+                self._pendientes.move_to_end(sha256)
+            else:
+                self._pendientes.pop(sha256, None)
+            if self._pendientes and not self._trabajando:
+                self._trabajando = True
+                self._executor.submit(self._lote)
+        return listas
+
+    def pendientes(self, sha256: str) -> int:
+        """Miniaturas de ese PDF encoladas o renderizándose."""
+        with self._lock:
+            entrada = self._pendientes.get(sha256)
+            en_curso = sum(1 for clave in self._en_curso if clave[0] == sha256)
+            return (len(entrada[1]) if entrada else 0) + en_curso
+
+    def _lote(self) -> None:
+        encadenado = False
+        sha256, lote = "", []
+        try:
+            with self._lock:
+                if not self._pendientes:
+                    # pedir() retiró lo pendiente (ya estaba en caché) antes de que corriera el lote
+                    encadenado = self._encadenar()
+                    return
+                sha256, (ruta, paginas) = next(iter(self._pendientes.items()))
+                lote = paginas[:PAGINAS_POR_LOTE]
+                del paginas[:PAGINAS_POR_LOTE]
+                if not paginas:
+                    del self._pendientes[sha256]
+                self._en_curso.update((sha256, pagina) for pagina in lote)
+            try:
+                pngs = renderizar_miniaturas(ruta, lote, self.dpi)
+            except Exception:
+                # El PDF ya no existe (sesión cerrada o reemplazada): no se cachea nada
+                pngs = {}
+            with self._lock:
+                for pagina in lote:
+                    clave = (sha256, pagina)
+                    self._en_curso.discard(clave)
+                    png = pngs.get(pagina)
+                    if png is None:
+                        # No se reintenta en bucle; al volver a subir el PDF se pide de nuevo
+                        self._fallidas.add(clave)
+                    else:
+                        self._guardar(clave, png)
+                encadenado = self._encadenar()
+        finally:
+            if not encadenado:
+                # Pase lo que pase en el lote, el generador no se queda marcado como ocupado
+                with self._lock:
+                    self._en_curso.difference_update((sha256, pagina) for pagina in lote)
+                    self._trabajando = False
+
+    def _encadenar(self) -> bool:
+        """Con el lock tomado: encola el siguiente lote si queda algo. True si lo encoló."""
+        if not self._pendientes:
+            self._trabajando = False
+            return False
+        # Al final de la cola del pool: lo enviado mientras tanto (una detección) va antes
+        self._executor.submit(self._lote)
+        return True
+
+    def _guardar(self, clave: tuple[str, int], png: bytes) -> None:
+        anterior = self._cache.pop(clave, None)
+        if anterior is not None:
+            self._memoria -= len(anterior)
+        self._cache[clave] = png
+        self._memoria += len(png)
+        while self._memoria > self.memoria_max and len(self._cache) > 1:
+            _, expulsada = self._cache.popitem(last=False)
+            self._memoria -= len(expulsada)
+
+    def memoria(self) -> int:
+        with self._lock:
+            return self._memoria
@@ -0,0 +1,299 @@
+"""
+Perfiles de maquetación por editor: dónde está la página de índice y cómo se
+reconocen los títulos en los compendios de una misma fuente.
+
+Cada compendio llega con la maquetación de quien lo arma (portada o no, letra
+de los títulos, rótulos repetidos en cada página). La primera vez que se ve una
+maquetación se averigua con heurísticas:
+  - página de índice: entre las primeras páginas, la que tiene más líneas con
+    viñeta, líneas que terminan en un medio ("Título, Reuters") y enlaces
+    internos, en proporción a sus líneas;
+  - umbrales de título: los de siempre (negrita, >= 12 pt, >= 25 caracteres) y,
+    si con ellos no sale ningún título, los que tienen en las páginas de
+    artículos las líneas que aparecen en el índice;
+  - rótulos excluidos: los "títulos" que se repiten idénticos en varias páginas
+    y no están en el índice (encabezados de sección, avisos).
+Lo aprendido se guarda bajo la huella de la maquetación (productor del PDF,
+tamaño de página y forma de la primera página), así que los compendios
+siguientes de la misma fuente van directos a la detección sin heurísticas. Un
+perfil solo se guarda, y solo se usa después, si los títulos que saca casan con
+el índice (cobertura_indice >= COBERTURA_MINIMA); si no, se olvida y se vuelve a
+aprender.
+
+Se guarda en perfiles_pdf.sqlite3 (ruta configurable con PRENSA_PERFILES_DB).
+
+    python perfiles_pdf.py                    # perfiles aprendidos
+    python perfiles_pdf.py --olvidar HUELLA   # volver a aprenderlo la próxima vez
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+from medios import obtener_registro_medios
+
+RUTA_PERFILES = os.getenv(
+    "PRENSA_PERFILES_DB",
+    str(Path(__file__).resolve().parent / "perfiles_pdf.sqlite3"),
+)
+
+PAGINAS_EXPLORADAS = 4  # el índice se busca entre las primeras páginas
+PAGINAS_MUESTRA = 12  # páginas de artículos que se miran para aprender umbrales
+# Los guiones y asteriscos solo son viñeta si los sigue un espacio ("-3% en...", "*Exclusiva*")
+_VINETA = re.compile(r"^(?:[•·▪●◦‣]\s*|[-–*](?:\s+|$))")
+PUNTUACION_MINIMA = 2.0
+PALABRAS_PORTADA = 40  # una primera página con menos palabras se toma por portada
+REPETICIONES_ROTULO = 3
+COBERTURA_MINIMA = 0.5  # ver cobertura_indice
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS perfiles (
+    huella TEXT PRIMARY KEY,
+    perfil TEXT NOT NULL,
+    muestra TEXT NOT NULL,
+    usos INTEGER NOT NULL DEFAULT 0,
+    creado TEXT NOT NULL,
+    usado TEXT NOT NULL
+);
+"""
+
+
+class PerfilMaquetacion:
+    """Página de índice y criterio de título de una maquetación."""
+
+    __slots__ = ("pagina_indice", "tamano_min", "negrita", "longitud_min", "excluidos")
+
+    def __init__(
+        self,
+        pagina_indice: int = 1,
+        tamano_min: float = 12,
+        negrita: bool = True,
+        longitud_min: int = 25,
+        excluidos=("Uso General", "Información"),
+    ):
+        self.pagina_indice = pagina_indice
+        self.tamano_min = tamano_min
+        self.negrita = negrita
+        self.longitud_min = longitud_min
+        self.excluidos = frozenset(excluidos)
+
+    def con(self, **cambios) -> "PerfilMaquetacion":
+        datos = self.a_dict()
+        datos.update(cambios)
+        return PerfilMaquetacion(**datos)
+
+    def a_dict(self) -> dict:
+        return {
+            "pagina_indice": self.pagina_indice,
+            "tamano_min": self.tamano_min,
+            "negrita": self.negrita,
+            "longitud_min": self.longitud_min,
+            "excluidos": sorted(self.excluidos),
+        }
+
+    def __repr__(self):
+        return f"PerfilMaquetacion({self.a_dict()!r})"
+
+
+def _sin_subconjunto(fuente: str) -> str:
+    # Las fuentes incrustadas llevan un prefijo aleatorio por PDF: "ABCDEF+Arial-Bold"
+    prefijo, mas, resto = fuente.partition("+")
+    return resto if mas and len(prefijo) == 6 else fuente
+
+
+def _parece_portada(pagina) -> bool:
+    return len(pagina.get_text("text").split()) < PALABRAS_PORTADA
+
+
+def huella_maquetacion(doc) -> str:
+    """
+    Huella de la maquetación, no del contenido: programa que generó el PDF,
+    tamaño de página y, de la primera página, sus fuentes, si tiene imágenes y
+    si es casi sin texto (portada o índice: la misma fuente con y sin portada
+    da huellas distintas).
+    """
+    metadatos = doc.metadata or {}
+    partes = [metadatos.get("producer") or "", metadatos.get("creator") or ""]
+    if doc.page_count:
+        pagina = doc.load_page(0)
+        partes.append("%.0fx%.0f" % (pagina.rect.width, pagina.rect.height))
+        partes.append("imagenes" if pagina.get_images() else "sin_imagenes")
+        partes.append("portada" if _parece_portada(pagina) else "texto")
+        partes.extend(sorted({_sin_subconjunto(f[3]) for f in pagina.get_fonts()}))
+    return hashlib.sha256("\x1f".join(partes).encode("utf-8")).hexdigest()[:32]
+
+
+def quitar_vineta(linea: str) -> str:
+    """La línea sin espacios alrededor ni la viñeta inicial, si la tiene."""
+    return _VINETA.sub("", linea.strip())
+
+
+def puntuar_pagina_indice(pagina, registro=None) -> float:
+    """
+    Cuánto parece un índice: líneas con viñeta, líneas que acaban en un medio y
+    enlaces internos, ponderado por la proporción de líneas así (una lista con
+    viñetas dentro de un artículo puntúa poco).
+    """
+    registro = registro or obtener_registro_medios()
+    lineas = [linea.strip() for linea in pagina.get_text("text").splitlines() if linea.strip()]
+    if len(lineas) < 2:
+        return 0.0
+    sin_vineta = [quitar_vineta(linea) for linea in lineas]
+    vinetas = sum(1 for linea, texto in zip(lineas, sin_vineta) if texto != linea)
+    con_medio = sum(1 for texto in sin_vineta if registro.en_titulo(texto) is not None)
+    # kind 1 = LINK_GOTO, 4 = LINK_NAMED: enlaces a otras páginas del mismo PDF
+    enlaces = sum(1 for enlace in pagina.get_links() if enlace.get("kind") in (1, 4))
+    densidad = max(vinetas, con_medio, min(enlaces, len(lineas))) / len(lineas)
+    return (vinetas + con_medio + enlaces) * densidad
+
+
+def detectar_pagina_indice(doc, max_paginas: int = PAGINAS_EXPLORADAS) -> int:
+    """
+    Página (0-based) del índice entre las primeras `max_paginas`. Si ninguna lo
+    parece, se decide por la primera página: casi sin texto es una portada.
+    """
+    registro = obtener_registro_medios()
+    mejor, mejor_puntuacion = None, PUNTUACION_MINIMA
+    for numero in range(min(max_paginas, doc.page_count)):
+        puntuacion = puntuar_pagina_indice(doc.load_page(numero), registro)
+        if puntuacion >= mejor_puntuacion:
+            mejor, mejor_puntuacion = numero, puntuacion
+    if mejor is not None:
+        return mejor
+    if doc.page_count > 1 and _parece_portada(doc.load_page(0)):
+        return 1
+    return 0
+
+
+def aprender_umbrales(doc, perfil: PerfilMaquetacion, lineas_indice: list[str]) -> PerfilMaquetacion | None:
+    """
+    Umbrales de título sacados de las líneas de las páginas de artículos que
+    aparecen en el índice: el tamaño mínimo, si todas van en negrita y la
+    longitud mínima. None si ninguna línea coincide.
+    """
+    muestras = []
+    primera = perfil.pagina_indice + 1
+    for numero in range(primera, min(primera + PAGINAS_MUESTRA, doc.page_count)):
+        for bloque in doc.load_page(numero).get_text("dict")["blocks"]:
+            if bloque["type"] != 0:
+                continue
+            for linea in bloque["lines"]:
+                spans = linea.get("spans", [])
+                texto = "".join(span["text"] for span in spans).strip()
+                # Las líneas muy cortas (fechas, "Reuters") aparecen en cualquier parte
+                if len(texto) < 12 or texto in perfil.excluidos:
+                    continue
+                if any(texto in linea_indice for linea_indice in lineas_indice):
+                    muestras.append((texto, spans[0]["font"], spans[0]["size"]))
+                    break
+    if not muestras:
+        return None
+    return perfil.con(
+        tamano_min=int(min(size for _, _, size in muestras) * 2) / 2,
+        negrita=all("bold" in font.lower() for _, font, _ in muestras),
+        longitud_min=min(perfil.longitud_min, min(len(texto) for texto, _, _ in muestras)),
+    )
+
+
+def rotulos_repetidos(titulos: list[tuple[str, int]], lineas_indice: list[str]) -> set[str]:
+    """Textos detectados como título en varias páginas y que no vienen en el índice."""
+    paginas = Counter(texto for texto, _ in dict.fromkeys(titulos))
+    return {
+        texto
+        for texto, veces in paginas.items()
+        if veces >= REPETICIONES_ROTULO and not any(texto in linea for linea in lineas_indice)
+    }
+
+
+def cobertura_indice(titulos: list[tuple[str, int]], lineas_indice: list[str]) -> float:
+    """
+    Cuánto casan los títulos detectados con el índice: la menor de dos
+    fracciones, la de títulos que vienen en el índice y la de líneas del índice
+    que tienen título. Si el índice no cabe en su página, trae solo las primeras
+    notas: los títulos se miden hasta tantos como líneas tiene.
+    """
+    if not titulos or not lineas_indice:
+        return 0.0
+    primeros = titulos[: len(lineas_indice)]
+    en_indice = sum(1 for texto, _ in primeros if any(texto in linea for linea in lineas_indice))
+    con_titulo = sum(1 for linea in lineas_indice if any(texto in linea for texto, _ in titulos))
+    return min(en_indice / len(primeros), con_titulo / len(lineas_indice))
+
+
+class ArchivoPerfiles:
+    def __init__(self, ruta: str = RUTA_PERFILES):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(ruta, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_ESQUEMA)
+
+    def buscar(self, huella: str) -> PerfilMaquetacion | None:
+        with self._lock, self._conn:
+            fila = self._conn.execute("SELECT perfil FROM perfiles WHERE huella = ?", (huella,)).fetchone()
+            if fila is None:
+                return None
+            self._conn.execute(
+                "UPDATE perfiles SET usos = usos + 1, usado = ? WHERE huella = ?",
+                (datetime.now().isoformat(timespec="seconds"), huella),
+            )
+        return PerfilMaquetacion(**json.loads(fila[0]))
+
+    def guardar(self, huella: str, perfil: PerfilMaquetacion, muestra: str = "") -> None:
+        ahora = datetime.now().isoformat(timespec="seconds")
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO perfiles (huella, perfil, muestra, creado, usado) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(huella) DO UPDATE SET perfil = excluded.perfil, muestra = excluded.muestra, "
+                "usado = excluded.usado",
+                (huella, json.dumps(perfil.a_dict(), ensure_ascii=False), muestra, ahora, ahora),
+            )
+
+    def olvidar(self, huella: str) -> bool:
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM perfiles WHERE huella = ?", (huella,)).rowcount > 0
+
+    def listar(self) -> list[tuple]:
+        """(huella, perfil, muestra, usos, usado) de todos los perfiles, el más reciente primero."""
+        with self._lock:
+            filas = self._conn.execute(
+                "SELECT huella, perfil, muestra, usos, usado FROM perfiles ORDER BY usado DESC"
+            ).fetchall()
+        return [(h, PerfilMaquetacion(**json.loads(p)), m, u, f) for h, p, m, u, f in filas]
+
+    def cerrar(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_ARCHIVO: ArchivoPerfiles | None = None
+_ARCHIVO_LOCK = threading.Lock()
+
+
+def obtener_archivo_perfiles() -> ArchivoPerfiles:
+    """Archivo único por proceso, abierto en el primer uso."""
+    global _ARCHIVO
+    with _ARCHIVO_LOCK:
+        if _ARCHIVO is None:
+            _ARCHIVO = ArchivoPerfiles()
+        return _ARCHIVO
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Consulta los perfiles de maquetación aprendidos.")
+    parser.add_argument("--olvidar", metavar="HUELLA", help="Borrar un perfil (se vuelve a aprender).")
+    args = parser.parse_args()
+
+    archivo = obtener_archivo_perfiles()
+    if args.olvidar:
+        print("Perfil borrado." if archivo.olvidar(args.olvidar) else "No hay un perfil con esa huella.")
+    else:
+        for huella, perfil, muestra, usos, usado in archivo.listar():
+            print(f"{huella}  {muestra}  ({usos} usos, último {usado})")
+            print(f"    {json.dumps(perfil.a_dict(), ensure_ascii=False)}")
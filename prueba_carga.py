@@ -0,0 +1,313 @@
+"""
+Prueba de carga de la app: N analistas simulados usando la app a la vez (el
+pico de las 8 a.m.), cada uno con el flujo completo en un AppTest de Streamlit:
+
+  login -> carga del PDF -> detección -> resúmenes -> descarga del reporte
+
+Todas las sesiones corren en este proceso, como en el servidor desplegado:
+comparten el gestor de tareas (un hilo de PDFs, RESUMEN_HILOS llamadas a la
+API), las cachés y los archivos SQLite. La API es api_simulada.py y los
+archivos de huellas, de prensa y de consumo van a un directorio temporal, así
+que no se gasta ni se ensucia nada real.
+
+AppTest no es thread-safe (cada ejecución instala su propio Runtime global),
+así que las ejecuciones del script se turnan con un lock; el trabajo de fondo
+(detección, resúmenes) sí corre en paralelo. El tiempo esperando turno se
+descuenta de cada etapa y se informa aparte ("cola de scripts", también por
+etapa) para no confundirlo con la app.
+
+    python prueba_carga.py --sesiones 8 --llegada 2 --articulos 40
+    python prueba_carga.py --sesiones 16 --distintos --latencia 1.0 --tasa-error 0.1
+
+Informa percentiles de latencia por etapa, memoria pico del proceso y
+rendimiento (sesiones y noticias por minuto); con --salida, también en JSON.
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+DIRECTORIO_APP = Path(__file__).resolve().parent
+ETAPAS = ("login", "carga", "deteccion", "resumenes", "descarga")
+CONTRASENA = "prueba-carga"
+_TURNO_SCRIPT = threading.Lock()
+
+
+def memoria_rss() -> int:
+    """RSS actual del proceso en bytes (Linux); 0 si no se puede leer."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+class MonitorMemoria:
+    """Muestrea el RSS en un hilo para conocer el pico durante la prueba."""
+
+    def __init__(self, intervalo: float = 0.05):
+        self.intervalo = intervalo
+        self.inicial = memoria_rss()
+        self.pico = self.inicial
+        self._parar = threading.Event()
+        self._hilo = threading.Thread(target=self._muestrear, daemon=True)
+
+    def _muestrear(self):
+        while not self._parar.wait(self.intervalo):
+            self.pico = max(self.pico, memoria_rss())
+
+    def __enter__(self):
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._parar.set()
+        self._hilo.join()
+        # Por si el muestreo se perdió un pico breve (ru_maxrss está en KB en Linux)
+        self.pico = max(self.pico, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024)
+
+
+def _correr(at, registro: dict) -> None:
+    """Una ejecución del script, esperando turno (ver docstring del módulo)."""
+    inicio = time.perf_counter()
+    with _TURNO_SCRIPT:
+        registro["cola_scripts"] += time.perf_counter() - inicio
+        at.run()
+
+
+def _empezar(registro: dict) -> tuple[float, float]:
+    """Marca de inicio de una etapa: el reloj y la espera de turno acumulada."""
+    return time.perf_counter(), registro["cola_scripts"]
+
+
+def _terminar(registro: dict, etapa: str, marca: tuple[float, float]) -> None:
+    """Guarda la duración de la etapa sin la espera de turno de sus ejecuciones (que va aparte)."""
+    inicio, cola = marca
+    espera = registro["cola_scripts"] - cola
+    registro["cola_etapas"][etapa] = espera
+    registro["etapas"][etapa] = time.perf_counter() - inicio - espera
+
+
+def _esperar(at, registro: dict, condicion, limite: float, intervalo: float) -> None:
+    """Repite la ejecución (como hacen los fragmentos con run_every) hasta que se cumpla `condicion`."""
+    fin = time.monotonic() + limite
+    while not condicion(at):
+        if at.exception:
+            raise Exception(at.exception[0].value)
+        if time.monotonic() > fin:
+            raise Exception(f"Tiempo de espera agotado ({limite:.0f} s)")
+        time.sleep(intervalo)
+        _correr(at, registro)
+
+
+def _boton(at, texto: str):
+    for boton in at.button:
+        if texto in boton.label:
+            return boton
+    raise Exception(f"No aparece el botón '{texto}'")
+
+
+def simular_analista(n: int, pdf: bytes, limite: float, intervalo: float) -> dict:
+    """Una sesión completa; devuelve los segundos de cada etapa (y el error, si lo hubo)."""
+    from streamlit.testing.v1 import AppTest
+
+    registro = {"sesion": n, "etapas": {}, "cola_scripts": 0.0, "cola_etapas": {}, "error": None}
+    etapa = "login"
+    try:
+        at = AppTest.from_file(str(DIRECTORIO_APP / "app_streamlit.py"), default_timeout=limite)
+        at.secrets["PRESS_PASS"] = CONTRASENA
+
+        marca = _empezar(registro)
+        _correr(at, registro)
+        at.text_input[0].input(CONTRASENA)
+        _boton(at, "Entrar").click()
+        _correr(at, registro)
+        _esperar(at, registro, lambda a: a.file_uploader, limite, intervalo)
+        _terminar(registro, "login", marca)
+
+        etapa = "carga"
+        marca = _empezar(registro)
+        at.file_uploader[0].upload(f"prensa_{n}.pdf", pdf, "application/pdf")
+        _correr(at, registro)
+        _terminar(registro, "carga", marca)
+
+        etapa = "deteccion"
+        marca = _empezar(registro)
+        _boton(at, "Detectar noticias").click()
+        _correr(at, registro)
+        _esperar(at, registro, lambda a: a.multiselect or a.error or a.warning, limite, intervalo)
+        if not at.multiselect:
+            raise Exception("; ".join(e.value for e in [*at.error, *at.warning]))
+        _terminar(registro, "deteccion", marca)
+        registro["noticias"] = len(at.multiselect[0].options)
+        # Cada sesión es un reporte independiente: no se suma al reporte del día de las demás
+        for casilla in at.checkbox:
+            if "reporte de hoy" in casilla.label:
+                casilla.uncheck()
+
+        etapa = "resumenes"
+        marca = _empezar(registro)
+        _boton(at, "Generar resúmenes").click()
+        _correr(at, registro)
+        _esperar(
+            at,
+            registro,
+            lambda a: any("Resúmenes generados" in s.value for s in a.success) or a.warning,
+            limite,
+            intervalo,
+        )
+        _terminar(registro, "resumenes", marca)
+        registro["fallidas"] = bool(at.warning)
+
+        etapa = "descarga"
+        marca = _empezar(registro)
+        _boton(at, "Crear reporte").click()
+        _correr(at, registro)
+        if not at.get("download_button"):
+            raise Exception("No apareció el botón de descarga")
+        _terminar(registro, "descarga", marca)
+    except Exception as e:
+        registro["error"] = f"{etapa}: {e}"
+    return registro
+
+
+def percentiles(valores: list[float]) -> dict:
+    if not valores:
+        return {}
+    ordenados = sorted(valores)
+
+    def p(q):
+        return round(ordenados[min(len(ordenados) - 1, int(len(ordenados) * q))], 3)
+
+    return {"n": len(ordenados), "p50": p(0.50), "p90": p(0.90), "p99": p(0.99), "max": round(ordenados[-1], 3)}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Prueba de carga de la app con N sesiones simultáneas.")
+    parser.add_argument("--sesiones", type=int, default=8, help="Analistas simulados.")
+    parser.add_argument("--llegada", type=float, default=0.0, help="Segundos en que se reparten las llegadas.")
+    parser.add_argument("--pdf", help="PDF a usar (por defecto uno sintético de benchmark.py).")
+    parser.add_argument("--articulos", type=int, default=30, help="Artículos del PDF sintético.")
+    parser.add_argument(
+        "--distintos",
+        action="store_true",
+        help="Un PDF sintético distinto por sesión (sin reutilizar resúmenes entre analistas).",
+    )
+    parser.add_argument("--latencia", type=float, default=0.5, help="Latencia de la API simulada (s).")
+    parser.add_argument("--latencia-jitter", type=float, default=0.2)
+    parser.add_argument("--tasa-error", type=float, default=0.0)
+    parser.add_argument("--limite", type=float, default=300.0, help="Tiempo máximo por etapa (s).")
+    parser.add_argument("--intervalo", type=float, default=0.5, help="Cada cuánto se refresca una sesión que espera (s).")
+    parser.add_argument("--salida", help="Guardar los resultados en este JSON.")
+    args = parser.parse_args(argv)
+
+    temporal = tempfile.TemporaryDirectory(prefix="prensa_carga_")
+    # Antes de importar la app: sus archivos SQLite y la API apuntan a lo temporal/simulado
+    os.environ["PRENSA_HUELLAS_DB"] = str(Path(temporal.name) / "huellas.sqlite3")
+    os.environ["PRENSA_ARCHIVO_DB"] = str(Path(temporal.name) / "archivo_prensa.sqlite3")
+    os.environ["PRENSA_CONSUMO_DB"] = str(Path(temporal.name) / "consumo_api.sqlite3")
+    os.environ["PRENSA_REPORTES_DB"] = str(Path(temporal.name) / "reportes_dia.sqlite3")
+    os.environ["PRENSA_PERFILES_DB"] = str(Path(temporal.name) / "perfiles_pdf.sqlite3")
+    from api_simulada import ConfigFallos, iniciar_servidor
+
+    servidor, url, estado_api = iniciar_servidor(
+        ConfigFallos(latencia=args.latencia, latencia_jitter=args.latencia_jitter, tasa_error=args.tasa_error)
+    )
+    os.environ["ANTHROPIC_API_URL"] = url
+    os.environ["ANTHROPIC_API_KEY"] = "prueba-carga"
+    # La app carga sus imágenes con rutas relativas
+    os.chdir(DIRECTORIO_APP)
+
+    if args.pdf:
+        pdfs = [Path(args.pdf).read_bytes()] * args.sesiones
+    else:
+        from benchmark import generar_pdf_sintetico
+
+        pdfs = []
+        for n in range(args.sesiones if args.distintos else 1):
+            ruta = Path(temporal.name) / f"sintetico_{n}.pdf"
+            generar_pdf_sintetico(ruta, args.articulos, semilla=n)
+            pdfs.append(ruta.read_bytes())
+        if not args.distintos:
+            pdfs *= args.sesiones
+
+    llegadas = sorted(random.Random(0).uniform(0, args.llegada) for _ in range(args.sesiones))
+    registros: list[dict] = [None] * args.sesiones
+
+    def ejecutar(n):
+        time.sleep(llegadas[n])
+        registros[n] = simular_analista(n, pdfs[n], args.limite, args.intervalo)
+
+    print(f"{args.sesiones} sesiones (llegadas en {args.llegada:.0f} s), API simulada con "
+          f"{args.latencia:.2f} s de latencia y {args.tasa_error:.0%} de errores...")
+    inicio = time.perf_counter()
+    with MonitorMemoria() as memoria:
+        hilos = [threading.Thread(target=ejecutar, args=(n,), name=f"analista-{n}") for n in range(args.sesiones)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+    duracion = time.perf_counter() - inicio
+    servidor.shutdown()
+
+    completas = [r for r in registros if r["error"] is None]
+    noticias = sum(r.get("noticias", 0) for r in completas)
+    resultado = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "config": vars(args),
+        "duracion_s": round(duracion, 3),
+        "sesiones_completas": len(completas),
+        "sesiones_con_error": len(registros) - len(completas),
+        "etapas": {
+            etapa: percentiles([r["etapas"][etapa] for r in registros if etapa in r["etapas"]])
+            for etapa in ETAPAS
+        },
+        "total_sesion": percentiles([sum(r["etapas"].values()) for r in completas]),
+        "cola_scripts": percentiles([r["cola_scripts"] for r in registros]),
+        # Ya descontada de "etapas": cuánto esperó turno cada etapa
+        "cola_por_etapa": {
+            etapa: percentiles([r["cola_etapas"][etapa] for r in registros if etapa in r["cola_etapas"]])
+            for etapa in ETAPAS
+        },
+        "rendimiento": {
+            "sesiones_por_minuto": round(len(completas) / duracion * 60, 2),
+            "noticias_por_minuto": round(noticias / duracion * 60, 1),
+            "peticiones_api": estado_api.peticiones,
+            "errores_api_simulados": estado_api.errores,
+        },
+        "memoria_mb": {
+            "inicial": round(memoria.inicial / 2**20, 1),
+            "pico": round(memoria.pico / 2**20, 1),
+        },
+        "errores": [r["error"] for r in registros if r["error"]],
+    }
+
+    print(f"\nDuración: {duracion:.1f} s  completas: {len(completas)}/{args.sesiones}")
+    print(f"{'etapa':<12} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}   (segundos)")
+    filas = [*resultado["etapas"].items(), ("total", resultado["total_sesion"])]
+    for etapa, p in [*filas, ("cola scripts", resultado["cola_scripts"])]:
+        if p:
+            print(f"{etapa:<12} {p['p50']:8.2f} {p['p90']:8.2f} {p['p99']:8.2f} {p['max']:8.2f}")
+    rendimiento = resultado["rendimiento"]
+    print(f"Rendimiento: {rendimiento['sesiones_por_minuto']} sesiones/min, "
+          f"{rendimiento['noticias_por_minuto']} noticias/min, {rendimiento['peticiones_api']} peticiones a la API")
+    print(f"Memoria: {resultado['memoria_mb']['inicial']} MB al inicio, pico {resultado['memoria_mb']['pico']} MB")
+    for error in resultado["errores"]:
+        print(f"  error: {error}")
+
+    if args.salida:
+        Path(args.salida).write_text(json.dumps(resultado, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"Resultados en {args.salida}")
+    temporal.cleanup()
+    return 1 if resultado["errores"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,282 @@
+"""
+Estado del reporte del día, para actualizarlo con resúmenes tardíos y
+correcciones sin rehacerlo entero.
+
+Cada nota incluida en el reporte de hoy se guarda con su huella SimHash, el
+hash de su texto, el resumen y el PDF del que salió. Al llegar otro PDF el
+mismo día, cada envío se clasifica contra el reporte:
+  - 'igual': mismo texto que una nota ya incluida; se conserva su resumen (no
+    se llama a la API).
+  - 'cambiada': casi duplicada de una nota incluida del mismo medio (o con el
+    mismo título) pero con otro texto (una corrección); se resume de nuevo y
+    reemplaza a la anterior en su sitio. La misma historia de otro medio no
+    reemplaza a nada: es 'nueva'.
+  - 'nueva': se resume y se añade al final.
+Las notas casi sin texto (sin huella, ver duplicados.py) solo son 'igual' a
+otra con el mismo título y texto, y nunca 'cambiada': dos notas que son solo
+una imagen no son la misma nota.
+El Word se vuelve a emitir con todas las notas del día; gen_reporte reutiliza el
+XML ya renderizado de las que no cambiaron, así que el coste sigue al cambio.
+
+Se guarda en reportes_dia.sqlite3 (ruta configurable con PRENSA_REPORTES_DB).
+
+    python reporte_dia.py                     # notas del reporte de hoy
+    python reporte_dia.py --docx hoy.docx     # volver a emitir el Word
+    python reporte_dia.py --vaciar            # empezar el reporte de hoy de cero
+"""
+import argparse
+import os
+import sqlite3
+import threading
+from datetime import date, datetime
+from pathlib import Path
+
+from analisis_pdf import titulo_y_medio_envio
+from archivo_prensa import hash_texto
+from duplicados import HUELLA_VACIA, UMBRAL_HAMMING, distancia_hamming
+
+RUTA_REPORTES_DIA = os.getenv(
+    "PRENSA_REPORTES_DB",
+    str(Path(__file__).resolve().parent / "reportes_dia.sqlite3"),
+)
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS notas (
+    id INTEGER PRIMARY KEY,
+    fecha TEXT NOT NULL,
+    posicion INTEGER NOT NULL,
+    huella INTEGER NOT NULL,
+    hash_texto TEXT NOT NULL,
+    titulo TEXT NOT NULL,
+    medio TEXT NOT NULL,
+    resumen TEXT NOT NULL,
+    pagina_inicio INTEGER,
+    pdf_url TEXT NOT NULL,
+    archivo TEXT NOT NULL,
+    actualizada TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_notas_fecha ON notas(fecha, posicion);
+"""
+
+
+def _a_sqlite(huella: int) -> int:
+    # SQLite guarda enteros de 64 bits con signo
+    return huella - (1 << 64) if huella >= (1 << 63) else huella
+
+
+def _desde_sqlite(valor: int) -> int:
+    return valor + (1 << 64) if valor < 0 else valor
+
+
+def texto_envio(envio: dict) -> str:
+    """Lo que se manda a resumir: el texto de la nota o, si es combinada, el de todas sus fuentes."""
+    return "\n".join(envio["textos"]) if "textos" in envio else envio["texto"]
+
+
+def hash_envio(envio: dict) -> str:
+    """Hash con el que se reconoce una nota ya incluida; sin huella, el título también cuenta."""
+    if envio["huella"] == HUELLA_VACIA:
+        return hash_texto(envio["titulo"] + "\n" + texto_envio(envio))
+    return hash_texto(texto_envio(envio))
+
+
+class NotaDia:
+    __slots__ = (
+        "id", "posicion", "huella", "hash_texto", "titulo", "medio", "resumen", "pagina_inicio", "pdf_url", "archivo",
+    )
+
+    def __init__(self, id, posicion, huella, hash_texto, titulo, medio, resumen, pagina_inicio, pdf_url, archivo):
+        self.id = id
+        self.posicion = posicion
+        self.huella = _desde_sqlite(huella)
+        self.hash_texto = hash_texto
+        self.titulo = titulo
+        self.medio = medio
+        self.resumen = resumen
+        self.pagina_inicio = pagina_inicio
+        self.pdf_url = pdf_url
+        self.archivo = archivo
+
+    def item(self) -> dict:
+        """La nota como item de gen_reporte (con su propia URL de PDF)."""
+        return {
+            "titulo": self.titulo,
+            "medio": self.medio,
+            "resumen": self.resumen,
+            "pagina_inicio": self.pagina_inicio,
+            "pdf_url": self.pdf_url,
+        }
+
+
+def _misma_fuente(titulo: str, medio: str, nota: NotaDia) -> bool:
+    """Mismo título o algún medio en común (los combinados citan varios: "Reuters / Bloomberg")."""
+    if titulo.casefold() == nota.titulo.casefold():
+        return True
+    medios = {m for m in medio.split(" / ") if m}
+    return bool(medios & set(nota.medio.split(" / ")))
+
+
+def _clasificar(envio: dict, hash_: str, notas: list[NotaDia], usadas: set, umbral: int) -> tuple[str, NotaDia | None]:
+    huella = envio["huella"]
+    titulo, medio = titulo_y_medio_envio(envio)
+    mejor, mejor_distancia = None, umbral + 1
+    for nota in notas:
+        if nota.id in usadas:
+            continue
+        if nota.hash_texto == hash_:
+            return "igual", nota
+        if huella == HUELLA_VACIA or nota.huella == HUELLA_VACIA:
+            continue
+        distancia = distancia_hamming(huella, nota.huella)
+        if distancia < mejor_distancia and _misma_fuente(titulo, medio, nota):
+            mejor, mejor_distancia = nota, distancia
+    return ("cambiada", mejor) if mejor is not None else ("nueva", None)
+
+
+class ReporteDia:
+    def __init__(self, ruta: str = RUTA_REPORTES_DIA):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(ruta, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_ESQUEMA)
+
+    def _notas(self, fecha: str) -> list[NotaDia]:
+        filas = self._conn.execute(
+            "SELECT id, posicion, huella, hash_texto, titulo, medio, resumen, pagina_inicio, pdf_url, archivo "
+            "FROM notas WHERE fecha = ? ORDER BY posicion",
+            (fecha,),
+        ).fetchall()
+        return [NotaDia(*fila) for fila in filas]
+
+    def notas(self, fecha: str | None = None) -> list[NotaDia]:
+        with self._lock:
+            return self._notas(fecha or date.today().isoformat())
+
+    def items(self, fecha: str | None = None) -> list[dict]:
+        """Todas las notas del día, en orden, listas para gen_reporte."""
+        return [nota.item() for nota in self.notas(fecha)]
+
+    def total(self, fecha: str | None = None) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM notas WHERE fecha = ?", (fecha or date.today().isoformat(),)
+            ).fetchone()[0]
+
+    def clasificar(self, envios: list[dict], fecha: str | None = None, umbral: int = UMBRAL_HAMMING) -> list[tuple]:
+        """
+        (estado, nota del reporte o None) para cada envío, con estado 'igual',
+        'cambiada' o 'nueva'. Cada nota del reporte se empareja como mucho una vez.
+        """
+        notas = self.notas(fecha)
+        usadas = set()
+        resultado = []
+        for envio in envios:
+            estado, nota = _clasificar(envio, hash_envio(envio), notas, usadas, umbral)
+            if nota is not None:
+                usadas.add(nota.id)
+            resultado.append((estado, nota))
+        return resultado
+
+    def actualizar(
+        self,
+        entradas,
+        archivo: str,
+        pdf_url: str = "",
+        fecha: str | None = None,
+        umbral: int = UMBRAL_HAMMING,
+    ) -> tuple[int, int]:
+        """
+        Incorpora al reporte del día los pares (envío, item) de un PDF: las notas
+        iguales se dejan como están, las cambiadas se reemplazan en su posición y
+        las nuevas se añaden al final. Se vuelve a clasificar dentro del lock, así
+        que dos PDFs procesados a la vez no duplican notas. Devuelve (nuevas, reemplazadas).
+        """
+        fecha = fecha or date.today().isoformat()
+        ahora = datetime.now().isoformat(timespec="seconds")
+        nuevas = reemplazadas = 0
+        with self._lock, self._conn:
+            notas = self._notas(fecha)
+            usadas = set()
+            siguiente = max((n.posicion for n in notas), default=0) + 1
+            for envio, item in entradas:
+                hash_ = hash_envio(envio)
+                estado, nota = _clasificar(envio, hash_, notas, usadas, umbral)
+                if estado == "igual":
+                    usadas.add(nota.id)
+                    continue
+                valores = (
+                    _a_sqlite(envio["huella"]),
+                    hash_,
+                    item["titulo"],
+                    item.get("medio", ""),
+                    item["resumen"],
+                    item.get("pagina_inicio"),
+                    item.get("pdf_url", pdf_url) or "",
+                    archivo,
+                    ahora,
+                )
+                if estado == "cambiada":
+                    usadas.add(nota.id)
+                    self._conn.execute(
+                        "UPDATE notas SET huella = ?, hash_texto = ?, titulo = ?, medio = ?, resumen = ?, "
+                        "pagina_inicio = ?, pdf_url = ?, archivo = ?, actualizada = ? WHERE id = ?",
+                        (*valores, nota.id),
+                    )
+                    reemplazadas += 1
+                else:
+                    cursor = self._conn.execute(
+                        "INSERT INTO notas (huella, hash_texto, titulo, medio, resumen, pagina_inicio, pdf_url, "
+                        "archivo, actualizada, fecha, posicion) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (*valores, fecha, siguiente),
+                    )
+                    # Una nota añadida ya cuenta para los siguientes envíos del mismo PDF
+                    notas.append(NotaDia(cursor.lastrowid, siguiente, valores[0], hash_, *valores[2:8]))
+                    usadas.add(cursor.lastrowid)
+                    siguiente += 1
+                    nuevas += 1
+        return nuevas, reemplazadas
+
+    def vaciar(self, fecha: str | None = None) -> int:
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "DELETE FROM notas WHERE fecha = ?", (fecha or date.today().isoformat(),)
+            ).rowcount
+
+    def cerrar(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_REPORTE: ReporteDia | None = None
+_REPORTE_LOCK = threading.Lock()
+
+
+def obtener_reporte_dia() -> ReporteDia:
+    """Estado único por proceso, abierto en el primer uso."""
+    global _REPORTE
+    with _REPORTE_LOCK:
+        if _REPORTE is None:
+            _REPORTE = ReporteDia()
+        return _REPORTE
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Consulta o reemite el reporte de prensa del día.")
+    parser.add_argument("--fecha", help="Día (AAAA-MM-DD); por defecto hoy.")
+    parser.add_argument("--docx", help="Volver a emitir el Word del día en esta ruta.")
+    parser.add_argument("--logo", default="logo_bx.png", help="Logo del encabezado del reporte.")
+    parser.add_argument("--vaciar", action="store_true", help="Borrar las notas del día.")
+    args = parser.parse_args()
+
+    reporte = obtener_reporte_dia()
+    if args.vaciar:
+        print(f"{reporte.vaciar(args.fecha)} notas borradas.")
+    else:
+        notas = reporte.notas(args.fecha)
+        for nota in notas:
+            print(f"{nota.posicion:>3}. {nota.titulo}" + (f" ({nota.medio})" if nota.medio else "") + f"  [{nota.archivo}]")
+        if args.docx:
+            from gen_reporte import guardar_reporte_word
+
+            print(guardar_reporte_word([n.item() for n in notas], args.docx, args.logo))
@@ -0,0 +1,203 @@
+"""
+Resumen especulativo en segundo plano.
+
+En cuanto se detectan las noticias se empiezan a resumir todas en un pool de
+hilos, mientras el analista revisa la lista. Las que se deseleccionan se
+cancelan (si aún no empezaron) y al pulsar "Generar resúmenes" solo se recoge
+lo que ya está hecho; lo que falte se resume en ese momento.
+"""
+import contextvars
+import os
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from consumo_api import etiquetar
+from trazas import perfilar, tramo
+from summary_claude import resumir_con_claude, resumir_grupo_con_claude
+
+HILOS_RESUMEN = int(os.getenv("RESUMEN_HILOS", "4"))
+
+
+def clave_noticia(noticia: dict) -> tuple:
+    clave = (noticia["pagina_inicio"], noticia["titulo"])
+    # Un resumen combinado (varias fuentes) no es intercambiable con el individual
+    if "textos" in noticia:
+        clave += ("multifuente", len(noticia["textos"]))
+    return clave
+
+
+def resumenes_previos(envios: list[dict], vistas: dict) -> dict:
+    """
+    clave -> resumen ya reportado, para los envíos individuales cuya noticia está
+    en el archivo de huellas (los combinados multifuente se piden siempre).
+    """
+    return {
+        clave_noticia(envio): vistas[envio["pagina_inicio"]].resumen
+        for envio in envios
+        if "textos" not in envio and envio["pagina_inicio"] in vistas
+    }
+
+
+class ResumidorEspeculativo:
+    def __init__(
+        self,
+        max_workers: int = HILOS_RESUMEN,
+        executor: ThreadPoolExecutor | None = None,
+        etiquetas: dict | None = None,
+    ):
+        # Reporte/documento/origen a los que se apunta el consumo de la API (consumo_api)
+        self._etiquetas = etiquetas or {}
+        # Contexto de quien crea el resumidor (traza activa): lo heredan todas sus tareas,
+        # también las que se vuelven a encolar en reruns posteriores
+        self._contexto = contextvars.copy_context()
+        # Si se pasa un executor compartido (gestor_tareas), no es nuestro: no lo cerramos
+        self._propio = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="resumen")
+        self._lock = threading.Lock()
+        self._noticias: dict[tuple, dict] = {}
+        self._futuros: dict[tuple, Future] = {}
+        self._previos: set[tuple] = set()
+        self._cerrado = False
+
+    def lanzar(self, noticias: list[dict], previos: dict | None = None) -> None:
+        """
+        Encola el resumen de todas las noticias (en orden de aparición).
+        `previos` (clave -> resumen) da por hechas las que ya tienen resumen,
+        p. ej. las reutilizadas del archivo de huellas: no llaman a la API.
+        """
+        previos = previos or {}
+        with self._lock:
+            if self._cerrado:
+                return
+            for noticia in noticias:
+                clave = clave_noticia(noticia)
+                self._noticias[clave] = noticia
+                futuro = self._futuros.get(clave)
+                # Un resumen reutilizado que ya no se quiere reutilizar se pide de nuevo
+                descartado = clave in self._previos and clave not in previos
+                if futuro is None or futuro.cancelled() or descartado:
+                    if clave in previos:
+                        futuro = Future()
+                        futuro.set_result(previos[clave])
+                        self._futuros[clave] = futuro
+                        self._previos.add(clave)
+                    else:
+                        self._futuros[clave] = self._enviar(noticia)
+                        self._previos.discard(clave)
+
+    def _enviar(self, noticia: dict) -> Future:
+        # Un Context no se puede ejecutar en dos hilos a la vez: una copia por tarea
+        return self._executor.submit(self._contexto.copy().run, self._resumir, noticia)
+
+    def _resumir(self, noticia: dict) -> str:
+        # Las etiquetas viven en el hilo del pool: se fijan aquí, no en quien encola
+        titulo = noticia.get("titulo", "")
+        with etiquetar(**self._etiquetas, articulo=titulo), tramo("resumen", "api", articulo=titulo), perfilar():
+            if "textos" in noticia:
+                return resumir_grupo_con_claude(noticia["textos"], titulos=noticia.get("titulos"))
+            return resumir_con_claude(noticia["texto"], titulo=noticia.get("titulo", ""))
+
+    def ajustar_seleccion(self, claves_seleccionadas) -> None:
+        """
+        Cancela las noticias deseleccionadas que aún no empezaron y vuelve a
+        encolar las que se seleccionan de nuevo tras haber sido canceladas.
+        """
+        seleccion = set(claves_seleccionadas)
+        with self._lock:
+            for clave, futuro in list(self._futuros.items()):
+                if clave not in seleccion:
+                    futuro.cancel()
+                elif futuro.cancelled() and not self._cerrado:
+                    self._futuros[clave] = self._enviar(self._noticias[clave])
+
+    def fijar_resultado(self, clave: tuple, resumen: str) -> None:
+        """Da por resuelta una noticia con un resumen obtenido por otra vía (p. ej. extractivo)."""
+        futuro = Future()
+        futuro.set_result(resumen)
+        with self._lock:
+            anterior = self._futuros.get(clave)
+            if anterior is not None:
+                anterior.cancel()
+            self._futuros[clave] = futuro
+
+    def reintentar_fallidas(self, claves=None) -> int:
+        """Vuelve a encolar las noticias que fallaron (todas o solo las indicadas)."""
+        n = 0
+        with self._lock:
+            for clave, futuro in list(self._futuros.items()):
+                if claves is not None and clave not in claves:
+                    continue
+                if futuro.done() and not futuro.cancelled() and futuro.exception() is not None:
+                    self._futuros[clave] = self._enviar(self._noticias[clave])
+                    n += 1
+        return n
+
+    def estado(self, clave: tuple) -> str | None:
+        """'hecho', 'error', 'en_curso', 'cancelado' o None si no se lanzó."""
+        with self._lock:
+            futuro = self._futuros.get(clave)
+        if futuro is None:
+            return None
+        if futuro.cancelled():
+            return "cancelado"
+        if not futuro.done():
+            return "en_curso"
+        return "hecho" if futuro.exception() is None else "error"
+
+    def error(self, clave: tuple) -> str:
+        with self._lock:
+            futuro = self._futuros.get(clave)
+        if futuro is None or not futuro.done() or futuro.cancelled():
+            return ""
+        e = futuro.exception()
+        return str(e) if e is not None else ""
+
+    def recoger(self, clave: tuple, esperar: bool = True) -> str | None:
+        """
+        Devuelve el resumen si ya está (o esperando a que termine si está en curso).
+        None si se canceló, falló o no se lanzó: el llamador lo resume él mismo.
+        """
+        with self._lock:
+            futuro = self._futuros.get(clave)
+        if futuro is None or futuro.cancelled():
+            return None
+        if not esperar and not futuro.done():
+            return None
+        try:
+            return futuro.result()
+        except Exception:
+            return None
+
+    def progreso(self, claves=None) -> tuple[int, int]:
+        """(terminados con éxito, total no cancelados), opcionalmente solo de `claves`."""
+        with self._lock:
+            futuros = [
+                f for c, f in self._futuros.items()
+                if not f.cancelled() and (claves is None or c in claves)
+            ]
+        hechos = sum(1 for f in futuros if f.done() and f.exception() is None)
+        return hechos, len(futuros)
+
+    def en_curso(self) -> int:
+        """Resúmenes encolados o ejecutándose."""
+        with self._lock:
+            return sum(1 for f in self._futuros.values() if not f.done())
+
+    def memoria(self) -> int:
+        """Bytes aproximados de los resúmenes ya obtenidos (los textos son de la sesión)."""
+        with self._lock:
+            futuros = list(self._futuros.values())
+        return sum(
+            sys.getsizeof(f.result())
+            for f in futuros
+            if f.done() and not f.cancelled() and f.exception() is None
+        )
+
+    def cerrar(self) -> None:
+        with self._lock:
+            self._cerrado = True
+            for futuro in self._futuros.values():
+                futuro.cancel()
+        if self._propio:
+            self._executor.shutdown(wait=False, cancel_futures=True)
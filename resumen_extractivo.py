@@ -0,0 +1,187 @@
+"""
+Resumen extractivo local (sin API), con TextRank sobre TF-IDF en NumPy.
+
+Dos usos:
+  - Respaldo instantáneo cuando la API está lenta, limitada o caída: elige las
+    oraciones más centrales del artículo hasta el mismo objetivo de 110–120
+    palabras que pide _generar_prompt.
+  - Compresión previa: enviar al LLM solo las oraciones mejor puntuadas en
+    lugar del artículo completo (menos tokens de entrada).
+
+Benchmark sobre PDFs archivados (cada página se trata como un artículo):
+
+    python resumen_extractivo.py archivo/*.pdf
+"""
+import re
+import sys
+import time
+
+import numpy as np
+
+from duplicados import normalizar_texto
+
+PALABRAS_MIN = 110
+PALABRAS_MAX = 120
+AMORTIGUACION = 0.85      # factor de TextRank/PageRank
+UMBRAL_SIMILITUD = 0.05   # aristas más débiles se descartan (matriz dispersa)
+ITERACIONES_MAX = 50
+
+_STOPWORDS = {
+    # ES
+    "el", "la", "los", "las", "de", "del", "al", "y", "o", "en", "que", "por", "para",
+    "con", "un", "una", "unos", "unas", "se", "su", "sus", "es", "son", "como", "mas",
+    "pero", "lo", "le", "les", "a", "ha", "han", "fue", "ser", "este", "esta", "estos",
+    "ya", "no", "si", "sobre", "entre", "tambien", "muy", "sin",
+    # EN
+    "the", "and", "of", "to", "in", "for", "on", "with", "as", "by", "from", "that",
+    "this", "it", "at", "is", "are", "was", "were", "be", "been", "has", "have", "had",
+    "an", "a", "or", "its", "will", "would", "said", "not", "but", "he", "she", "they",
+}
+
+_RE_CORTE = re.compile(r"(?<=[.!?…])[\"”’»)]?\s+(?=[\"“«¿¡(]?[A-ZÁÉÍÓÚÑ0-9])")
+
+
+def limpiar_texto_pdf(texto: str) -> str:
+    """Une palabras cortadas con guion al final de línea y colapsa espacios."""
+    t = re.sub(r"(\w)-\n(\w)", r"\1\2", texto or "")
+    return re.sub(r"\s+", " ", t).strip()
+
+
+def dividir_oraciones(texto: str) -> list[str]:
+    oraciones = [o.strip() for o in _RE_CORTE.split(limpiar_texto_pdf(texto))]
+    # Fuera fragmentos sueltos (pies de página, números, encabezados)
+    return [o for o in oraciones if len(o.split()) >= 4]
+
+
+def _matriz_tfidf(oraciones: list[str]) -> np.ndarray:
+    """Filas = oraciones, normalizadas a norma 1 (coseno = producto punto)."""
+    tokens = [[p for p in normalizar_texto(o) if p not in _STOPWORDS and len(p) > 1] for o in oraciones]
+    vocabulario: dict[str, int] = {}
+    filas, columnas = [], []
+    for i, palabras in enumerate(tokens):
+        for p in palabras:
+            filas.append(i)
+            columnas.append(vocabulario.setdefault(p, len(vocabulario)))
+
+    tf = np.zeros((len(oraciones), max(len(vocabulario), 1)), dtype=np.float32)
+    np.add.at(tf, (np.array(filas, dtype=np.intp), np.array(columnas, dtype=np.intp)), 1.0)
+
+    df = np.count_nonzero(tf, axis=0)
+    idf = np.log((1 + len(oraciones)) / (1 + df)) + 1.0
+    x = tf * idf
+    normas = np.linalg.norm(x, axis=1, keepdims=True)
+    normas[normas == 0] = 1.0
+    return x / normas
+
+
+def puntuar_oraciones(oraciones: list[str]) -> np.ndarray:
+    """
+    TextRank: PageRank sobre el grafo de similitud coseno entre oraciones.
+    Las aristas por debajo de UMBRAL_SIMILITUD se eliminan, así que la matriz
+    de transición es mayormente ceros.
+    """
+    n = len(oraciones)
+    if n == 0:
+        return np.zeros(0, dtype=np.float32)
+    if n == 1:
+        return np.ones(1, dtype=np.float32)
+
+    x = _matriz_tfidf(oraciones)
+    sim = x @ x.T
+    np.fill_diagonal(sim, 0.0)
+    sim[sim < UMBRAL_SIMILITUD] = 0.0
+
+    grados = sim.sum(axis=1, keepdims=True)
+    aisladas = grados[:, 0] == 0
+    grados[aisladas] = 1.0
+    transicion = sim / grados
+    # Las oraciones sin aristas reparten su peso de forma uniforme
+    transicion[aisladas] = 1.0 / n
+
+    puntos = np.full(n, 1.0 / n, dtype=np.float32)
+    for _ in range(ITERACIONES_MAX):
+        nuevos = (1 - AMORTIGUACION) / n + AMORTIGUACION * (transicion.T @ puntos)
+        if np.abs(nuevos - puntos).sum() < 1e-6:
+            puntos = nuevos
+            break
+        puntos = nuevos
+
+    # Leve ventaja a las primeras oraciones (pirámide invertida periodística)
+    posicion = 1.0 + 0.3 / (1.0 + np.arange(n, dtype=np.float32))
+    return puntos * posicion
+
+
+def _seleccionar(oraciones: list[str], puntos: np.ndarray, max_palabras: int, min_palabras: int = 0) -> str:
+    """Las mejor puntuadas que quepan en max_palabras, en su orden original."""
+    elegidas, total = [], 0
+    for i in np.argsort(-puntos, kind="stable"):
+        largo = len(oraciones[i].split())
+        if total + largo > max_palabras:
+            continue
+        elegidas.append(int(i))
+        total += largo
+        if total >= max(min_palabras, max_palabras - 3):
+            break
+
+    if not elegidas and oraciones:
+        # Ninguna oración cabe entera: recortamos la mejor
+        mejor = oraciones[int(np.argmax(puntos))].split()
+        return " ".join(mejor[:max_palabras])
+    return " ".join(oraciones[i] for i in sorted(elegidas))
+
+
+def resumen_extractivo(texto: str, min_palabras: int = PALABRAS_MIN, max_palabras: int = PALABRAS_MAX) -> str:
+    """Resumen de respaldo en el mismo rango de palabras que el prompt del LLM."""
+    oraciones = dividir_oraciones(texto)
+    if not oraciones:
+        return " ".join(limpiar_texto_pdf(texto).split()[:max_palabras])
+    return _seleccionar(oraciones, puntuar_oraciones(oraciones), max_palabras, min_palabras)
+
+
+def comprimir_texto(texto: str, max_palabras: int) -> str:
+    """
+    Deja solo las oraciones mejor puntuadas (en orden) hasta max_palabras.
+    Si el texto ya es más corto, se devuelve tal cual.
+    """
+    if len((texto or "").split()) <= max_palabras:
+        return texto
+    oraciones = dividir_oraciones(texto)
+    if not oraciones:
+        return texto
+    return _seleccionar(oraciones, puntuar_oraciones(oraciones), max_palabras)
+
+
+if __name__ == "__main__":
+    import fitz  # PyMuPDF
+
+    rutas = sys.argv[1:]
+    if not rutas:
+        print("Uso: python resumen_extractivo.py archivo1.pdf [archivo2.pdf ...]")
+        sys.exit(1)
+
+    textos = []
+    for ruta in rutas:
+        with fitz.open(ruta) as doc:
+            textos.extend(page.get_text() for page in doc)
+    textos = [t for t in textos if len(t.split()) >= 50]
+
+    n_oraciones = 0
+    n_palabras = 0
+    tiempos = []
+    for texto in textos:
+        inicio = time.perf_counter()
+        resumen = resumen_extractivo(texto)
+        tiempos.append(time.perf_counter() - inicio)
+        n_oraciones += len(dividir_oraciones(texto))
+        n_palabras += len(resumen.split())
+
+    if not tiempos:
+        print("No hay páginas con texto suficiente.")
+        sys.exit(0)
+    total = sum(tiempos)
+    tiempos.sort()
+    print(f"Artículos: {len(textos)}  oraciones: {n_oraciones}")
+    print(f"Tiempo total: {total:.3f} s  ({len(textos) / total:.1f} artículos/s, {n_oraciones / total:.0f} oraciones/s)")
+    print(f"Por artículo: mediana {tiempos[len(tiempos) // 2] * 1000:.2f} ms, "
+          f"p95 {tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))] * 1000:.2f} ms")
+    print(f"Palabras por resumen (media): {n_palabras / len(textos):.0f}")
@@ -1,36 +1,297 @@
 import os
+import random
+import threading
+import time
 import httpx
 import re
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
 from pathlib import Path
-from dotenv import load_dotenv
-import streamlit as st
 
-# Cargar .env de forma robusta (funciona en Codespaces, CLI, etc.)
+from consumo_api import LlamadaAPI, registrar_llamada
+from trazas import tramo
+
+# Importar este módulo no lee .env, ni st.secrets, ni exige la API key: todo eso
+# se resuelve en la primera llamada (obtener_config). Así lo pueden importar la
+# app, el procesamiento por lotes y sus procesos de trabajo sin coste ni errores.
 ENV_PATH = Path(__file__).resolve().parent / ".env"
-load_dotenv(dotenv_path=ENV_PATH)
-
-# Cargar API key desde .env (local) o desde secrets de Streamlit Cloud
-API_KEY = (
-    os.getenv("ANTHROPIC_API_KEY")           # local, usando archivo .env
-    or st.secrets.get("ANTHROPIC_API_KEY")   # en despliegue (Streamlit Cloud)
-)
-
-if not API_KEY:
-    raise RuntimeError(
-        "No se encontró ANTHROPIC_API_KEY ni en .env ni en st.secrets. "
-        "Define la API en tu archivo .env (local) o en los Secrets de Streamlit Cloud."
-    )
 
-API_URL = "https://api.anthropic.com/v1/messages"
+# 429 = rate limit, 529 = API sobrecargada, 408/409 = timeout/conflicto del lado servidor
+ESTADOS_REINTENTABLES = {408, 409, 429, 529}
+RETRY_AFTER_MAX = 60.0  # no esperamos más de esto aunque el servidor lo pida
+
+
+@dataclass(frozen=True)
+class ConfigAPI:
+    api_key: str
+    # Permite apuntar a un servidor local (p. ej. api_simulada.py) para pruebas de fallos
+    api_url: str = "https://api.anthropic.com/v1/messages"
+    # Haiku por defecto (Opus suele requerir acceso especial)
+    model: str = "claude-3-5-haiku-20241022"
+    timeout: float = 60.0
+    max_reintentos: int = 4
+    backoff_base: float = 1.0   # segundos
+    backoff_max: float = 30.0   # tope del backoff exponencial
+    # Si > 0, antes de llamar a la API el artículo se reduce a sus oraciones más
+    # relevantes (resumen_extractivo.comprimir_texto) hasta este número de palabras
+    comprimir_palabras: int = 0
+    circuito_umbral: int = 5
+    circuito_enfriamiento: float = 30.0
+
+    @property
+    def headers(self) -> dict:
+        return {
+            "x-api-key": self.api_key,
+            "anthropic-version": "2023-06-01",
+            "content-type": "application/json",
+        }
+
+
+def _leer_api_key() -> str | None:
+    """API key desde .env / entorno (local) o desde los secrets de Streamlit Cloud."""
+    api_key = os.getenv("ANTHROPIC_API_KEY")
+    if api_key:
+        return api_key
+    try:
+        import streamlit as st
+        return st.secrets.get("ANTHROPIC_API_KEY")
+    except Exception:
+        # Sin Streamlit o sin secrets.toml (CLI, procesos de trabajo)
+        return None
+
 
-# Permite sobreescribir por variable de entorno; usa Haiku por defecto (Opus suele requerir acceso especial)
-MODEL = os.getenv("ANTHROPIC_MODEL", "claude-3-5-haiku-20241022")
+_CONFIG: ConfigAPI | None = None
+_CONFIG_LOCK = threading.Lock()
 
-HEADERS = {
-    "x-api-key": API_KEY,
-    "anthropic-version": "2023-06-01",
-    "content-type": "application/json",
-}
+
+def obtener_config() -> ConfigAPI:
+    """Configuración de la API, resuelta una sola vez en el primer uso."""
+    global _CONFIG
+    with _CONFIG_LOCK:
+        if _CONFIG is None:
+            # Cargar .env de forma robusta (funciona en Codespaces, CLI, etc.)
+            from dotenv import load_dotenv
+            load_dotenv(dotenv_path=ENV_PATH)
+
+            api_key = _leer_api_key()
+            if not api_key:
+                raise RuntimeError(
+                    "No se encontró ANTHROPIC_API_KEY ni en .env ni en st.secrets. "
+                    "Define la API en tu archivo .env (local) o en los Secrets de Streamlit Cloud."
+                )
+            defecto = ConfigAPI(api_key=api_key)
+            _CONFIG = ConfigAPI(
+                api_key=api_key,
+                api_url=os.getenv("ANTHROPIC_API_URL", defecto.api_url),
+                model=os.getenv("ANTHROPIC_MODEL", defecto.model),
+                timeout=float(os.getenv("ANTHROPIC_TIMEOUT", defecto.timeout)),
+                max_reintentos=int(os.getenv("ANTHROPIC_MAX_REINTENTOS", defecto.max_reintentos)),
+                backoff_base=float(os.getenv("ANTHROPIC_BACKOFF_BASE", defecto.backoff_base)),
+                backoff_max=float(os.getenv("ANTHROPIC_BACKOFF_MAX", defecto.backoff_max)),
+                comprimir_palabras=int(os.getenv("RESUMEN_COMPRIMIR_PALABRAS", defecto.comprimir_palabras)),
+                circuito_umbral=int(os.getenv("ANTHROPIC_CIRCUITO_UMBRAL", defecto.circuito_umbral)),
+                circuito_enfriamiento=float(
+                    os.getenv("ANTHROPIC_CIRCUITO_ENFRIAMIENTO", defecto.circuito_enfriamiento)
+                ),
+            )
+        return _CONFIG
+
+
+# -----------------------------
+# Reintentos y circuit breaker
+# -----------------------------
+class CircuitoAbiertoError(Exception):
+    """La API falló demasiadas veces seguidas; no se intenta hasta que pase el enfriamiento."""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker sencillo y thread-safe:
+      - cerrado: las llamadas pasan; se cuentan los fallos consecutivos.
+      - abierto: tras `umbral_fallos` fallos seguidos, se falla rápido durante `enfriamiento` s.
+      - semiabierto: pasado el enfriamiento se deja pasar una sola llamada de prueba.
+    Un fallo es una petición que agotó sus reintentos, no cada intento: una sola
+    nota problemática no abre el circuito para todas las sesiones.
+    """
+
+    def __init__(self, umbral_fallos: int = 5, enfriamiento: float = 30.0):
+        self.umbral_fallos = umbral_fallos
+        self.enfriamiento = enfriamiento
+        self._lock = threading.Lock()
+        self._fallos = 0
+        self._abierto_desde: float | None = None
+        self._prueba_en_curso = False
+
+    def permitir(self) -> bool:
+        """Lanza CircuitoAbiertoError si está abierto; True si esta es la llamada de prueba."""
+        with self._lock:
+            if self._abierto_desde is None:
+                return False
+            restante = self.enfriamiento - (time.monotonic() - self._abierto_desde)
+            if restante > 0 or self._prueba_en_curso:
+                raise CircuitoAbiertoError(
+                    f"La API de Anthropic parece caída ({self._fallos} fallos seguidos). "
+                    f"Reintenta en {max(restante, 0):.0f} s."
+                )
+            # Semiabierto: dejamos pasar una llamada de prueba
+            self._prueba_en_curso = True
+            return True
+
+    def registrar_exito(self) -> None:
+        with self._lock:
+            self._fallos = 0
+            self._abierto_desde = None
+            self._prueba_en_curso = False
+
+    def registrar_fallo(self) -> None:
+        with self._lock:
+            self._fallos += 1
+            if self._prueba_en_curso or self._fallos >= self.umbral_fallos:
+                self._abierto_desde = time.monotonic()
+            self._prueba_en_curso = False
+
+
+_CIRCUITO: CircuitBreaker | None = None
+_CIRCUITO_LOCK = threading.Lock()
+
+
+def obtener_circuito() -> CircuitBreaker:
+    """Circuit breaker único por proceso, con los umbrales de la configuración."""
+    global _CIRCUITO
+    with _CIRCUITO_LOCK:
+        if _CIRCUITO is None:
+            config = obtener_config()
+            _CIRCUITO = CircuitBreaker(config.circuito_umbral, config.circuito_enfriamiento)
+        return _CIRCUITO
+
+
+_CLIENTE: httpx.Client | None = None
+_CLIENTE_LOCK = threading.Lock()
+
+
+def obtener_cliente_http() -> httpx.Client:
+    """
+    Cliente HTTP único por proceso: reutiliza las conexiones (TLS incluido) entre
+    llamadas en vez de montar un cliente nuevo en cada httpx.post.
+    """
+    global _CLIENTE
+    with _CLIENTE_LOCK:
+        if _CLIENTE is None:
+            _CLIENTE = httpx.Client()
+        return _CLIENTE
+
+
+def _es_reintentable(status_code: int) -> bool:
+    return status_code in ESTADOS_REINTENTABLES or status_code >= 500
+
+
+def _leer_retry_after(resp: httpx.Response | None) -> float | None:
+    """
+    Devuelve los segundos indicados por la cabecera retry-after (entero o fecha HTTP).
+    """
+    if resp is None:
+        return None
+    valor = resp.headers.get("retry-after")
+    if not valor:
+        return None
+    try:
+        return max(float(valor), 0.0)
+    except ValueError:
+        pass
+    try:
+        fecha = parsedate_to_datetime(valor)
+        return max(fecha.timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _calcular_espera(intento: int, resp: httpx.Response | None, config: ConfigAPI) -> float:
+    """
+    Respeta retry-after si viene; si no, backoff exponencial con "full jitter".
+    """
+    retry_after = _leer_retry_after(resp)
+    if retry_after is not None:
+        return min(retry_after, RETRY_AFTER_MAX)
+    return random.uniform(0, min(config.backoff_max, config.backoff_base * (2 ** intento)))
+
+
+def _post_con_reintentos(body: dict, llamada: LlamadaAPI | None = None) -> httpx.Response:
+    """
+    POST a la API con reintentos ante 429/529/5xx/timeouts.
+    Devuelve la última respuesta (aunque sea de error) para que el llamador
+    genere el mensaje adecuado; si solo hubo errores de red, relanza el último.
+    Si se pasa `llamada`, anota en ella los intentos hechos.
+    """
+    config = obtener_config()
+    circuito = obtener_circuito()
+    cliente = obtener_cliente_http()
+    ultimo_error: Exception | None = None
+    resp: httpx.Response | None = None
+
+    for intento in range(config.max_reintentos + 1):
+        es_prueba = circuito.permitir()
+        if llamada is not None:
+            llamada.intentos = intento + 1
+        try:
+            resp = cliente.post(config.api_url, headers=config.headers, json=body, timeout=config.timeout)
+        except (httpx.TimeoutException, httpx.TransportError) as e:
+            ultimo_error, resp = e, None
+        else:
+            if not _es_reintentable(resp.status_code):
+                # 200 o errores definitivos (401/403/400): la API está respondiendo
+                circuito.registrar_exito()
+                return resp
+        if es_prueba:
+            # La llamada de prueba falló: el circuito se vuelve a abrir y se falla
+            # ya con CircuitoAbiertoError, sin esperar al siguiente intento
+            circuito.registrar_fallo()
+            circuito.permitir()
+
+        if intento < config.max_reintentos:
+            with tramo("espera_reintento", "api", intento=intento + 1):
+                time.sleep(_calcular_espera(intento, resp, config))
+
+    # Reintentos agotados: cuenta como un solo fallo
+    circuito.registrar_fallo()
+    if resp is not None:
+        return resp
+    raise Exception(f"Error de conexión con la API tras {config.max_reintentos + 1} intentos: {ultimo_error}")
+
+
+def _llamar_api(body: dict, motivo: str) -> httpx.Response:
+    """
+    _post_con_reintentos + registro en consumo_api (tokens, intentos, latencia),
+    también si la llamada acaba en error o con el circuito abierto.
+    """
+    llamada = LlamadaAPI(body["model"], motivo)
+    inicio = time.perf_counter()
+    tramo_api = tramo("llamada_api", "api", motivo=motivo)
+    try:
+        with tramo_api:
+            resp = _post_con_reintentos(body, llamada)
+        llamada.estado = str(resp.status_code)
+        if resp.status_code == 200:
+            try:
+                llamada.leer_uso(resp.json())
+            except ValueError:
+                pass  # el llamador se encarga de la respuesta mal formada
+        return resp
+    except CircuitoAbiertoError:
+        llamada.estado = "circuito"
+        raise
+    except Exception:
+        llamada.estado = "red"
+        raise
+    finally:
+        llamada.latencia_s = time.perf_counter() - inicio
+        # El evento guarda el mismo dict de args: se puede anotar después de cerrarlo
+        tramo_api.anotar(
+            estado=llamada.estado,
+            intentos=llamada.intentos,
+            tokens_entrada=llamada.tokens_entrada,
+            tokens_salida=llamada.tokens_salida,
+        )
+        registrar_llamada(llamada)
 
 # -----------------------------
 # Detección de idioma (ES vs EN)
@@ -86,10 +347,11 @@ def limpiar_prefacio(resumen: str) -> str:
     return r
 
 
-def _generar_prompt(texto: str, idioma_forzado: str | None = None) -> str:
+def _generar_prompt(texto: str, idioma_forzado: str | None = None, multifuente: bool = False) -> str:
     """
     Prompt neutro (ES/EN) para minimizar sesgo de idioma.
     Si idioma_forzado se pasa, obliga explícitamente 'es' o 'en'.
+    Si multifuente, el texto trae varias versiones de la misma noticia.
     """
     if idioma_forzado == "en":
         lang_line = "Write the summary in English. Do NOT translate into Spanish."
@@ -108,32 +370,54 @@ def _generar_prompt(texto: str, idioma_forzado: str | None = None) -> str:
         "3) Do NOT include meta phrases like: \"Here's a summary\", \"Here is\", \"Resumen:\", "
         "\"A continuación\", \"In conclusion\", etc.\n"
         "4) Target length: 110–120 words.\n"
-        "5) Focus on facts: what happened, who, where, when, key figures, minimal context.\n\n"
+        "5) Focus on facts: what happened, who, where, when, key figures, minimal context.\n"
+        + (
+            "6) The text contains several articles on the SAME story from different outlets. "
+            "Merge them into ONE summary without repeating facts; note any discrepancy in figures.\n"
+            "   El texto trae varias notas de la MISMA historia de distintos medios: "
+            "combínalas en UN resumen sin repetir datos.\n"
+            if multifuente else ""
+        )
+        + "\n"
         "TEXT / TEXTO:\n"
         f"{texto}"
     )
     return prompt
 
 
-def resumir_con_claude(texto: str, titulo: str = "") -> str:
+def resumir_con_claude(
+    texto: str,
+    titulo: str = "",
+    multifuente: bool = False,
+    comprimir: int | None = None,
+) -> str:
     """
     1) Detecta idioma probable del texto (es/en).
     2) Pide resumen en el mismo idioma (sin sesgo fuerte).
     3) Si el resultado sale en idioma distinto, reintenta 1 vez forzando el idioma correcto.
+    `comprimir` (palabras) envía solo las oraciones mejor puntuadas; por defecto
+    RESUMEN_COMPRIMIR_PALABRAS. Los textos multifuente no se comprimen.
     """
+    config = obtener_config()
     idioma = detectar_idioma((titulo or "") + "\n" + (texto or ""))
 
+    comprimir = config.comprimir_palabras if comprimir is None else comprimir
+    if comprimir and not multifuente:
+        # NumPy solo se carga si de verdad se comprime
+        from resumen_extractivo import comprimir_texto
+        texto = comprimir_texto(texto, comprimir)
+
     # 1er intento (no forzado, solo "mismo idioma")
-    prompt = _generar_prompt(texto, idioma_forzado=None)
+    prompt = _generar_prompt(texto, idioma_forzado=None, multifuente=multifuente)
 
     body = {
-        "model": MODEL,
+        "model": config.model,
         "max_tokens": 300,
         "temperature": 0.3,
         "messages": [{"role": "user", "content": prompt}],
     }
 
-    resp = httpx.post(API_URL, headers=HEADERS, json=body, timeout=60)
+    resp = _llamar_api(body, "multifuente" if multifuente else "resumen")
 
     if resp.status_code == 200:
         data = resp.json()
@@ -143,9 +427,13 @@ def resumir_con_claude(texto: str, titulo: str = "") -> str:
         idioma_resumen = detectar_idioma(resumen)
         if idioma_resumen != idioma:
             # Reintento forzando el idioma del texto
-            prompt2 = _generar_prompt(texto, idioma_forzado=idioma)
+            prompt2 = _generar_prompt(texto, idioma_forzado=idioma, multifuente=multifuente)
             body["messages"] = [{"role": "user", "content": prompt2}]
-            resp2 = httpx.post(API_URL, headers=HEADERS, json=body, timeout=60)
+            try:
+                resp2 = _llamar_api(body, "idioma")
+            except Exception:
+                # Si el reintento de idioma falla, nos quedamos con el primer resumen
+                return resumen
 
             if resp2.status_code == 200:
                 data2 = resp2.json()
@@ -158,8 +446,20 @@ def resumir_con_claude(texto: str, titulo: str = "") -> str:
         raise Exception("401 autenticación: la x-api-key es inválida o no se envió (revisa Secrets/.env).")
     if resp.status_code == 403:
         raise Exception(
-            f"403 acceso denegado al modelo '{MODEL}'. Prueba con 'claude-3-haiku-20240307' "
+            f"403 acceso denegado al modelo '{config.model}'. Prueba con 'claude-3-haiku-20240307' "
             "o configura ANTHROPIC_MODEL a un modelo disponible para tu cuenta."
         )
 
-    raise Exception(f"Error al llamar a la API: {resp.status_code} - {resp.text}")
\ No newline at end of file
+    raise Exception(f"Error al llamar a la API: {resp.status_code} - {resp.text}")
+
+
+def resumir_grupo_con_claude(textos: list[str], titulos: list[str] | None = None) -> str:
+    """
+    Un solo resumen para varias notas de la misma historia (duplicados entre medios).
+    """
+    titulos = titulos or [""] * len(textos)
+    partes = [
+        f"--- SOURCE {i} / FUENTE {i}: {titulo} ---\n{texto}"
+        for i, (titulo, texto) in enumerate(zip(titulos, textos), 1)
+    ]
+    return resumir_con_claude("\n\n".join(partes), titulo=titulos[0] if titulos else "", multifuente=True)
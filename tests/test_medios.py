@@ -0,0 +1,40 @@
+from medios import RegistroMedios
+
+
+def _registro():
+    return RegistroMedios.desde_archivo()
+
+
+def test_firma_reconoce_formas_de_firma():
+    registro = _registro()
+    casos = {
+        "By Jane Doe, Reuters\nThe central bank held rates.": "Reuters",
+        "By Jane Doe\nReuters\nThe central bank held rates.": "Reuters",
+        "Por Ana Gómez | El País\nEl banco central mantuvo las tasas.": "El País",
+        "MADRID, 3 jun (Reuters) - El banco central mantuvo las tasas.": "Reuters",
+        "(Bloomberg) -- The Fed held rates steady on Wednesday.": "Bloomberg",
+        "Markets rally on jobs data\nBy John Roe - WSJ\nStocks rose.": "The Wall Street Journal",
+    }
+    for texto, medio in casos.items():
+        atribucion = registro.en_firma(texto)
+        assert atribucion is not None and atribucion.medio == medio, texto
+        assert texto[atribucion.inicio:atribucion.fin].lower() in texto.lower()
+
+
+def test_firma_ignora_medios_citados_en_titular_o_entradilla():
+    registro = _registro()
+    for texto in (
+        "El peso cae tras un reporte de Reuters\nLa moneda perdió 2 %.",
+        "El País informó que el banco central subirá las tasas.\nLos analistas lo esperaban.",
+        "Stocks fall, according to Bloomberg data\nThe S&P 500 dropped 1%.",
+        "Investors, citing a Financial Times report, sold bonds.\nYields rose.",
+    ):
+        assert registro.en_firma(texto) is None, texto
+
+
+def test_separar_no_atribuye_el_medio_de_la_entradilla():
+    registro = _registro()
+    titulo, medio, _ = registro.separar("El peso cae", "Según Reuters, el peso cayó.\nMás texto.")
+    assert (titulo, medio) == ("El peso cae", "")
+    _, medio, atribucion = registro.separar("El peso cae", "By Jane Doe, Reuters\nEl peso cayó.")
+    assert medio == "Reuters" and atribucion.origen == "firma"
@@ -0,0 +1,46 @@
+import fitz
+
+from analisis_pdf import obtener_titulos_portada
+from perfiles_pdf import quitar_vineta
+
+
+def test_quitar_vineta_solo_quita_vinetas():
+    assert quitar_vineta("• Central bank holds rates, Reuters") == "Central bank holds rates, Reuters"
+    assert quitar_vineta("- Central bank holds rates, Reuters") == "Central bank holds rates, Reuters"
+    assert quitar_vineta("* Exportaciones récord, El País") == "Exportaciones récord, El País"
+    assert quitar_vineta("-3% en las exportaciones, Reuters") == "-3% en las exportaciones, Reuters"
+    assert quitar_vineta("*Exclusiva* La fusión sigue en pie, Bloomberg") == "*Exclusiva* La fusión sigue en pie, Bloomberg"
+
+
+def test_titulos_del_indice_conservan_guion_inicial():
+    doc = fitz.open()
+    pagina = doc.new_page()
+    for i, linea in enumerate(["- Central bank holds rates, Reuters", "-3% en las exportaciones, Bloomberg"]):
+        pagina.insert_text((72, 72 + 20 * i), linea)
+    assert obtener_titulos_portada(doc, 0) == [
+        "Central bank holds rates, Reuters",
+        "-3% en las exportaciones, Bloomberg",
+    ]
+
+
+def test_perfil_guardado_que_no_casa_con_el_indice_se_descarta(tmp_path, monkeypatch):
+    import perfiles_pdf
+    from analisis_pdf import abrir_pdf, detectar_con_perfil
+    from benchmark import generar_pdf_sintetico
+    from perfiles_pdf import ArchivoPerfiles, PerfilMaquetacion, huella_maquetacion
+
+    archivo = ArchivoPerfiles(str(tmp_path / "perfiles.sqlite3"))
+    monkeypatch.setattr(perfiles_pdf, "_ARCHIVO", archivo)
+    ruta = tmp_path / "compendio.pdf"
+    generar_pdf_sintetico(ruta, 8)
+    doc = abrir_pdf(ruta)
+    # Con este perfil el encabezado "Uso General" de cada página sale como título
+    erroneo = PerfilMaquetacion(pagina_indice=1, tamano_min=8, negrita=False, longitud_min=5, excluidos=())
+    archivo.guardar(huella_maquetacion(doc), erroneo)
+
+    titulos, perfil, origen = detectar_con_perfil(doc)
+    assert origen == "heuristica"
+    assert len(titulos) == 8 and all(titulo.startswith("Titular") for titulo, _ in titulos)
+
+    titulos, _, origen = detectar_con_perfil(doc)
+    assert origen == "cache" and len(titulos) == 8
@@ -0,0 +1,47 @@
+from duplicados import distancia_hamming, huella_simhash
+from reporte_dia import ReporteDia
+
+TEXTO = (
+    "The central bank held its benchmark interest rate steady on Wednesday, citing slowing "
+    "inflation and a cooling labour market, and signalled that cuts could come later this year "
+    "if price pressures keep easing across the economy and wage growth continues to moderate. "
+    "Policymakers voted unanimously to keep the rate at 5.25 percent, the highest level in more than two decades, "
+    "and said they would watch incoming data on consumer spending, housing and business investment closely "
+    "before deciding on the timing and size of any reduction in borrowing costs for households and companies."
+)
+REIMPRESION = TEXTO + " Markets rose after the decision."
+
+
+def _envio(titulo, texto):
+    return {"titulo": titulo, "texto": texto, "huella": huella_simhash(texto), "pagina_inicio": 1}
+
+
+def _item(envio, medio):
+    return {"titulo": envio["titulo"].rsplit(",", 1)[0], "medio": medio, "resumen": "resumen", "pagina_inicio": 1}
+
+
+def _reporte(tmp_path):
+    return ReporteDia(str(tmp_path / "reportes.sqlite3"))
+
+
+def test_reimpresion_de_otro_medio_es_nueva(tmp_path):
+    reporte = _reporte(tmp_path)
+    original = _envio("Central bank holds rates, Reuters", TEXTO)
+    otro = _envio("Central bank keeps rates on hold, Bloomberg", REIMPRESION)
+    assert distancia_hamming(original["huella"], otro["huella"]) <= 3
+
+    assert reporte.actualizar([(original, _item(original, "Reuters"))], "a.pdf") == (1, 0)
+    assert [estado for estado, _ in reporte.clasificar([otro])] == ["nueva"]
+    assert reporte.actualizar([(otro, _item(otro, "Bloomberg"))], "b.pdf") == (1, 0)
+    assert [nota.medio for nota in reporte.notas()] == ["Reuters", "Bloomberg"]
+
+
+def test_correccion_del_mismo_medio_reemplaza(tmp_path):
+    reporte = _reporte(tmp_path)
+    original = _envio("Central bank holds rates, Reuters", TEXTO)
+    correccion = _envio("Central bank holds rates steady, Reuters", REIMPRESION)
+
+    reporte.actualizar([(original, _item(original, "Reuters"))], "a.pdf")
+    assert [estado for estado, _ in reporte.clasificar([correccion])] == ["cambiada"]
+    assert reporte.actualizar([(correccion, _item(correccion, "Reuters"))], "b.pdf") == (0, 1)
+    assert [nota.titulo for nota in reporte.notas()] == ["Central bank holds rates steady"]
@@ -0,0 +1,30 @@
+import contextvars
+import threading
+import time
+
+from trazas import Traza, _TRAZA, perfilar
+
+
+def test_perfilar_en_varios_hilos_no_choca():
+    traza = Traza("prueba", perfil=True)
+    token = _TRAZA.set(traza)
+    errores = []
+
+    def etapa():
+        try:
+            with perfilar():
+                with perfilar():
+                    time.sleep(0.02)
+        except Exception as e:
+            errores.append(e)
+
+    try:
+        hilos = [threading.Thread(target=contextvars.copy_context().run, args=(etapa,)) for _ in range(4)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+    finally:
+        _TRAZA.reset(token)
+    assert errores == []
+    assert traza._stats is not None
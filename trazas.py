@@ -0,0 +1,273 @@
+"""
+Trazas por etapa (y por página / nota) del procesamiento de un PDF.
+
+Sirven para saber en qué se fue el tiempo de un reporte lento: apertura del
+PDF, el recorrido de páginas con get_text("dict"), el cruce con el índice, las
+llamadas a la API o el armado del Word. Cada etapa se envuelve en un tramo:
+
+    with tramo("detectar_titulos", "pdf", paginas=n):
+        ...
+
+Sin una Traza activa, `tramo` devuelve un contexto vacío compartido (una
+consulta a una ContextVar y nada más), así que se puede dejar en los bucles.
+La traza activa viaja con el contexto: gestor_tareas y el resumidor lanzan sus
+tareas con contextvars.copy_context(), así que lo que se ejecuta en sus pools
+se apunta a la traza de quien lo encoló.
+
+La traza se exporta como JSON de trace events de Chrome (abrir en
+chrome://tracing o https://ui.perfetto.dev). Opcionalmente, cada etapa
+envuelta en `perfilar` se perfila con cProfile y todo se vuelca junto en un
+.prof (`python -m pstats archivo.prof`, snakeviz...).
+
+Se activan con PRENSA_TRAZAS=1 / PRENSA_PERFIL=1 (la app y el lote), con
+`?trazas=1` en la URL de la app (panel oculto en la barra lateral) o con
+`--trazas` / `--perfil` en main.py.
+"""
+import contextvars
+import cProfile
+import json
+import marshal
+import os
+import pstats
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+TRAZAS_ACTIVAS = os.getenv("PRENSA_TRAZAS", "") not in ("", "0")
+PERFIL_ACTIVO = os.getenv("PRENSA_PERFIL", "") not in ("", "0")
+DIRECTORIO_TRAZAS = os.getenv("PRENSA_TRAZAS_DIR", "trazas")
+
+_TRAZA: contextvars.ContextVar["Traza | None"] = contextvars.ContextVar("traza", default=None)
+# Un solo cProfile activo por proceso (desde Python 3.12 un segundo enable() lanza
+# ValueError); las etapas anidadas las mide el perfil externo
+_PERFILANDO = threading.Lock()
+
+
+class _TramoNulo:
+    """Lo que devuelve `tramo` sin traza activa: no mide nada."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def anotar(self, **args) -> None:
+        pass
+
+
+_NULO = _TramoNulo()
+
+
+class Tramo:
+    __slots__ = ("traza", "nombre", "categoria", "args", "inicio_ns")
+
+    def __init__(self, traza: "Traza", nombre: str, categoria: str, args: dict):
+        self.traza = traza
+        self.nombre = nombre
+        self.categoria = categoria
+        self.args = args
+        self.inicio_ns = 0
+
+    def anotar(self, **args) -> None:
+        """Añade datos que solo se conocen al final (tokens, estado...)."""
+        self.args.update(args)
+
+    def __enter__(self):
+        self.inicio_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, tipo_exc, exc, tb):
+        fin_ns = time.perf_counter_ns()
+        if tipo_exc is not None:
+            self.args["error"] = tipo_exc.__name__
+        self.traza.agregar(
+            {
+                "name": self.nombre,
+                "cat": self.categoria,
+                "ph": "X",
+                # perf_counter es monótono y común a todos los procesos (CLOCK_MONOTONIC):
+                # los eventos de los procesos del lote se pueden mezclar sin ajustar
+                "ts": self.inicio_ns / 1000,
+                "dur": (fin_ns - self.inicio_ns) / 1000,
+                "pid": os.getpid(),
+                "tid": threading.get_native_id(),
+                "args": self.args,
+            }
+        )
+        return False
+
+
+class Traza:
+    """Eventos (y perfiles de cProfile) de una ejecución: un PDF en la app o en el lote."""
+
+    __slots__ = ("nombre", "perfil", "_eventos", "_hilos", "_stats", "_lock")
+
+    def __init__(self, nombre: str = "", perfil: bool = PERFIL_ACTIVO):
+        self.nombre = nombre
+        self.perfil = perfil
+        self._eventos: list[dict] = []
+        self._hilos: dict[tuple, str] = {}
+        self._stats: pstats.Stats | None = None  # perfiles de cProfile acumulados
+        self._lock = threading.Lock()
+
+    def tramo(self, nombre: str, categoria: str = "", **args) -> Tramo:
+        return Tramo(self, nombre, categoria, args)
+
+    def agregar(self, evento: dict) -> None:
+        hilo = (evento["pid"], evento["tid"])
+        with self._lock:
+            self._eventos.append(evento)
+            if hilo not in self._hilos and hilo[0] == os.getpid():
+                self._hilos[hilo] = threading.current_thread().name
+
+    def absorber(self, eventos: list[dict], hilos: dict | None = None, ruta_perfil: str | None = None) -> None:
+        """
+        Incorpora lo que devuelve ejecutar_con_traza en otro proceso: sus eventos,
+        los nombres de sus hilos y su perfil (el .prof temporal se borra).
+        """
+        with self._lock:
+            self._eventos.extend(eventos)
+            for hilo, nombre in (hilos or {}).items():
+                self._hilos.setdefault(tuple(hilo), nombre)
+        if ruta_perfil is not None:
+            try:
+                self.agregar_perfil(ruta_perfil)
+            finally:
+                os.unlink(ruta_perfil)
+
+    def eventos(self) -> list[dict]:
+        with self._lock:
+            return list(self._eventos)
+
+    def hilos(self) -> dict:
+        with self._lock:
+            return dict(self._hilos)
+
+    def duracion_s(self) -> float:
+        eventos = self.eventos()
+        if not eventos:
+            return 0.0
+        return (max(e["ts"] + e["dur"] for e in eventos) - min(e["ts"] for e in eventos)) / 1e6
+
+    def exportar(self) -> dict:
+        """Trace events de Chrome, con el tiempo contado desde el primer evento."""
+        eventos = sorted(self.eventos(), key=lambda e: e["ts"])
+        origen = eventos[0]["ts"] if eventos else 0
+        nombres = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": nombre}}
+            for (pid, tid), nombre in self.hilos().items()
+        ]
+        return {
+            "traceEvents": nombres + [
+                {**e, "ts": round(e["ts"] - origen, 3), "dur": round(e["dur"], 3)} for e in eventos
+            ],
+            "displayTimeUnit": "ms",
+            "otherData": {"nombre": self.nombre},
+        }
+
+    def agregar_perfil(self, perfil: "cProfile.Profile | str") -> None:
+        """Suma un perfil (objeto cProfile o archivo .prof de otro proceso)."""
+        stats = pstats.Stats(perfil)
+        with self._lock:
+            if self._stats is None:
+                self._stats = stats
+            else:
+                self._stats.add(stats)
+
+    def tiene_perfil(self) -> bool:
+        with self._lock:
+            return self._stats is not None
+
+    def guardar(self, ruta_base) -> list[str]:
+        """Escribe `<ruta_base>.trace.json` y, si se perfiló, `<ruta_base>.prof`."""
+        ruta_base = Path(ruta_base)
+        ruta_base.parent.mkdir(parents=True, exist_ok=True)
+        rutas = [str(ruta_base.with_name(ruta_base.name + ".trace.json"))]
+        Path(rutas[0]).write_text(json.dumps(self.exportar(), ensure_ascii=False), encoding="utf-8")
+        ruta_perfil = str(ruta_base.with_name(ruta_base.name + ".prof"))
+        if self.volcar_perfil(ruta_perfil):
+            rutas.append(ruta_perfil)
+        return rutas
+
+    def volcar_perfil(self, ruta) -> bool:
+        """Escribe el perfil acumulado en `ruta` (.prof); False si no se perfiló nada."""
+        with self._lock:
+            if self._stats is None:
+                return False
+            self._stats.dump_stats(ruta)
+            return True
+
+    def perfil_bytes(self) -> bytes:
+        """El perfil acumulado en formato .prof (para descargarlo desde la app)."""
+        with self._lock:
+            # Mismo formato que pstats.Stats.dump_stats
+            return b"" if self._stats is None else marshal.dumps(self._stats.stats)
+
+
+def traza_actual() -> Traza | None:
+    return _TRAZA.get()
+
+
+def tramo(nombre: str, categoria: str = "", **args):
+    """Tramo de la traza activa en este contexto; sin traza, un contexto vacío."""
+    traza = _TRAZA.get()
+    if traza is None:
+        return _NULO
+    return Tramo(traza, nombre, categoria, args)
+
+
+@contextmanager
+def trazando(traza: Traza | None):
+    """Activa `traza` (o ninguna, si es None) para lo que se ejecute dentro del bloque."""
+    token = _TRAZA.set(traza)
+    try:
+        yield traza
+    finally:
+        _TRAZA.reset(token)
+
+
+@contextmanager
+def perfilar():
+    """
+    Perfila con cProfile el bloque si la traza activa lo pide. Se perfila una
+    sola etapa a la vez en todo el proceso: cProfile mide solo el hilo donde se
+    activa y, desde Python 3.12, no admite dos perfiles activos a la vez. Las
+    etapas que empiezan mientras otra se perfila (anidadas o en otros hilos) se
+    ejecutan sin perfilar.
+    """
+    traza = _TRAZA.get()
+    if traza is None or not traza.perfil or not _PERFILANDO.acquire(blocking=False):
+        yield
+        return
+    perfil = cProfile.Profile()
+    try:
+        perfil.enable()
+        try:
+            yield
+        finally:
+            perfil.disable()
+            traza.agregar_perfil(perfil)
+    finally:
+        _PERFILANDO.release()
+
+
+def ejecutar_con_traza(funcion, *args, perfil: bool = False, **kwargs):
+    """
+    Ejecuta `funcion` con una traza propia, pensado para un proceso de trabajo
+    (la ContextVar no cruza procesos). Devuelve (resultado, eventos, hilos, ruta
+    del .prof o None); el proceso principal lo suma con Traza.absorber.
+    """
+    traza = Traza(perfil=perfil)
+    with trazando(traza), perfilar():
+        resultado = funcion(*args, **kwargs)
+    ruta_perfil = None
+    if traza.tiene_perfil():
+        descriptor, ruta_perfil = tempfile.mkstemp(prefix="prensa_perfil_", suffix=".prof")
+        os.close(descriptor)
+        traza.volcar_perfil(ruta_perfil)
+    return resultado, traza.eventos(), traza.hilos(), ruta_perfil